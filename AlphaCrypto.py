@@ -2,7 +2,7 @@
 # BTC next-24h directional signal using Tavily (news) + GPT-4.1 (sentiment) + TA
 # Outputs: signal.json, report.md, features.csv, audit.log
 
-import os, json, time
+import os, json, time, hashlib
 from dataclasses import dataclass
 from typing import List, Dict, Any, Optional, TypedDict
 from datetime import datetime, timedelta, timezone
@@ -15,11 +15,12 @@ from email.mime.base import MIMEBase
 from email import encoders
 import schedule
 import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from dotenv import load_dotenv
 from tavily import TavilyClient
 import ccxt
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
 from langgraph.graph import StateGraph, END
 
 # --- Load env vars from .env
@@ -37,6 +38,8 @@ class Config:
     news_slow_hours_max: int = 12
     ta_lookback_days: int = 3  # Shorter lookback for 4h momentum
     max_news_items: int = 16  # Optimized for 4h timeframe - 2 queries × 8 results
+    news_max_workers: int = 4  # Tavily queries issued in parallel
+    news_deadline_seconds: float = 45.0  # Queries still running by then are left out of the run
     sentiment_recent_weight: float = 0.75  # Higher weight on recent sentiment
     sentiment_slow_weight: float = 0.25
     abstain_conf_threshold: float = 0.50  # Lower threshold for more opportunities
@@ -46,6 +49,16 @@ class Config:
     out_features_csv: str = "features.csv"
     out_audit_log: str = "audit.log"
     use_llm_sentiment: bool = True
+    sentiment_max_workers: int = 8  # Concurrent LLM classification calls
+    sentiment_deadline_seconds: float = 120.0  # Docs not classified by then count as neutral
+    sentiment_max_retries: int = 3  # Retries of a rate-limited (429) call
+    sentiment_retry_base_seconds: float = 2.0  # Backoff when the 429 carries no Retry-After
+    sentiment_cache_file: str = "sentiment_cache.json"  # Scores of already-classified articles
+    sentiment_cache_ttl_hours: float = 48.0
+    sentiment_cache_max_entries: int = 2000  # Least recently used entries are dropped beyond this
+    sentiment_batch_mode: bool = True  # Several articles per LLM request (single calls for unparsable items)
+    sentiment_batch_token_budget: int = 6000  # Estimated prompt + reply tokens per batch request
+    sentiment_batch_max_items: int = 10
 
 class GraphState(TypedDict):
     cfg: Config
@@ -234,14 +247,27 @@ def market_context_fetcher(state: GraphState) -> GraphState:
 # ==============================
 # news_social_gatherer
 # ==============================
-def tavily_search(q, time_range="d", max_results=20):
+_tavily_client: Optional[TavilyClient] = None
+_tavily_lock = threading.Lock()
+
+def get_tavily_client() -> Optional[TavilyClient]:
+    """One TavilyClient per process, shared by all searches"""
+    global _tavily_client
     api = os.getenv("TAVILY_API_KEY")
-    if not api: 
+    if not api:
+        return None
+    with _tavily_lock:
+        if _tavily_client is None or getattr(_tavily_client, "api_key", api) != api:
+            _tavily_client = TavilyClient(api_key=api)
+        return _tavily_client
+
+def tavily_search(q, time_range="d", max_results=20):
+    client = get_tavily_client()
+    if client is None: 
         print("No Tavily API key found")
         return []
     
     try:
-        client = TavilyClient(api_key=api)
         print(f"Searching Tavily with query: {q}")
         res = client.search(query=q, search_depth="advanced", time_range=time_range, max_results=max_results)
         items = res.get("results", [])
@@ -252,6 +278,23 @@ def tavily_search(q, time_range="d", max_results=20):
         print(f"Tavily search error: {e}")
         return []
 
+def gather_news(queries: List[str], cfg: Config, time_range="d", max_results=6) -> List[Dict[str, Any]]:
+    """Run the Tavily queries in parallel; results are concatenated in query order.
+    Queries still running at the deadline are left out."""
+    pool = ThreadPoolExecutor(max_workers=max(1, min(cfg.news_max_workers, len(queries))))
+    futures = [pool.submit(tavily_search, q, time_range, max_results) for q in queries]
+    done, not_done = wait(futures, timeout=cfg.news_deadline_seconds)
+    pool.shutdown(wait=False, cancel_futures=True)
+    if not_done:
+        late = [q for q, f in zip(queries, futures) if f in not_done]
+        print(f"⚠️  News deadline reached, skipping {len(late)} query(s): {late}")
+    
+    all_items = []
+    for f in futures:
+        if f in done:
+            all_items.extend(f.result())
+    return all_items
+
 def news_social_gatherer(state: GraphState) -> GraphState:
     cfg = state["cfg"]
     
@@ -268,10 +311,9 @@ def news_social_gatherer(state: GraphState) -> GraphState:
         'bitcoin ETF news today'
     ]
     
-    all_items = []
-    for q in queries:
-        items = tavily_search(q, time_range="d", max_results=6)  # Reduced to 6 per query
-        all_items.extend(items)
+    started = time.time()
+    all_items = gather_news(queries, cfg, time_range="d", max_results=6)  # Reduced to 6 per query
+    print(f"Gathered {len(all_items)} raw results from {len(queries)} queries in {time.time() - started:.1f}s")
     
     items = dedup_by_title_url(all_items)
     print(f"Total unique items found before filtering: {len(items)}")
@@ -298,24 +340,103 @@ def doc_normalizer(state: GraphState) -> GraphState:
 # ==============================
 openai_client = OpenAI()
 
-def llm_sentiment_doc(text: str):
+def retry_after_seconds(err: Exception, attempt: int, base: float) -> float:
+    """Wait before retrying a rate-limited call: Retry-After(-ms) header if any, else exponential backoff"""
+    headers = getattr(getattr(err, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return base * (2 ** attempt)
+
+SENTIMENT_DOC_MAX_CHARS = 2000  # Text of one article sent for classification
+SENTIMENT_REPLY_TOKENS = 60  # Rough reply size per article (label + brief reason)
+
+SENTIMENT_BATCH_SCHEMA = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "sentiment_batch",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "items": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            "sentiment": {"type": "string", "enum": ["Positive", "Negative", "Neutral"]},
+                            "reason": {"type": "string"},
+                        },
+                        "required": ["id", "sentiment", "reason"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["items"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1  # ~4 characters per token for English text
+
+def llm_chat(prompt: str, max_retries: int = 3, retry_base: float = 2.0,
+             deadline: Optional[float] = None, **kwargs) -> str:
+    """One chat completion; 429s are retried (honouring Retry-After) until the deadline"""
+    for attempt in range(max_retries + 1):
+        # Retries happen here rather than inside the client, so waits are not stacked. A
+        # running call cannot be cancelled, so its timeout is what is left before the deadline
+        options = {'max_retries': 0}
+        if deadline is not None:
+            options['timeout'] = deadline - time.monotonic()
+            if options['timeout'] <= 0:
+                raise TimeoutError("Deadline passed before the LLM call")
+        client = openai_client.with_options(**options)
+        try:
+            r = client.chat.completions.create(
+                model="gpt-4.1-mini",
+                messages=[{"role":"user","content":prompt}],
+                temperature=0,
+                **kwargs
+            )
+            return r.choices[0].message.content.strip()
+        except RateLimitError as e:
+            delay = retry_after_seconds(e, attempt, retry_base)
+            if attempt == max_retries or (deadline is not None and time.monotonic() + delay > deadline):
+                raise
+            print(f"LLM rate limited, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def sentiment_result(sentiment: str, reason: str):
+    """(label, compound score, reason) from a model's sentiment word"""
+    sentiment = sentiment.strip().lower()
+    if "pos" in sentiment: 
+        return "positive", +0.5, reason
+    elif "neg" in sentiment: 
+        return "negative", -0.5, reason
+    else: 
+        return "neutral", 0.0, reason
+
+def llm_sentiment_doc(text: str, max_retries: int = 3, retry_base: float = 2.0,
+                      deadline: Optional[float] = None):
     prompt = f"""Classify sentiment of this text toward Bitcoin's price in the next 4 hours.
 Reply with one of: Positive, Negative, Neutral.
 Also provide a brief reason for your classification.
 
 Text:
-{text[:2000]}
+{text[:SENTIMENT_DOC_MAX_CHARS]}
 
 Format your response as:
 Sentiment: [Positive/Negative/Neutral]
 Reason: [Brief explanation]"""
     try:
-        r = openai_client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[{"role":"user","content":prompt}],
-            temperature=0
-        )
-        response = r.choices[0].message.content.strip()
+        response = llm_chat(prompt, max_retries, retry_base, deadline)
         
         # Parse sentiment and reason
         lines = response.split('\n')
@@ -329,26 +450,175 @@ Reason: [Brief explanation]"""
                 reason = line.split(":", 1)[1].strip()
         
         # Convert to score
-        if "pos" in sentiment: 
-            return "positive", +0.5, reason
-        elif "neg" in sentiment: 
-            return "negative", -0.5, reason
-        else: 
-            return "neutral", 0.0, reason
+        return sentiment_result(sentiment, reason)
             
     except Exception as e:
         print("LLM sentiment error:", e)
         return "neutral", 0.0, f"Error: {str(e)}"
 
+SENTIMENT_BATCH_INSTRUCTIONS = """Classify the sentiment of each text below toward Bitcoin's price in the next 4 hours.
+For every text, return its id, one of Positive, Negative, Neutral, and a brief reason for the classification.
+"""
+
+def plan_sentiment_batches(texts: List[str], token_budget: int, max_items: int) -> List[List[int]]:
+    """Greedily group text positions so each batch's estimated prompt + reply tokens fit the budget"""
+    budget = token_budget - estimate_tokens(SENTIMENT_BATCH_INSTRUCTIONS)
+    batches, current, used = [], [], 0
+    for i, text in enumerate(texts):
+        cost = estimate_tokens(text[:SENTIMENT_DOC_MAX_CHARS]) + SENTIMENT_REPLY_TOKENS + 5  # + id header
+        if current and (used + cost > budget or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def llm_sentiment_batch(texts: List[str], max_retries: int = 3, retry_base: float = 2.0,
+                        deadline: Optional[float] = None) -> List[Optional[tuple]]:
+    """Classify several texts in one structured-output request.
+    Items missing or malformed in the reply come back as None (the caller classifies them singly)."""
+    if len(texts) == 1:
+        return [llm_sentiment_doc(texts[0], max_retries, retry_base, deadline)]
+    body = "\n\n".join(f"[{n}]\n{text[:SENTIMENT_DOC_MAX_CHARS]}" for n, text in enumerate(texts, 1))
+    try:
+        response = llm_chat(SENTIMENT_BATCH_INSTRUCTIONS + "\n" + body, max_retries, retry_base, deadline,
+                            response_format=SENTIMENT_BATCH_SCHEMA)
+        items = json.loads(response).get("items", [])
+    except Exception as e:
+        print(f"LLM batch sentiment error ({len(texts)} items):", e)
+        return [None] * len(texts)
+    
+    results: List[Optional[tuple]] = [None] * len(texts)
+    for item in items if isinstance(items, list) else []:
+        try:
+            n = int(item["id"])
+            if 1 <= n <= len(texts) and results[n - 1] is None:
+                results[n - 1] = sentiment_result(str(item["sentiment"]), str(item.get("reason") or "No reason provided"))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return results
+
+def doc_text(d: Dict[str, Any]) -> str:
+    text = (d.get("title","") + " " + d.get("content","")).strip()
+    return text or d.get("title","")
+
+class SentimentCache:
+    """Disk-backed sentiment scores keyed by canonical URL + hash of the classified text.
+    Entries expire after `ttl_hours`; beyond `max_entries` the least recently used are dropped."""
+    
+    def __init__(self, path: str, ttl_hours: float = 48.0, max_entries: int = 2000):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.hits = 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+        cutoff = time.time() - self.ttl_seconds
+        self.entries = {k: e for k, e in self.entries.items() if e.get("stored_at", 0) >= cutoff}
+    
+    @staticmethod
+    def key(d: Dict[str, Any], text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        return f"{canonical_url(d.get('url', ''))}#{digest}"
+    
+    def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None or time.time() - entry["stored_at"] > self.ttl_seconds:
+            return None
+        entry["used_at"] = time.time()
+        self.hits += 1
+        return entry["label"], entry["compound"], entry["reason"]
+    
+    def put(self, key: str, result):
+        label, compound, reason = result
+        now = time.time()
+        self.entries[key] = {"label": label, "compound": compound, "reason": reason,
+                             "stored_at": now, "used_at": now}
+    
+    def save(self):
+        if len(self.entries) > self.max_entries:
+            keep = sorted(self.entries, key=lambda k: self.entries[k]["used_at"], reverse=True)[:self.max_entries]
+            self.entries = {k: self.entries[k] for k in keep}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+def classify_docs(docs: List[Dict[str, Any]], cfg: Config) -> List[Dict[str, Any]]:
+    """Score docs with concurrent LLM calls (batched to a token budget); results keep the input order.
+    Cached scores are reused without a call. Docs still unscored at the deadline count as neutral."""
+    if not docs:
+        return []
+    cache = SentimentCache(cfg.sentiment_cache_file, cfg.sentiment_cache_ttl_hours, cfg.sentiment_cache_max_entries)
+    texts = [doc_text(d) for d in docs]
+    keys = [SentimentCache.key(d, t) for d, t in zip(docs, texts)]
+    results = [cache.get(k) for k in keys]
+    misses = [i for i, r in enumerate(results) if r is None]
+    print(f"Sentiment cache: {cache.hits} hits, {len(misses)} to classify")
+    
+    if misses:
+        deadline = time.monotonic() + cfg.sentiment_deadline_seconds
+        pool = ThreadPoolExecutor(max_workers=max(1, cfg.sentiment_max_workers))
+        retry = (cfg.sentiment_max_retries, cfg.sentiment_retry_base_seconds, deadline)
+        
+        def submit_single(i):
+            future = pool.submit(llm_sentiment_doc, texts[i], *retry)
+            jobs[future] = ([i], False)
+            return future
+        
+        jobs = {}  # future -> (doc positions, is_batch)
+        if cfg.sentiment_batch_mode:
+            batches = plan_sentiment_batches([texts[i] for i in misses], cfg.sentiment_batch_token_budget,
+                                             cfg.sentiment_batch_max_items)
+            for batch in batches:
+                positions = [misses[b] for b in batch]
+                jobs[pool.submit(llm_sentiment_batch, [texts[i] for i in positions], *retry)] = (positions, True)
+            print(f"Classifying {len(misses)} docs in {len(batches)} batch request(s)")
+        else:
+            for i in misses:
+                submit_single(i)
+        
+        pending = set(jobs)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for f in done:
+                positions, is_batch = jobs[f]
+                outcomes = f.result() if is_batch else [f.result()]
+                for i, result in zip(positions, outcomes):
+                    if result is None:
+                        # Unparsable batch item: classify it on its own
+                        pending.add(submit_single(i))
+                        continue
+                    results[i] = result
+                    # Failed calls are retried next run rather than cached
+                    if not result[2].startswith("Error:"):
+                        cache.put(keys[i], result)
+        pool.shutdown(wait=False, cancel_futures=True)
+        
+        timed_out = [i for i in misses if results[i] is None]
+        if timed_out:
+            print(f"⚠️  Sentiment deadline reached, {len(timed_out)} of {len(docs)} docs scored neutral")
+        for i in timed_out:
+            results[i] = ("neutral", 0.0, "Timed out")
+    
+    try:
+        cache.save()
+    except OSError as e:
+        print(f"⚠️  Could not save sentiment cache: {e}")
+    
+    return [{**d, "sent_label": lbl, "sent_compound": comp, "sent_reason": reason}
+            for d, (lbl, comp, reason) in zip(docs, results)]
+
 def sentiment_classifier(state: GraphState) -> GraphState:
-    def score_set(docs):
-        scored = []
-        for d in docs:
-            text = (d.get("title","") + " " + d.get("content","")).strip()
-            if not text: text = d.get("title","")
-            lbl, comp, reason = llm_sentiment_doc(text)
-            scored.append({**d, "sent_label": lbl, "sent_compound": comp, "sent_reason": reason})
-        return scored
+    cfg = state["cfg"]
     
     # Check if we have API keys, if not return neutral sentiment
     if not os.getenv("OPENAI_API_KEY") or not os.getenv("TAVILY_API_KEY"):
@@ -370,13 +640,16 @@ def sentiment_classifier(state: GraphState) -> GraphState:
             "sent_slow": {"items": []}
         }
     
-    # Analyze sentiment
-    recent_scored = score_set(recent_docs)
-    slow_scored = score_set(slow_docs)
+    # Analyze sentiment (both sets in one concurrent pass under one deadline)
+    started = time.time()
+    scored = classify_docs(recent_docs + slow_docs, cfg)
+    recent_scored = scored[:len(recent_docs)]
+    slow_scored = scored[len(recent_docs):]
     
     # Debug: Print summary results
     print(f"✓ Recent sentiment analysis: {len(recent_scored)} items")
     print(f"✓ Slow sentiment analysis: {len(slow_scored)} items")
+    print(f"✓ Sentiment classification took {time.time() - started:.1f}s")
     
     return {
         "sent_recent": {"items": recent_scored},
@@ -4,9 +4,11 @@ Derivative Data Collection Management Script
 
 This script collects derivative market data to enhance BTC price predictions:
 - Futures data (basis, open interest, volume)
+- Dated futures term structure (annualized basis, curve slope)
 - Funding rates across exchanges
-- Options data (put/call ratios, implied volatility)
+- Options data (put/call ratio, implied volatility, skew)
 - Perpetual swap metrics
+- Liquidation stream (long/short notional, cascades)
 
 Usage:
     python scripts/run_derivatives.py [mode] [options]
@@ -15,11 +17,17 @@ Modes:
     single      - Run single collection (default)
     continuous  - Run continuous collection every 15 minutes
     extended    - Run for specified duration
+    backfill    - Page recent venue history into the partitions
+    migrate     - Split derivative_data.csv into typed daily partitions
+    rederive    - Recompute the feature history from the partitions
     
 Examples:
     python scripts/run_derivatives.py single
     python scripts/run_derivatives.py continuous
     python scripts/run_derivatives.py extended --duration 60 --interval 15
+    python scripts/run_derivatives.py backfill
+    python scripts/run_derivatives.py migrate
+    python scripts/run_derivatives.py rederive
 """
 
 import sys
@@ -31,7 +39,7 @@ from datetime import datetime, timedelta, timezone
 # Add src directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from AlphaCrypto_Derivatives import DerivativeApp
+from AlphaCrypto_Derivatives import DerivativeApp, DerivativeConfig, DerivativeDataStorage, DerivativeTableFeatureEngine
 
 def run_single():
     """Run single derivative analysis"""
@@ -53,6 +61,7 @@ def run_extended(duration_minutes, interval_seconds):
     print(f"⏱️  Starting extended collection: {duration_minutes} minutes, {interval_seconds}s intervals")
     
     app = DerivativeApp()
+    app.start_liquidation_feed()
     end_time = time.time() + (duration_minutes * 60)
     collection_count = 0
     
@@ -75,11 +84,49 @@ def run_extended(duration_minutes, interval_seconds):
         
     except KeyboardInterrupt:
         print(f"\n🛑 Collection stopped: {collection_count} data points collected")
+    finally:
+        app.stop_liquidation_feed()
+
+def run_backfill():
+    """Fetch venue history since the stored cursors into the partitions"""
+    print("⏪ Backfilling derivative history...")
+    app = DerivativeApp()
+    app.backfill_history()
+    print("✅ Backfill completed")
+
+def run_migrate():
+    """Split the legacy wide CSV into typed, per-day partitions"""
+    config = DerivativeConfig()
+    print(f"📦 Partitioning {config.derivative_data_file} into {config.derivative_partition_dir}/")
+    counts = DerivativeDataStorage(config).partition_legacy_file()
+    if not counts:
+        print("⚠️  Nothing to migrate")
+    for record_type, count in counts.items():
+        print(f"✓ {record_type}: {count} rows")
+
+def run_rederive():
+    """Recompute every cycle's features from the stored partitions in one pass"""
+    config = DerivativeConfig()
+    storage = DerivativeDataStorage(config)
+    futures = storage.load_partitioned('futures')
+    funding = storage.load_partitioned('funding')
+    options = storage.load_partitioned('options')
+    liquidations = storage.load_partitioned('liquidations')
+    term_structure = storage.load_partitioned('term_structure')
+    print(f"🧮 Re-deriving features from {len(futures)} futures, {len(funding)} funding, {len(options)} options, "
+          f"{len(term_structure)} dated futures and {len(liquidations)} liquidation bucket rows")
+    
+    start = time.time()
+    features = DerivativeTableFeatureEngine(config).calculate_features(
+        futures, funding, options, liquidations, term_structure)
+    os.makedirs(os.path.dirname(config.rederived_features_file), exist_ok=True)
+    features.to_csv(config.rederived_features_file, index=False)
+    print(f"✓ {len(features)} cycles written to {config.rederived_features_file} in {time.time() - start:.1f}s")
 
 def main():
     parser = argparse.ArgumentParser(description='Derivative Data Collection Management')
     parser.add_argument('mode', nargs='?', default='single', 
-                       choices=['single', 'continuous', 'extended'],
+                       choices=['single', 'continuous', 'extended', 'backfill', 'migrate', 'rederive'],
                        help='Collection mode (default: single)')
     parser.add_argument('--duration', type=int, default=60,
                        help='Duration in minutes for extended mode (default: 60)')
@@ -99,6 +146,12 @@ def main():
         run_continuous()
     elif args.mode == 'extended':
         run_extended(args.duration, args.interval)
+    elif args.mode == 'backfill':
+        run_backfill()
+    elif args.mode == 'migrate':
+        run_migrate()
+    elif args.mode == 'rederive':
+        run_rederive()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -11,6 +11,7 @@ import pandas as pd
 import numpy as np
 import pytz
 from collections import deque
+from bisect import bisect_left, bisect_right
 import threading
 import schedule
 from concurrent.futures import ThreadPoolExecutor
@@ -18,6 +19,8 @@ from concurrent.futures import ThreadPoolExecutor
 import ccxt
 from dotenv import load_dotenv
 
+from AlphaCrypto_Storage import Checkpointer, SignalLog, pack_records, unpack_records, append_csv_rows, apply_schema
+
 # Load environment variables
 load_dotenv()
 
@@ -35,10 +38,63 @@ class DerivativeConfig:
     
     # Output files
     derivative_data_file: str = "data/raw/derivative_data.csv"
+    legacy_csv_enabled: bool = True  # Transition period: keep appending the wide CSV until its readers use the partitions
+    derivative_partition_dir: str = "data/raw/derivatives"  # <type>/<YYYY-MM-DD>.csv
     features_file: str = "data/processed/derivative_features.csv"
-    signals_file: str = "data/outputs/derivative_signals.json"
+    rederived_features_file: str = "data/processed/derivative_features_rederived.csv"
+    signals_file: str = "data/outputs/derivative_signals.json"  # Latest signal
+    signal_log_file: str = "data/outputs/derivative_signals.jsonl"  # Append-only history
     report_file: str = "data/outputs/reports/derivative_report.md"
     
+    # Historical backfill (seeds the buffers after a restart)
+    backfill_on_startup: bool = True  # Run the backfill when continuous collection starts
+    backfill_hours: int = 24  # How far back a cold start pages history
+    backfill_timeframe: str = "15m"  # Matches the collection interval
+    backfill_page_limit: int = 200  # Rows requested per history call
+    backfill_cursor_file: str = "data/raw/derivatives/backfill_cursors.json"
+    
+    # Options chain (one bulk chain request per cycle)
+    options_enabled: bool = True
+    options_source: str = "exchange"  # "exchange" or "fixture"
+    options_exchange: str = "deribit"  # Public option chains, no account needed
+    options_currency: str = "BTC"
+    options_fixture_file: str = "data/fixtures/options_chain.csv"
+    options_min_days: float = 1.0  # Skip expiries too close to settlement
+    options_max_expiries: int = 8
+    options_target_days: int = 30  # Constant-maturity point for IV and skew
+    
+    # Liquidation stream (aggregated continuously between cycles)
+    liquidations_enabled: bool = True
+    liquidation_source: str = "exchange"  # "exchange" (websocket) or "replay"
+    liquidation_exchanges: Tuple[str, ...] = ("binance", "bybit")
+    liquidation_symbol: str = "BTC/USDT:USDT"
+    liquidation_replay_file: str = "data/fixtures/liquidations.csv"
+    liquidation_replay_speed: float = 0.0  # 0 = load the whole file at start, else x real time
+    liquidation_bucket_seconds: int = 60
+    liquidation_window_buckets: int = 60  # 1 hour of 1-minute buckets
+    liquidation_cascade_zscore: float = 3.0
+    
+    # Dated futures term structure (one bulk ticker request per venue and margin type)
+    term_structure_enabled: bool = True
+    term_min_days: float = 2.0  # Basis this close to expiry annualizes to noise
+    
+    # Cross-venue dislocations (rolling z-score of each venue pair's differential)
+    dislocation_window: int = 96  # Cycles per rolling window
+    dislocation_min_obs: int = 10  # Pair observations before a z-score is reported
+    
+    # Composite score state (EWMA per observation, snapshotted between runs)
+    composite_halflife_minutes: float = 240.0  # Time-based, so any collection interval decays alike
+    composite_min_obs: int = 5  # Observations before z-scores are reported
+    engine_state_file: str = "data/processed/derivative_engine_state.json"
+    
+    # Warm-restart checkpoint of the rolling buffers and liquidation buckets
+    checkpoint_file: str = "data/cache/derivative_checkpoint.json.gz"  # Gitignored, never committed by the workflows
+    checkpoint_interval_seconds: int = 300
+    checkpoint_max_age_hours: float = 6.0  # Older snapshots fall back to backfill only
+    
+    # Rows closer together than this belong to the same collection cycle
+    cycle_gap_seconds: int = 60
+    
     # Feature calculation parameters
     basis_threshold: float = 0.001  # 0.1% basis threshold
     funding_rate_threshold: float = 0.0001  # 0.01% funding rate threshold
@@ -67,6 +123,19 @@ class FundingRateData:
     next_funding_time: datetime
     predicted_funding_rate: float
 
+@dataclass
+class TermStructureData:
+    timestamp: datetime
+    symbol: str
+    exchange: str
+    contract: str  # Dated futures market symbol
+    expiry: datetime
+    futures_price: float
+    spot_price: float
+    basis: float  # (futures - spot) / spot
+    days_to_expiry: float
+    annualized_basis: float  # ln(futures / spot) / years, continuously compounded
+
 @dataclass
 class OptionsData:
     timestamp: datetime
@@ -77,6 +146,7 @@ class OptionsData:
     skew: float  # Put skew - Call skew
     total_volume: float
     open_interest: float
+    expiry: Optional[datetime] = None  # One record per expiry
 
 @dataclass
 class DerivativeFeatures:
@@ -106,6 +176,28 @@ class DerivativeFeatures:
     derivative_sentiment: float  # -1 to 1
     derivative_confidence: float  # 0 to 1
     market_structure_score: float  # Overall market structure health
+    
+    # Composite State Features (EWMA with online variance)
+    sentiment_ewma: float = 0.0
+    sentiment_zscore: float = 0.0  # Latest sentiment vs its EWMA
+    structure_ewma: float = 0.0
+    structure_zscore: float = 0.0
+    
+    # Cross-Venue Dislocation Features (largest |z| over venue pairs)
+    basis_dislocation_z: float = 0.0
+    funding_dislocation_z: float = 0.0
+    
+    # Liquidation Features (last complete window of the stream)
+    liq_long_notional: float = 0.0  # Longs liquidated, quote currency
+    liq_short_notional: float = 0.0  # Shorts liquidated, quote currency
+    liq_imbalance: float = 0.0  # (short - long) / total, -1 to 1
+    liq_burst_zscore: float = 0.0  # Last bucket vs the rest of the window
+    liq_cascade: float = 0.0  # +1 short squeeze, -1 long cascade, 0 none
+    
+    # Term Structure Features (dated futures, annualized)
+    term_front_basis: float = 0.0  # Nearest expiry
+    term_back_basis: float = 0.0  # Farthest expiry
+    term_slope: float = 0.0  # Change in annualized basis per year of maturity
 
 @dataclass
 class DerivativeSignal:
@@ -117,6 +209,699 @@ class DerivativeSignal:
     features: Dict[str, float]
     reasoning: str
 
+# ==============================
+# Per-Venue Time Series
+# ==============================
+FUTURES_INDEX_FIELDS = ['basis', 'open_interest', 'volume_24h']
+FUNDING_INDEX_FIELDS = ['funding_rate']
+OI_CHANGE_LOOKBACK = timedelta(hours=24)
+INDEX_SLACK_INTERVALS = 4  # Late cycles still find the reading just before the lookback
+
+def index_retention(config: 'DerivativeConfig') -> timedelta:
+    """History kept per venue: the buffer window or the OI lookback, whichever is longer, plus slack"""
+    interval = timedelta(seconds=config.data_collection_interval)
+    return max(config.max_data_points * interval, OI_CHANGE_LOOKBACK) + INDEX_SLACK_INTERVALS * interval
+
+class VenueTimeSeries:
+    """Time-ordered observations kept separately per venue.
+    
+    Diffs are only ever taken between two readings of the same exchange, and
+    cross-venue aggregation happens after the per-venue statistic is computed.
+    Each venue keeps the readings within `retention` of its own latest one;
+    venues with no reading within `retention` of the newest reading overall
+    are left out of the aggregates.
+    """
+    
+    def __init__(self, fields: List[str], retention: timedelta):
+        self.fields = fields
+        self.retention_seconds = retention.total_seconds()
+        self._times: Dict[str, List[float]] = {}
+        self._values: Dict[str, Dict[str, List[float]]] = {}
+        self._latest = float('-inf')
+    
+    @classmethod
+    def from_records(cls, records: List[Any], fields: List[str], retention: timedelta) -> 'VenueTimeSeries':
+        index = cls(fields, retention)
+        index.extend(records)
+        return index
+    
+    @property
+    def venues(self) -> List[str]:
+        """Venues that reported inside the retention window"""
+        cutoff = self._latest - self.retention_seconds
+        return [venue for venue, times in self._times.items() if times[-1] >= cutoff]
+    
+    def append(self, record: Any):
+        """Add one observation (any object with timestamp, exchange and the indexed fields)"""
+        venue = record.exchange
+        ts = record.timestamp.timestamp()
+        times = self._times.setdefault(venue, [])
+        values = self._values.setdefault(venue, {field: [] for field in self.fields})
+        
+        # Observations normally arrive in order; out-of-order ones are inserted in place
+        pos = len(times) if not times or ts >= times[-1] else bisect_right(times, ts)
+        times.insert(pos, ts)
+        for field in self.fields:
+            values[field].insert(pos, float(getattr(record, field)))
+        self._latest = max(self._latest, ts)
+        
+        cutoff = bisect_left(times, times[-1] - self.retention_seconds)
+        if cutoff > 0:
+            del times[:cutoff]
+            for field in self.fields:
+                del values[field][:cutoff]
+    
+    def extend(self, records: List[Any]):
+        for record in records:
+            self.append(record)
+    
+    def window(self, field: str, venue: str, n: int, positive_only: bool = False) -> np.ndarray:
+        """Last `n` valid readings of one field for one venue, oldest first"""
+        values = np.asarray(self._values.get(venue, {}).get(field, []), dtype=float)
+        valid = values > 0 if positive_only else np.isfinite(values)
+        return values[valid][-n:]
+    
+    def window_matrix(self, field: str, n: int, positive_only: bool = False) -> np.ndarray:
+        """Venues x n matrix of the latest readings, left-padded with NaN"""
+        venues = self.venues
+        matrix = np.full((len(venues), n), np.nan)
+        for row, venue in enumerate(venues):
+            values = self.window(field, venue, n, positive_only)
+            if len(values):
+                matrix[row, n - len(values):] = values
+        return matrix
+    
+    def momentum(self, field: str, n: int = 10, positive_only: bool = False) -> float:
+        """Mean per-step change over each venue's last `n` readings, averaged across venues"""
+        if n < 2 or not self._times:
+            return 0.0
+        diffs = np.diff(self.window_matrix(field, n, positive_only), axis=1)
+        counts = np.isfinite(diffs).sum(axis=1)
+        if not counts.any():
+            return 0.0
+        per_venue = np.nansum(diffs, axis=1)[counts > 0] / counts[counts > 0]
+        return float(np.mean(per_venue))
+    
+    def asof(self, field: str, when: datetime, positive_only: bool = False) -> Dict[str, float]:
+        """Latest valid reading at or before `when` for every venue that has one"""
+        ts = when.timestamp()
+        result = {}
+        for venue, times in self._times.items():
+            values = self._values[venue][field]
+            i = bisect_right(times, ts) - 1
+            while i >= 0 and not (values[i] > 0 if positive_only else np.isfinite(values[i])):
+                i -= 1
+            if i >= 0:
+                result[venue] = values[i]
+        return result
+    
+    def change_since(self, field: str, lookback: timedelta, positive_only: bool = True) -> float:
+        """Fractional change versus the as-of reading `lookback` ago, averaged across venues"""
+        changes = []
+        for venue in self.venues:
+            times = self._times[venue]
+            current = self.window(field, venue, 1, positive_only)
+            if not len(current):
+                continue
+            then = datetime.fromtimestamp(times[-1] - lookback.total_seconds(), tz=timezone.utc)
+            past = self.asof(field, then, positive_only).get(venue)
+            if past:
+                changes.append(current[-1] / past - 1.0)
+        return float(np.mean(changes)) if changes else 0.0
+    
+    def mean_ratio(self, field: str, current: Dict[str, float], n: int = 10) -> float:
+        """Current value over the venue's recent mean, averaged across venues"""
+        ratios = []
+        for venue, value in current.items():
+            history = self.window(field, venue, n, positive_only=True)
+            if value > 0 and len(history):
+                ratios.append(value / history.mean())
+        return float(np.mean(ratios)) if ratios else 1.0
+
+# ==============================
+# Venue Dislocations
+# ==============================
+def pairwise_zscores(sums: np.ndarray, sumsq: np.ndarray, counts: np.ndarray,
+                     current: np.ndarray, min_obs: int) -> np.ndarray:
+    """Z-score of the current pair differentials against rolling sums (NaN when undefined)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = sums / counts
+        second = sumsq / counts
+        variance = second - mean ** 2
+        # Relative floor: cancellation noise must not pass for variance
+        usable = (counts >= min_obs) & (variance > 1e-12 * second)
+        return np.where(usable, (current - mean) / np.sqrt(variance), np.nan)
+
+class VenueDislocationTracker:
+    """Venue-by-venue differentials of one field with rolling per-pair z-scores.
+    
+    Each update takes the outer difference of the cycle's per-venue values and
+    moves ring-buffer sums forward one slot, so the cost is O(venues^2) per
+    update regardless of window length. Entry [i, j] is venue i minus venue j.
+    """
+    
+    def __init__(self, window: int, min_obs: int = 10):
+        self.window = window
+        self.min_obs = min_obs
+        self.venues: List[str] = []
+        self._ring = np.full((window, 0, 0), np.nan)
+        self._pos = 0
+        self._sums = np.zeros((0, 0))
+        self._sumsq = np.zeros((0, 0))
+        self._counts = np.zeros((0, 0))
+        self.latest = np.zeros((0, 0))
+        self.zscores = np.zeros((0, 0))
+    
+    def _add_venues(self, names: List[str]):
+        new = [n for n in names if n not in self.venues]
+        if not new:
+            return
+        self.venues.extend(new)
+        pad = ((0, len(new)), (0, len(new)))
+        self._ring = np.pad(self._ring, ((0, 0),) + pad, constant_values=np.nan)
+        self._sums, self._sumsq, self._counts = (np.pad(a, pad) for a in (self._sums, self._sumsq, self._counts))
+    
+    def update(self, values: Dict[str, float]) -> np.ndarray:
+        """Add one cycle of per-venue values; returns the pair z-score matrix"""
+        self._add_venues(sorted(values))
+        vector = np.full(len(self.venues), np.nan)
+        for venue, value in values.items():
+            vector[self.venues.index(venue)] = value
+        diff = np.subtract.outer(vector, vector)
+        
+        # Evict the slot leaving the window, then add the new differentials
+        old = self._ring[self._pos]
+        seen = np.isfinite(old)
+        self._sums -= np.where(seen, old, 0.0)
+        self._sumsq -= np.where(seen, old * old, 0.0)
+        self._counts -= seen
+        
+        fresh = np.isfinite(diff)
+        self._sums += np.where(fresh, diff, 0.0)
+        self._sumsq += np.where(fresh, diff * diff, 0.0)
+        self._counts += fresh
+        self._ring[self._pos] = diff
+        self._pos = (self._pos + 1) % self.window
+        
+        # Re-sum from the ring once per lap so subtract/add rounding cannot accumulate
+        if self._pos == 0:
+            self._sums = np.nansum(self._ring, axis=0)
+            self._sumsq = np.nansum(self._ring ** 2, axis=0)
+            self._counts = np.isfinite(self._ring).sum(axis=0).astype(float)
+        
+        self.latest = diff
+        self.zscores = pairwise_zscores(self._sums, self._sumsq, self._counts, diff, self.min_obs)
+        return self.zscores
+    
+    def to_dict(self) -> Dict[str, Any]:
+        # Sums are re-derived from the ring on load
+        return {'venues': self.venues, 'pos': self._pos, 'ring': self._ring.tolist(),
+                'latest': self.latest.tolist(), 'zscores': self.zscores.tolist()}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], window: int, min_obs: int = 10) -> 'VenueDislocationTracker':
+        tracker = cls(window, min_obs)
+        ring = np.array(data['ring'], dtype=float).reshape(-1, len(data['venues']), len(data['venues']))
+        if len(ring) != window:
+            return tracker  # Window changed; start over
+        tracker.venues = list(data['venues'])
+        tracker._ring, tracker._pos = ring, data['pos']
+        tracker._sums = np.nansum(ring, axis=0)
+        tracker._sumsq = np.nansum(ring ** 2, axis=0)
+        tracker._counts = np.isfinite(ring).sum(axis=0).astype(float)
+        tracker.latest = np.array(data['latest'], dtype=float).reshape(tracker._sums.shape)
+        tracker.zscores = np.array(data['zscores'], dtype=float).reshape(tracker._sums.shape)
+        return tracker
+    
+    def max_abs_zscore(self) -> float:
+        finite = np.abs(self.zscores[np.isfinite(self.zscores)])
+        return float(finite.max()) if len(finite) else 0.0
+    
+    def top_pairs(self, n: int = 3) -> List[Tuple[str, str, float, float]]:
+        """(venue, other venue, differential, z-score) for the most dislocated pairs"""
+        i, j = np.triu_indices(len(self.venues), k=1)
+        z = self.zscores[i, j]
+        order = [k for k in np.argsort(-np.abs(np.nan_to_num(z))) if np.isfinite(z[k])][:n]
+        return [(self.venues[i[k]], self.venues[j[k]], float(self.latest[i[k], j[k]]), float(z[k])) for k in order]
+
+# ==============================
+# Options Analytics
+# ==============================
+# Normalized chain layout: one row per contract, prices in quote currency
+OPTIONS_CHAIN_COLUMNS = ['timestamp', 'exchange', 'expiry', 'strike', 'option_type',
+                         'mark_price', 'underlying_price', 'open_interest', 'volume']
+SECONDS_PER_YEAR = 365.0 * 24 * 3600
+
+def _norm_cdf(x: np.ndarray) -> np.ndarray:
+    """Standard normal CDF (Abramowitz-Stegun 26.2.17, |error| < 7.5e-8)"""
+    x = np.asarray(x, dtype=float)
+    t = 1.0 / (1.0 + 0.2316419 * np.abs(x))
+    poly = t * (0.319381530 + t * (-0.356563782 + t * (1.781477937 + t * (-1.821255978 + t * 1.330274429))))
+    upper = _norm_pdf(x) * poly
+    return np.where(x >= 0, 1.0 - upper, upper)
+
+def _norm_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * np.asarray(x, dtype=float) ** 2) / np.sqrt(2 * np.pi)
+
+def black76_price(forward, strike, years, sigma, is_call) -> np.ndarray:
+    """Undiscounted Black-76 option price, element-wise over arrays"""
+    sqrt_t = np.sqrt(years)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(forward / strike) + 0.5 * sigma ** 2 * years) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    call = forward * _norm_cdf(d1) - strike * _norm_cdf(d2)
+    return np.where(is_call, call, call - forward + strike)
+
+def black76_implied_vol(price, forward, strike, years, is_call,
+                        tol: float = 1e-9, max_iter: int = 60) -> np.ndarray:
+    """Solve Black-76 implied volatility for a whole chain at once.
+    
+    Newton steps on every contract together, falling back to bisection of a
+    per-contract bracket whenever a step leaves it (flat vega in the wings).
+    Prices outside the no-arbitrage bounds return NaN.
+    """
+    price, forward, strike, years = (np.asarray(a, dtype=float) for a in (price, forward, strike, years))
+    is_call = np.asarray(is_call, dtype=bool)
+    
+    intrinsic = np.where(is_call, np.maximum(forward - strike, 0.0), np.maximum(strike - forward, 0.0))
+    upper = np.where(is_call, forward, strike)
+    valid = (years > 0) & (price > intrinsic) & (price < upper)
+    
+    lo = np.full(price.shape, 1e-4)
+    hi = np.full(price.shape, 10.0)
+    # Brenner-Subrahmanyam ATM approximation as the starting point
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma = np.clip(np.sqrt(2 * np.pi / years) * price / forward, 0.05, 3.0)
+    sigma = np.where(valid, sigma, 0.5)
+    converged = ~valid
+    
+    for _ in range(max_iter):
+        diff = black76_price(forward, strike, years, sigma, is_call) - price
+        converged |= np.abs(diff) <= tol * price  # Relative, so far wings are solved too
+        if converged.all():
+            break
+        hi = np.where(diff > 0, sigma, hi)
+        lo = np.where(diff < 0, sigma, lo)
+        
+        sqrt_t = np.sqrt(years)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            d1 = (np.log(forward / strike) + 0.5 * sigma ** 2 * years) / (sigma * sqrt_t)
+            step = sigma - diff / (forward * _norm_pdf(d1) * sqrt_t)
+        bisect = ~np.isfinite(step) | (step <= lo) | (step >= hi)
+        sigma = np.where(converged, sigma, np.where(bisect, 0.5 * (lo + hi), step))
+    
+    return np.where(valid & (converged | (hi - lo < 1e-8)), sigma, np.nan)
+
+class OptionsChainAnalyzer:
+    """Turns a full option chain into per-expiry put/call, ATM IV and 25-delta skew"""
+    
+    def __init__(self, config: DerivativeConfig):
+        self.config = config
+    
+    @staticmethod
+    def load_fixture(path: str) -> pd.DataFrame:
+        """Read a stored chain snapshot in the normalized layout"""
+        chain = pd.read_csv(path)
+        for column in ('timestamp', 'expiry'):
+            chain[column] = pd.to_datetime(chain[column], utc=True, format='ISO8601')
+        return chain[OPTIONS_CHAIN_COLUMNS]
+    
+    def solve(self, chain: pd.DataFrame) -> pd.DataFrame:
+        """Add time to expiry, implied vol, forward delta and log-moneyness columns"""
+        chain = chain.copy()
+        years = (chain['expiry'] - chain['timestamp']).dt.total_seconds().to_numpy() / SECONDS_PER_YEAR
+        forward = chain['underlying_price'].to_numpy(dtype=float)
+        strike = chain['strike'].to_numpy(dtype=float)
+        is_call = (chain['option_type'] == 'call').to_numpy()
+        
+        iv = black76_implied_vol(chain['mark_price'].to_numpy(dtype=float), forward, strike, years, is_call)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            d1 = (np.log(forward / strike) + 0.5 * iv ** 2 * years) / (iv * np.sqrt(years))
+        
+        chain['years'] = years
+        chain['iv'] = iv
+        chain['delta'] = np.where(is_call, _norm_cdf(d1), _norm_cdf(d1) - 1.0)
+        chain['log_moneyness'] = np.log(strike / forward)
+        return chain
+    
+    @staticmethod
+    def _expiry_metrics(group: pd.DataFrame) -> Dict[str, float]:
+        calls = group['option_type'] == 'call'
+        call_oi = group.loc[calls, 'open_interest'].sum()
+        put_oi = group.loc[~calls, 'open_interest'].sum()
+        
+        # Out-of-the-money wings carry the liquid quotes for both the smile and the deltas
+        otm = group[(calls & (group['log_moneyness'] >= 0)) | (~calls & (group['log_moneyness'] < 0))]
+        otm = otm[np.isfinite(otm['iv'])].sort_values('log_moneyness')
+        k, iv = otm['log_moneyness'].to_numpy(), otm['iv'].to_numpy()
+        atm_iv = float(np.interp(0.0, k, iv)) if len(k) and k[0] <= 0 <= k[-1] else np.nan
+        
+        def iv_at_delta(wing: pd.DataFrame, target: float) -> float:
+            # Walk out from the money; a steep smile can turn |delta| back up in the far wing
+            abs_delta = wing['delta'].abs().to_numpy()
+            monotone = abs_delta <= np.minimum.accumulate(abs_delta)
+            delta, vols = abs_delta[monotone][::-1], wing['iv'].to_numpy()[monotone][::-1]
+            if not len(delta) or not delta[0] <= target <= delta[-1]:
+                return np.nan
+            return float(np.interp(target, delta, vols))
+        
+        puts, calls_otm = otm[otm['option_type'] == 'put'], otm[otm['option_type'] == 'call']
+        skew = iv_at_delta(puts.iloc[::-1], 0.25) - iv_at_delta(calls_otm, 0.25)
+        return {
+            'put_call_ratio': put_oi / call_oi if call_oi > 0 else np.nan,
+            'implied_volatility': atm_iv,
+            'skew': skew,
+            'total_volume': float(group['volume'].sum()),
+            'open_interest': float(call_oi + put_oi),
+        }
+    
+    def summarize(self, chain: pd.DataFrame) -> List[OptionsData]:
+        """One OptionsData record per listed expiry, stamped with the chain's quote time"""
+        chain = chain[chain['expiry'] - chain['timestamp'] >= pd.Timedelta(days=self.config.options_min_days)]
+        expiries = sorted(chain['expiry'].unique())[:self.config.options_max_expiries]
+        if not expiries:
+            return []
+        solved = self.solve(chain[chain['expiry'].isin(expiries)])
+        
+        timestamp = solved['timestamp'].max().to_pydatetime()
+        records = []
+        for expiry, group in solved.groupby('expiry'):
+            records.append(OptionsData(
+                timestamp=timestamp,
+                symbol=self.config.symbol,
+                exchange=str(group['exchange'].iloc[0]),
+                expiry=expiry.to_pydatetime(),
+                **self._expiry_metrics(group)
+            ))
+        return records
+
+# ==============================
+# Liquidation Stream
+# ==============================
+@dataclass
+class LiquidationEvent:
+    timestamp: datetime
+    exchange: str
+    side: str  # Position liquidated: 'long' or 'short'
+    price: float
+    amount: float  # Base currency
+    notional: float  # Quote currency
+
+LIQUIDATION_FEATURES = ("liq_long_notional", "liq_short_notional", "liq_imbalance", "liq_burst_zscore", "liq_cascade")
+
+def liquidation_window_features(long_buckets: np.ndarray, short_buckets: np.ndarray,
+                                cascade_zscore: float) -> Dict[str, np.ndarray]:
+    """Cascade features over windows of complete buckets (oldest first, last axis).
+    
+    Works on a single window or a stack of them, so the live aggregator and
+    the table engine share the same math.
+    """
+    long_buckets = np.asarray(long_buckets, dtype=float)
+    short_buckets = np.asarray(short_buckets, dtype=float)
+    long_total = long_buckets.sum(axis=-1)
+    short_total = short_buckets.sum(axis=-1)
+    total = long_total + short_total
+    
+    # Newest bucket against the rest of the window
+    notional = long_buckets + short_buckets
+    history = notional[..., :-1]
+    mean, std = history.mean(axis=-1), history.std(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        imbalance = np.where(total > 0, (short_total - long_total) / total, 0.0)
+        zscore = np.where(std > 0, (notional[..., -1] - mean) / std, 0.0)
+    side = np.sign(short_buckets[..., -1] - long_buckets[..., -1])
+    
+    return {
+        "liq_long_notional": long_total,
+        "liq_short_notional": short_total,
+        "liq_imbalance": imbalance,
+        "liq_burst_zscore": zscore,
+        "liq_cascade": np.where(zscore >= cascade_zscore, side, 0.0),
+    }
+
+class LiquidationAggregator:
+    """Streaming long/short liquidation notional in a ring of time buckets.
+    
+    `add` is O(1) per event (amortized over bucket rollovers), so feeds can
+    push every event as it arrives; features read the last
+    `window_buckets` complete buckets. Thread-safe.
+    """
+    
+    def __init__(self, bucket_seconds: int, window_buckets: int):
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = window_buckets
+        self.size = window_buckets + 1  # Complete window plus the bucket being filled
+        self._long = [0.0] * self.size
+        self._short = [0.0] * self.size
+        self._events = [0] * self.size
+        self._head: Optional[int] = None  # Newest bucket id
+        self._drained: Optional[int] = None  # Newest bucket id already handed to storage
+        self.late_events = 0
+        self._lock = threading.Lock()
+    
+    def _bucket(self, timestamp: datetime) -> int:
+        return int(timestamp.timestamp() // self.bucket_seconds)
+    
+    def _advance(self, bucket: int):
+        """Move the head forward, clearing the slots it passes (lock held)"""
+        if self._head is None:
+            self._head = bucket
+            return
+        for b in range(max(self._head + 1, bucket - self.size + 1), bucket + 1):
+            slot = b % self.size
+            self._long[slot] = self._short[slot] = 0.0
+            self._events[slot] = 0
+        self._head = bucket
+    
+    def add(self, event: LiquidationEvent):
+        bucket = self._bucket(event.timestamp)
+        with self._lock:
+            if self._head is None or bucket > self._head:
+                self._advance(bucket)
+            elif bucket <= self._head - self.size:
+                self.late_events += 1
+                return
+            slot = bucket % self.size
+            if event.side == 'long':
+                self._long[slot] += event.notional
+            else:
+                self._short[slot] += event.notional
+            self._events[slot] += 1
+    
+    def _complete_window(self, now: datetime) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+        """Complete buckets ending just before `now`'s bucket, oldest first (lock held)"""
+        current = self._bucket(now)
+        if self._head is None or current > self._head:
+            self._advance(current)
+        ids = np.arange(current - self.window_buckets, current)
+        slots = ids % self.size
+        # If `now` trails the newest event, older slots already hold newer buckets
+        live = ids > self._head - self.size
+        return (current, ids, np.where(live, np.asarray(self._long)[slots], 0.0),
+                np.where(live, np.asarray(self._short)[slots], 0.0))
+    
+    def features(self, now: Optional[datetime] = None, cascade_zscore: float = 3.0) -> Dict[str, float]:
+        with self._lock:
+            _, _, long_buckets, short_buckets = self._complete_window(now or datetime.now(timezone.utc))
+        return {name: float(value) for name, value in
+                liquidation_window_features(long_buckets, short_buckets, cascade_zscore).items()}
+    
+    def drain_completed(self, now: Optional[datetime] = None) -> pd.DataFrame:
+        """Non-empty complete buckets not yet drained, for the 'liquidations' partition"""
+        with self._lock:
+            current, ids, long_buckets, short_buckets = self._complete_window(now or datetime.now(timezone.utc))
+            events = np.where(ids > self._head - self.size, np.asarray(self._events)[ids % self.size], 0)
+            fresh = ids > (self._drained if self._drained is not None else -1)
+            self._drained = current - 1
+        
+        keep = fresh & (events > 0)
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(ids[keep] * self.bucket_seconds, unit='s', utc=True),
+            'long_notional': long_buckets[keep],
+            'short_notional': short_buckets[keep],
+            'events': events[keep].astype(float),
+        })
+    
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'bucket_seconds': self.bucket_seconds, 'size': self.size,
+                    'long': list(self._long), 'short': list(self._short), 'events': list(self._events),
+                    'head': self._head, 'drained': self._drained}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], bucket_seconds: int, window_buckets: int) -> 'LiquidationAggregator':
+        aggregator = cls(bucket_seconds, window_buckets)
+        if data['bucket_seconds'] != bucket_seconds or data['size'] != aggregator.size:
+            return aggregator  # Bucketing changed; start over
+        aggregator._long, aggregator._short = list(data['long']), list(data['short'])
+        aggregator._events = list(data['events'])
+        aggregator._head, aggregator._drained = data['head'], data['drained']
+        return aggregator
+
+class LiquidationReplayFeed:
+    """Local stand-in feed: replays a recorded event file into an aggregator"""
+    
+    def __init__(self, config: DerivativeConfig, aggregator: LiquidationAggregator):
+        self.config = config
+        self.aggregator = aggregator
+        self.running = False
+    
+    def load_events(self) -> List[LiquidationEvent]:
+        """Events from the replay file, shifted so the last one lands now"""
+        df = pd.read_csv(self.config.liquidation_replay_file)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True, format='ISO8601')
+        df['timestamp'] += pd.Timestamp.now(tz='UTC') - df['timestamp'].max()
+        df['notional'] = df['price'] * df['amount']
+        return [LiquidationEvent(**r) for r in df[list(LiquidationEvent.__dataclass_fields__)].to_dict('records')]
+    
+    def start(self):
+        events = self.load_events()
+        if self.config.liquidation_replay_speed <= 0:
+            for event in events:
+                self.aggregator.add(event)
+            print(f"🔁 Replayed {len(events)} liquidation events")
+            return
+        
+        def replay_loop():
+            # Replay with the recorded gaps, restamped to wall-clock time
+            speed = self.config.liquidation_replay_speed
+            previous = events[0].timestamp if events else None
+            for event in events:
+                if not self.running:
+                    break
+                time.sleep(max(0.0, (event.timestamp - previous).total_seconds() / speed))
+                previous = event.timestamp
+                event.timestamp = datetime.now(timezone.utc)
+                self.aggregator.add(event)
+        
+        self.running = True
+        threading.Thread(target=replay_loop, daemon=True).start()
+    
+    def stop(self):
+        self.running = False
+
+class LiquidationStreamFeed:
+    """Websocket liquidation feed (ccxt.pro watch_liquidations) on a background event loop"""
+    
+    # Venues whose 'side' is the liquidated position; the rest report the closing order side
+    POSITION_SIDE_VENUES = {'bybit'}
+    
+    def __init__(self, config: DerivativeConfig, aggregator: LiquidationAggregator):
+        self.config = config
+        self.aggregator = aggregator
+        self.running = False
+        self._ccxtpro = None
+    
+    def _to_event(self, name: str, liquidation: Dict[str, Any]) -> LiquidationEvent:
+        side = (liquidation.get('side') or '').lower()
+        if name in self.POSITION_SIDE_VENUES:
+            position = 'long' if side == 'buy' else 'short'
+        else:
+            position = 'long' if side == 'sell' else 'short'
+        
+        price = liquidation.get('price') or 0.0
+        amount = (liquidation.get('contracts') or 0.0) * (liquidation.get('contractSize') or 1.0)
+        return LiquidationEvent(
+            timestamp=datetime.fromtimestamp(liquidation['timestamp'] / 1000, tz=timezone.utc),
+            exchange=name,
+            side=position,
+            price=price,
+            amount=amount,
+            notional=liquidation.get('quoteValue') or price * amount
+        )
+    
+    async def _watch(self, name: str):
+        exchange = getattr(self._ccxtpro, name)()
+        try:
+            while self.running:
+                try:
+                    liquidations = await exchange.watch_liquidations(self.config.liquidation_symbol)
+                except Exception as e:
+                    print(f"❌ {name} liquidation stream error: {e}")
+                    await asyncio.sleep(5)
+                    continue
+                for liquidation in liquidations:
+                    if liquidation.get('timestamp'):
+                        self.aggregator.add(self._to_event(name, liquidation))
+        finally:
+            await exchange.close()
+    
+    async def _watch_all(self):
+        await asyncio.gather(*(self._watch(name) for name in self.config.liquidation_exchanges))
+    
+    def start(self):
+        # ccxt.pro is only needed (and imported) when the websocket source is selected
+        import ccxt.pro as ccxtpro
+        self._ccxtpro = ccxtpro
+        self.running = True
+        threading.Thread(target=lambda: asyncio.run(self._watch_all()), daemon=True).start()
+        print(f"📡 Liquidation stream started: {', '.join(self.config.liquidation_exchanges)}")
+    
+    def stop(self):
+        self.running = False
+
+# ==============================
+# Term Structure
+# ==============================
+TERM_FEATURE_DEFAULTS = {"term_front_basis": 0.0, "term_back_basis": 0.0, "term_slope": 0.0}
+
+def build_term_structure(quotes: pd.DataFrame, spot_prices: Dict[str, float],
+                         timestamp: datetime, symbol: str) -> List[TermStructureData]:
+    """Basis and annualized carry for a batch of dated-futures quotes, column-wise"""
+    quotes = quotes[quotes['exchange'].isin(spot_prices.keys())]
+    if quotes.empty:
+        return []
+    spot = quotes['exchange'].map(spot_prices).astype(float)
+    price = quotes['futures_price'].astype(float)
+    days = (quotes['expiry'] - pd.Timestamp(timestamp)).dt.total_seconds() / 86400.0
+    
+    curve = pd.DataFrame({
+        'timestamp': timestamp,
+        'symbol': symbol,
+        'exchange': quotes['exchange'],
+        'contract': quotes['contract'],
+        'expiry': quotes['expiry'],
+        'futures_price': price,
+        'spot_price': spot,
+        'basis': price / spot - 1.0,
+        'days_to_expiry': days,
+        'annualized_basis': np.log(price / spot) / (days / 365.0),
+    })
+    curve = curve[(price > 0) & (days > 0)].sort_values(['exchange', 'expiry'])
+    return [TermStructureData(**r) for r in curve.to_dict('records')]
+
+def term_structure_features(contracts: pd.DataFrame, min_days: float) -> pd.DataFrame:
+    """Front/back annualized basis and curve slope per 'cycle', pooled across venues"""
+    rows = contracts[contracts['days_to_expiry'] >= min_days]
+    years = rows['days_to_expiry'] / 365.0
+    carry = rows['annualized_basis']
+    grouped = pd.DataFrame({'cycle': rows['cycle'], 'x': years, 'y': carry, 'xy': years * carry,
+                            'xx': years * years}).groupby('cycle')
+    sums, n = grouped.sum(), grouped.size()
+    
+    # Least-squares slope of annualized basis on maturity from running sums
+    denom = n * sums['xx'] - sums['x'] ** 2
+    slope = ((n * sums['xy'] - sums['x'] * sums['y']) / denom).where(denom > 1e-12, 0.0)
+    
+    by_cycle = rows.groupby('cycle')['expiry']
+    front = rows[rows['expiry'] == by_cycle.transform('min')].groupby('cycle')['annualized_basis'].mean()
+    back = rows[rows['expiry'] == by_cycle.transform('max')].groupby('cycle')['annualized_basis'].mean()
+    return pd.DataFrame({'term_front_basis': front, 'term_back_basis': back, 'term_slope': slope})
+
+def calendar_spread_matrix(contracts: pd.DataFrame, min_days: float) -> pd.DataFrame:
+    """Annualized carry implied between every pair of expiries (row = near, column = far)"""
+    rows = contracts[contracts['days_to_expiry'] >= min_days]
+    curve = rows.assign(log_price=np.log(rows['futures_price'])).groupby('expiry')[['log_price', 'days_to_expiry']].mean()
+    if len(curve) < 2:
+        return pd.DataFrame()
+    log_price = curve['log_price'].to_numpy()
+    years = curve['days_to_expiry'].to_numpy() / 365.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spreads = np.subtract.outer(log_price, log_price).T / np.subtract.outer(years, years).T
+    spreads[np.tril_indices(len(curve))] = np.nan
+    labels = [e.strftime('%d%b%y').upper() for e in curve.index]
+    return pd.DataFrame(spreads, index=labels, columns=labels)
+
 # ==============================
 # Data Collection
 # ==============================
@@ -124,11 +909,43 @@ class DerivativeCollector:
     def __init__(self, config: DerivativeConfig):
         self.config = config
         self.exchanges = self._init_exchanges()
-        self.futures_buffer = deque(maxlen=config.max_data_points)
-        self.funding_buffer = deque(maxlen=config.max_data_points)
-        self.options_buffer = deque(maxlen=config.max_data_points)
+        # One row per venue per cycle, so size the buffers in cycles
+        buffer_rows = config.max_data_points * len(self.exchanges)
+        self.futures_buffer = deque(maxlen=buffer_rows)
+        self.funding_buffer = deque(maxlen=buffer_rows)
+        self.options_buffer = deque(maxlen=config.max_data_points * config.options_max_expiries)
+        self.options_analyzer = OptionsChainAnalyzer(config)
+        self._options_exchange = None  # Loaded on first use, see options_exchange
         self.features_history = deque(maxlen=config.max_data_points)
+        retention = index_retention(config)
+        self.futures_index = VenueTimeSeries(FUTURES_INDEX_FIELDS, retention)
+        self.funding_index = VenueTimeSeries(FUNDING_INDEX_FIELDS, retention)
+        self.latest_futures: List[FuturesData] = []
+        self.latest_funding: List[FundingRateData] = []
+        self.latest_options: List[OptionsData] = []
+        self.latest_term_structure: List[TermStructureData] = []
+        self._dated_contracts: Dict[str, Dict[str, List[str]]] = {}
         self.running = False
+    
+    @property
+    def options_exchange(self):
+        """Options venue, created on the first chain fetch (retried on later ones if it failed)"""
+        if self._options_exchange is None:
+            self._options_exchange = self._init_options_exchange()
+        return self._options_exchange
+    
+    def _init_options_exchange(self):
+        """Options venue (market metadata maps instruments to strike/expiry/type)"""
+        if not self.config.options_enabled or self.config.options_source != 'exchange':
+            return None
+        try:
+            exchange = getattr(ccxt, self.config.options_exchange)()
+            exchange.load_markets()
+            print(f"✓ {self.config.options_exchange} options initialized")
+            return exchange
+        except Exception as e:
+            print(f"❌ Failed to initialize {self.config.options_exchange} options: {e}")
+            return None
         
     def _init_exchanges(self) -> List[Dict[str, Any]]:
         """Initialize exchanges with derivative support"""
@@ -233,6 +1050,50 @@ class DerivativeCollector:
                 
         return futures_data
     
+    def _list_dated_contracts(self, exchange) -> Dict[str, List[str]]:
+        """Live dated futures on the symbol's base, grouped by margin type for bulk tickers"""
+        base = self.config.symbol.split('/')[0]
+        now_ms = time.time() * 1000
+        groups: Dict[str, List[str]] = {}
+        for symbol, market in exchange.markets.items():
+            if market.get('future') and market.get('base') == base and (market.get('expiry') or 0) > now_ms \
+                    and market.get('active') is not False:
+                groups.setdefault('linear' if market.get('linear') else 'inverse', []).append(symbol)
+        return groups
+    
+    def fetch_term_structure(self, spot_prices: Dict[str, float]) -> List[TermStructureData]:
+        """Quote every listed dated future per venue with bulk ticker requests"""
+        quotes = []
+        for ex_info in self.exchanges:
+            name, exchange = ex_info['name'], ex_info['exchange']
+            if name not in spot_prices:
+                continue
+            try:
+                # Relist once a cached contract has expired (also picks up new listings)
+                contracts = self._dated_contracts.get(name)
+                if contracts is None or any(exchange.markets[c]['expiry'] <= time.time() * 1000
+                                            for group in contracts.values() for c in group):
+                    if contracts is not None:
+                        exchange.load_markets(reload=True)
+                    contracts = self._dated_contracts[name] = self._list_dated_contracts(exchange)
+                
+                for symbols in contracts.values():
+                    tickers = exchange.fetch_tickers(symbols)
+                    for contract, ticker in tickers.items():
+                        price = ticker.get('last') or ticker.get('close')
+                        if price and contract in exchange.markets:
+                            quotes.append((name, contract, exchange.markets[contract]['expiry'], float(price)))
+            except Exception as e:
+                print(f"❌ {name} term structure fetch failed: {e}")
+        
+        if not quotes:
+            return []
+        df = pd.DataFrame(quotes, columns=['exchange', 'contract', 'expiry', 'futures_price'])
+        df['expiry'] = pd.to_datetime(df['expiry'], unit='ms', utc=True)
+        term_data = build_term_structure(df, spot_prices, datetime.now(timezone.utc), self.config.symbol)
+        print(f"📐 Term structure: {len(term_data)} dated contracts across {df['exchange'].nunique()} venues")
+        return term_data
+    
     def fetch_funding_rates(self) -> List[FundingRateData]:
         """Fetch funding rates from available exchanges"""
         funding_data = []
@@ -294,36 +1155,372 @@ class DerivativeCollector:
                 
         return funding_data
     
+    def fetch_options_chain(self) -> pd.DataFrame:
+        """Fetch the whole option chain in one request, in the normalized layout"""
+        if self.config.options_source == 'fixture':
+            # Restamp the snapshot to now (keeping time to expiry), so each cycle stores a fresh chain
+            chain = self.options_analyzer.load_fixture(self.config.options_fixture_file)
+            shift = pd.Timestamp.now(tz='UTC') - chain['timestamp'].max()
+            return chain.assign(timestamp=chain['timestamp'] + shift, expiry=chain['expiry'] + shift)
+        
+        exchange = self.options_exchange
+        if exchange is None:
+            return pd.DataFrame(columns=OPTIONS_CHAIN_COLUMNS)
+        
+        chain = exchange.fetch_option_chain(self.config.options_currency)
+        rows = []
+        for symbol, quote in chain.items():
+            market = exchange.markets.get(symbol)
+            if not market or market.get('strike') is None or not market.get('expiry'):
+                continue
+            rows.append((market['expiry'], market['strike'], market['optionType'],
+                         quote.get('markPrice'), quote.get('underlyingPrice'),
+                         quote.get('openInterest'), quote.get('baseVolume'),
+                         market.get('settle') == market.get('base')))
+        
+        df = pd.DataFrame(rows, columns=['expiry', 'strike', 'option_type', 'mark_price',
+                                         'underlying_price', 'open_interest', 'volume', 'inverse'])
+        df[['mark_price', 'underlying_price', 'open_interest', 'volume']] = \
+            df[['mark_price', 'underlying_price', 'open_interest', 'volume']].astype(float).fillna(0.0)
+        # Coin-settled venues quote premiums in the underlying
+        df['mark_price'] = np.where(df['inverse'], df['mark_price'] * df['underlying_price'], df['mark_price'])
+        df['expiry'] = pd.to_datetime(df['expiry'], unit='ms', utc=True)
+        df['timestamp'] = pd.Timestamp.now(tz='UTC')
+        df['exchange'] = self.config.options_exchange
+        return df[OPTIONS_CHAIN_COLUMNS]
+    
     def fetch_options_data(self) -> List[OptionsData]:
-        """Fetch options data from available exchanges - Currently disabled"""
-        # Options data collection disabled - requires account setup for real data
-        # and mock data was not providing value
-        print("📈 Options data collection disabled - requires account setup")
-        return []
+        """Fetch the option chain and reduce it to per-expiry metrics"""
+        if not self.config.options_enabled:
+            return []
+        try:
+            chain = self.fetch_options_chain()
+            options_data = self.options_analyzer.summarize(chain)
+            for o in options_data[:3]:
+                print(f"📈 {o.exchange} {o.expiry:%d%b%y}: IV {o.implied_volatility:.1%}, "
+                      f"25d skew {o.skew:+.2%}, P/C {o.put_call_ratio:.2f}")
+            return options_data
+        except Exception as e:
+            print(f"❌ Options fetch failed: {e}")
+            return []
     
     def collect_data(self):
         """Collect all derivative data"""
         try:
             # Fetch futures data
             futures_data = self.fetch_futures_data()
+            self.latest_futures = futures_data
             if futures_data:
                 self.futures_buffer.extend(futures_data)
+                self.futures_index.extend(futures_data)
                 print(f"📊 Futures collected: {len(futures_data)} exchanges")
             
+            # Fetch dated futures, priced against this cycle's spot per venue
+            if self.config.term_structure_enabled:
+                self.latest_term_structure = self.fetch_term_structure({f.exchange: f.spot_price for f in futures_data})
+            
             # Fetch funding rates
             funding_data = self.fetch_funding_rates()
+            self.latest_funding = funding_data
             if funding_data:
                 self.funding_buffer.extend(funding_data)
+                self.funding_index.extend(funding_data)
                 print(f"💰 Funding rates collected: {len(funding_data)} exchanges")
             
-            # Skip options data collection (disabled)
-            # options_data = self.fetch_options_data()
-            # if options_data:
-            #     self.options_buffer.extend(options_data)
-            #     print(f"📈 Options collected: {len(options_data)} exchanges")
+            # Fetch options chain summary
+            options_data = self.fetch_options_data()
+            self.latest_options = options_data
+            if options_data:
+                self.options_buffer.extend(options_data)
+                print(f"📈 Options collected: {len(options_data)} expiries")
             
         except Exception as e:
             print(f"❌ Derivative data collection error: {e}")
+    
+    def seed_buffers(self, futures_df: pd.DataFrame, funding_df: pd.DataFrame):
+        """Pre-fill the rolling buffers from typed history frames (oldest first)"""
+        # Skip rows a restored checkpoint already holds
+        if self.futures_buffer:
+            futures_df = futures_df[futures_df['timestamp'] > pd.Timestamp(self.futures_buffer[-1].timestamp)]
+        if self.funding_buffer:
+            funding_df = funding_df[funding_df['timestamp'] > pd.Timestamp(self.funding_buffer[-1].timestamp)]
+        
+        futures_df = futures_df.tail(self.futures_buffer.maxlen).fillna({'volume_change_24h': 0.0, 'open_interest': 0.0, 'volume_24h': 0.0})
+        futures = [FuturesData(**record) for record in futures_df.to_dict('records')]
+        self.futures_buffer.extend(futures)
+        self.futures_index.extend(futures)
+        
+        funding_df = funding_df.tail(self.funding_buffer.maxlen)
+        funding_df = funding_df.assign(predicted_funding_rate=funding_df['predicted_funding_rate'].fillna(funding_df['funding_rate']))
+        funding = [FundingRateData(**record) for record in funding_df.to_dict('records')]
+        self.funding_buffer.extend(funding)
+        self.funding_index.extend(funding)
+        
+        print(f"🌡️  Buffers seeded: {len(self.futures_buffer)} futures, {len(self.funding_buffer)} funding rows")
+
+# ==============================
+# Historical Backfill
+# ==============================
+class DerivativeBackfiller:
+    """Pages venue history endpoints into partitioned storage.
+    
+    Each (venue, stream) pair keeps a cursor with the last timestamp written, so
+    an interrupted run resumes where it stopped and a warm restart only fetches
+    the gap since the previous run. Venues are backfilled concurrently; calls to
+    a single venue stay sequential so ccxt's per-exchange rate limiter applies.
+    """
+    
+    def __init__(self, config: DerivativeConfig, exchanges: List[Dict[str, Any]],
+                 storage: 'DerivativeDataStorage'):
+        self.config = config
+        self.exchanges = exchanges
+        self.storage = storage
+        self.perp_symbol = f"{config.symbol}:USDT"
+        self._cursor_lock = threading.Lock()
+        self.cursors = self._load_cursors()
+    
+    def _load_cursors(self) -> Dict[str, int]:
+        if not os.path.exists(self.config.backfill_cursor_file):
+            return {}
+        try:
+            with open(self.config.backfill_cursor_file, 'r') as f:
+                return {k: int(v) for k, v in json.load(f).items()}
+        except Exception as e:
+            print(f"⚠️  Could not read backfill cursors, starting fresh: {e}")
+            return {}
+    
+    def _advance_cursor(self, key: str, last_ms: int):
+        """Record progress for one stream and persist it immediately"""
+        with self._cursor_lock:
+            self.cursors[key] = max(self.cursors.get(key, 0), int(last_ms))
+            os.makedirs(os.path.dirname(self.config.backfill_cursor_file), exist_ok=True)
+            tmp_path = self.config.backfill_cursor_file + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.cursors, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.config.backfill_cursor_file)
+    
+    def _start_ms(self, key: str, now_ms: int) -> int:
+        window_start = now_ms - self.config.backfill_hours * 3600 * 1000
+        return max(window_start, self.cursors.get(key, 0) + 1)
+    
+    def _pages(self, fetch, since_ms: int, now_ms: int, ts_of=lambda row: row['timestamp']):
+        """Yield successive history pages until the venue has nothing newer"""
+        while since_ms < now_ms:
+            page = fetch(since_ms)
+            if not page:
+                break
+            yield page
+            last_ms = ts_of(page[-1])
+            if last_ms is None or last_ms < since_ms:
+                break
+            since_ms = last_ms + 1
+            if len(page) < self.config.backfill_page_limit:
+                break
+    
+    def _backfill_funding(self, ex_info: Dict[str, Any], now_ms: int) -> int:
+        exchange = ex_info['exchange']
+        if not exchange.has.get('fetchFundingRateHistory'):
+            return 0
+        
+        key = f"{ex_info['name']}:funding"
+        limit = self.config.backfill_page_limit
+        fetch = lambda since: exchange.fetch_funding_rate_history(self.perp_symbol, since=since, limit=limit)
+        written = 0
+        
+        for page in self._pages(fetch, self._start_ms(key, now_ms), now_ms):
+            df = pd.DataFrame({
+                'timestamp': pd.to_datetime([r['timestamp'] for r in page], unit='ms', utc=True),
+                'rate': [float(r.get('fundingRate') or 0.0) for r in page],
+            })
+            # Historical rows are settlements; the next settlement is the following row
+            interval = df['timestamp'].diff().median() if len(df) > 1 else pd.Timedelta(hours=8)
+            next_funding = df['timestamp'].shift(-1).fillna(df['timestamp'] + interval)
+            
+            records = [
+                FundingRateData(
+                    timestamp=ts.to_pydatetime(),
+                    symbol=self.config.symbol,
+                    exchange=ex_info['name'],
+                    funding_rate=rate,
+                    funding_rate_percent=rate * 100,
+                    next_funding_time=nxt.to_pydatetime(),
+                    predicted_funding_rate=rate
+                )
+                for ts, rate, nxt in zip(df['timestamp'], df['rate'], next_funding)
+            ]
+            self.storage.save_partitioned('funding', records)
+            self._advance_cursor(key, page[-1]['timestamp'])
+            written += len(records)
+        
+        return written
+    
+    def _fetch_ohlcv_frame(self, exchange, symbol: str, since_ms: int) -> pd.DataFrame:
+        rows = exchange.fetch_ohlcv(symbol, timeframe=self.config.backfill_timeframe,
+                                    since=since_ms, limit=self.config.backfill_page_limit)
+        df = pd.DataFrame(rows, columns=['ts', 'open', 'high', 'low', 'close', 'volume'])
+        return df[['ts', 'close', 'volume']]
+    
+    def _backfill_futures(self, ex_info: Dict[str, Any], now_ms: int) -> int:
+        exchange = ex_info['exchange']
+        key = f"{ex_info['name']}:futures"
+        has_oi_history = bool(exchange.has.get('fetchOpenInterestHistory'))
+        bars_per_day = int(pd.Timedelta(days=1) / pd.Timedelta(self.config.backfill_timeframe))
+        since_ms = self._start_ms(key, now_ms)
+        
+        # Fetch one extra day of perp bars so the first rows get a full 24h volume
+        warmup_ms = int(pd.Timedelta(days=1).total_seconds() * 1000)
+        carry = self._fetch_ohlcv_frame(exchange, self.perp_symbol, since_ms - warmup_ms)
+        carry = carry[carry['ts'] < since_ms].tail(bars_per_day)
+        
+        fetch = lambda since: self._fetch_ohlcv_frame(exchange, self.perp_symbol, since).values.tolist()
+        written = 0
+        
+        for page in self._pages(fetch, since_ms, now_ms, ts_of=lambda row: int(row[0])):
+            perp = pd.DataFrame(page, columns=['ts', 'close', 'volume']).astype({'ts': 'int64'})
+            spot = self._fetch_ohlcv_frame(exchange, self.config.symbol, int(perp['ts'].iloc[0]))
+            
+            bars = perp.merge(spot, on='ts', suffixes=('_perp', '_spot'))
+            if bars.empty:
+                break
+            
+            # Rolling 24h quote volume over the carried tail plus this page
+            volume = pd.concat([carry, perp])
+            volume = volume.assign(quote=volume['close'] * volume['volume']).drop_duplicates('ts').set_index('ts')['quote']
+            bars['volume_24h'] = bars['ts'].map(volume.rolling(bars_per_day, min_periods=1).sum())
+            
+            bars['open_interest'] = 0.0
+            if has_oi_history:
+                try:
+                    oi_rows = exchange.fetch_open_interest_history(
+                        self.perp_symbol, timeframe=self.config.backfill_timeframe,
+                        since=int(bars['ts'].iloc[0]), limit=self.config.backfill_page_limit)
+                    oi = pd.DataFrame({
+                        'ts': [int(r['timestamp']) for r in oi_rows],
+                        'oi': [float(r.get('openInterestAmount') or r.get('openInterestValue') or 0.0) for r in oi_rows],
+                    }).sort_values('ts')
+                    if not oi.empty:
+                        bars = pd.merge_asof(bars.sort_values('ts'), oi, on='ts', direction='backward')
+                        bars['open_interest'] = bars['oi'].fillna(0.0)
+                except Exception as e:
+                    print(f"⚠ {ex_info['name']} OI history unavailable: {e}")
+            
+            bars['basis'] = (bars['close_perp'] - bars['close_spot']) / bars['close_spot']
+            timestamps = pd.to_datetime(bars['ts'], unit='ms', utc=True)
+            records = [
+                FuturesData(
+                    timestamp=ts.to_pydatetime(),
+                    symbol=self.config.symbol,
+                    exchange=ex_info['name'],
+                    futures_price=float(row.close_perp),
+                    spot_price=float(row.close_spot),
+                    basis=float(row.basis),
+                    basis_percent=float(row.basis) * 100,
+                    open_interest=float(row.open_interest),
+                    volume_24h=float(row.volume_24h),
+                    volume_change_24h=0.0
+                )
+                for ts, row in zip(timestamps, bars.itertuples(index=False))
+            ]
+            self.storage.save_partitioned('futures', records)
+            # Perp bars without a spot bar yet are refetched next run
+            self._advance_cursor(key, int(bars['ts'].iloc[-1]))
+            written += len(records)
+            carry = pd.concat([carry, perp]).tail(bars_per_day)
+        
+        return written
+    
+    def backfill_venue(self, ex_info: Dict[str, Any]) -> Dict[str, int]:
+        """Backfill every stream for one venue; failures stay local to the stream"""
+        ex_info['exchange'].enableRateLimit = True
+        now_ms = int(time.time() * 1000)
+        result = {}
+        for stream, enabled, runner in [
+            ('futures', ex_info['has_futures'], self._backfill_futures),
+            ('funding', ex_info['has_funding'], self._backfill_funding),
+        ]:
+            if not enabled:
+                continue
+            try:
+                result[stream] = runner(ex_info, now_ms)
+            except Exception as e:
+                print(f"❌ {ex_info['name']} {stream} backfill failed: {e}")
+                result[stream] = 0
+        return result
+    
+    def run(self) -> Dict[str, Dict[str, int]]:
+        """Backfill all venues concurrently"""
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=max(1, len(self.exchanges))) as pool:
+            futures = {ex_info['name']: pool.submit(self.backfill_venue, ex_info) for ex_info in self.exchanges}
+            results = {name: future.result() for name, future in futures.items()}
+        
+        total = sum(sum(r.values()) for r in results.values())
+        print(f"⏪ Backfilled {total} history rows across {len(results)} venues in {time.time() - start:.1f}s")
+        return results
+
+# ==============================
+# Composite State
+# ==============================
+@dataclass
+class EwmaStat:
+    """Exponentially weighted mean and variance, one observation at a time"""
+    mean: float = 0.0
+    var: float = 0.0
+    count: int = 0
+    
+    def update(self, value: float, alpha: float, min_obs: int) -> float:
+        """Fold in a value; returns its z-score against the state before it"""
+        if self.count == 0:
+            self.mean, self.count = value, 1
+            return 0.0
+        delta = value - self.mean
+        zscore = delta / np.sqrt(self.var) if self.count >= min_obs and self.var > 0 else 0.0
+        self.mean += alpha * delta
+        self.var = (1 - alpha) * (self.var + alpha * delta * delta)
+        self.count += 1
+        return float(zscore)
+
+class CompositeFeatureState:
+    """Running EWMA state for the composite scores (O(1) per observation).
+    
+    The decay is time-based: the weight of an observation halves every
+    `halflife_minutes` however often cycles run.
+    """
+    
+    TRACKED = {"derivative_sentiment": "sentiment", "market_structure_score": "structure"}
+    
+    def __init__(self, halflife_minutes: float, min_obs: int = 5):
+        self.halflife_seconds = halflife_minutes * 60
+        self.min_obs = min_obs
+        self.stats = {name: EwmaStat() for name in self.TRACKED}
+        self.last_update: Optional[datetime] = None
+    
+    def update(self, composite_features: Dict[str, float], timestamp: datetime) -> Dict[str, float]:
+        elapsed = (timestamp - self.last_update).total_seconds() if self.last_update else 0.0
+        alpha = 1.0 - np.exp(-np.log(2) * max(elapsed, 0.0) / self.halflife_seconds)
+        self.last_update = timestamp
+        
+        features = {}
+        for name, prefix in self.TRACKED.items():
+            stat = self.stats[name]
+            features[f"{prefix}_zscore"] = stat.update(float(composite_features[name]), alpha, self.min_obs)
+            features[f"{prefix}_ewma"] = stat.mean
+        return features
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'last_update': self.last_update.isoformat() if self.last_update else None,
+            'stats': {name: asdict(stat) for name, stat in self.stats.items()},
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], halflife_minutes: float, min_obs: int = 5) -> 'CompositeFeatureState':
+        state = cls(halflife_minutes, min_obs)
+        state.last_update = datetime.fromisoformat(data['last_update']) if data.get('last_update') else None
+        for name, values in data.get('stats', {}).items():
+            if name in state.stats:
+                state.stats[name] = EwmaStat(**values)
+        return state
 
 # ==============================
 # Feature Engineering
@@ -331,10 +1528,13 @@ class DerivativeCollector:
 class DerivativeFeatureEngine:
     def __init__(self, config: DerivativeConfig):
         self.config = config
-        self.feature_history = deque(maxlen=config.max_data_points)
+        self.composite_state = CompositeFeatureState(config.composite_halflife_minutes, config.composite_min_obs)
+        self.basis_dislocations = VenueDislocationTracker(config.dislocation_window, config.dislocation_min_obs)
+        self.funding_dislocations = VenueDislocationTracker(config.dislocation_window, config.dislocation_min_obs)
     
     def calculate_futures_features(self, futures_data: List[FuturesData], 
-                                 recent_futures: List[FuturesData]) -> Dict[str, float]:
+                                 recent_futures: List[FuturesData],
+                                 futures_index: Optional[VenueTimeSeries] = None) -> Dict[str, float]:
         """Calculate futures-based features"""
         if not futures_data:
             return {
@@ -342,44 +1542,33 @@ class DerivativeFeatureEngine:
                 "oi_change_24h": 0.0, "oi_momentum": 0.0, "volume_ratio": 0.0
             }
         
+        # Momentum is measured per venue, never across interleaved exchanges
+        if futures_index is None:
+            futures_index = VenueTimeSeries.from_records(recent_futures, FUTURES_INDEX_FIELDS, index_retention(self.config))
+        
         # Average basis across exchanges
         basis_values = [f.basis for f in futures_data]
         avg_basis = np.mean(basis_values)
         
-        # Basis volatility (use historical data if only 1 exchange)
+        # Basis volatility (use the venue's own history if only 1 exchange)
         if len(basis_values) > 1:
             basis_volatility = np.std(basis_values)
         else:
-            # Use recent historical basis data for volatility calculation
-            recent_basis = [f.basis for f in recent_futures[-10:] if hasattr(f, 'basis')]
+            recent_basis = futures_index.window('basis', futures_data[0].exchange, 10)
             basis_volatility = np.std(recent_basis) if len(recent_basis) > 1 else 0.0
         
-        # Basis momentum (change over time)
-        if len(recent_futures) > 1:
-            recent_basis = [f.basis for f in recent_futures[-10:]]  # Last 10 data points
-            basis_momentum = np.mean(np.diff(recent_basis)) if len(recent_basis) > 1 else 0.0
-        else:
-            basis_momentum = 0.0
+        # Basis momentum (change over each venue's last 10 data points)
+        basis_momentum = futures_index.momentum('basis', 10)
         
-        # Open interest change (simplified)
-        oi_values = [f.open_interest for f in futures_data if f.open_interest > 0]
-        oi_change_24h = np.mean(oi_values) if oi_values else 0.0
+        # Open interest change vs the as-of reading 24h earlier
+        oi_change_24h = futures_index.change_since('open_interest', OI_CHANGE_LOOKBACK)
         
         # OI momentum
-        if len(recent_futures) > 1:
-            recent_oi = [f.open_interest for f in recent_futures[-10:] if f.open_interest > 0]
-            oi_momentum = np.mean(np.diff(recent_oi)) if len(recent_oi) > 1 else 0.0
-        else:
-            oi_momentum = 0.0
-        
-        # Volume ratio (current vs average)
-        volume_values = [f.volume_24h for f in futures_data if f.volume_24h > 0]
-        if volume_values and len(recent_futures) > 1:
-            recent_volumes = [f.volume_24h for f in recent_futures[-10:] if f.volume_24h > 0]
-            avg_volume = np.mean(recent_volumes) if recent_volumes else 1.0
-            volume_ratio = np.mean(volume_values) / avg_volume if avg_volume > 0 else 1.0
-        else:
-            volume_ratio = 1.0
+        oi_momentum = futures_index.momentum('open_interest', 10, positive_only=True)
+        
+        # Volume ratio (current vs the venue's recent average)
+        current_volumes = {f.exchange: f.volume_24h for f in futures_data}
+        volume_ratio = futures_index.mean_ratio('volume_24h', current_volumes, 10)
         
         return {
             "avg_basis": avg_basis,
@@ -391,7 +1580,8 @@ class DerivativeFeatureEngine:
         }
     
     def calculate_funding_features(self, funding_data: List[FundingRateData],
-                                 recent_funding: List[FundingRateData]) -> Dict[str, float]:
+                                 recent_funding: List[FundingRateData],
+                                 funding_index: Optional[VenueTimeSeries] = None) -> Dict[str, float]:
         """Calculate funding rate-based features"""
         if not funding_data:
             return {
@@ -399,6 +1589,9 @@ class DerivativeFeatureEngine:
                 "funding_rate_momentum": 0.0, "funding_rate_spread": 0.0
             }
         
+        if funding_index is None:
+            funding_index = VenueTimeSeries.from_records(recent_funding, FUNDING_INDEX_FIELDS, index_retention(self.config))
+        
         # Average funding rate
         rate_values = [f.funding_rate for f in funding_data]
         avg_funding_rate = np.mean(rate_values)
@@ -406,12 +1599,8 @@ class DerivativeFeatureEngine:
         # Funding rate volatility
         funding_rate_volatility = np.std(rate_values) if len(rate_values) > 1 else 0.0
         
-        # Funding rate momentum
-        if len(recent_funding) > 1:
-            recent_rates = [f.funding_rate for f in recent_funding[-10:]]
-            funding_rate_momentum = np.mean(np.diff(recent_rates)) if len(recent_rates) > 1 else 0.0
-        else:
-            funding_rate_momentum = 0.0
+        # Funding rate momentum (per venue, then averaged)
+        funding_rate_momentum = funding_index.momentum('funding_rate', 10)
         
         # Funding rate spread (max - min)
         funding_rate_spread = max(rate_values) - min(rate_values) if len(rate_values) > 1 else 0.0
@@ -424,13 +1613,65 @@ class DerivativeFeatureEngine:
         }
     
     def calculate_options_features(self, options_data: List[OptionsData]) -> Dict[str, float]:
-        """Calculate options-based features - Currently disabled"""
-        # Options data collection disabled, return neutral values
-        return {
+        """Calculate options-based features from one chain snapshot (one record per expiry)"""
+        neutral = {
             "put_call_ratio": 1.0,  # Neutral P/C ratio
             "implied_vol": 0.0,     # No IV data
             "vol_skew": 0.0         # No skew data
         }
+        if not options_data:
+            return neutral
+        
+        # Open-interest weighted P/C across expiries (recover put/call OI from each ratio)
+        ratios = np.array([o.put_call_ratio for o in options_data], dtype=float)
+        oi = np.array([o.open_interest for o in options_data], dtype=float)
+        known = np.isfinite(ratios)
+        put_oi = np.sum(oi[known] * ratios[known] / (1 + ratios[known]))
+        call_oi = np.sum(oi[known] / (1 + ratios[known]))
+        put_call_ratio = put_oi / call_oi if call_oi > 0 else 1.0
+        
+        # Constant-maturity IV (interpolated in total variance) and skew
+        term = sorted((o for o in options_data if o.expiry is not None and np.isfinite(o.implied_volatility)),
+                      key=lambda o: o.expiry)
+        if not term:
+            return {**neutral, "put_call_ratio": put_call_ratio}
+        years = np.array([(o.expiry - o.timestamp).total_seconds() / SECONDS_PER_YEAR for o in term])
+        iv = np.array([o.implied_volatility for o in term])
+        target = self.config.options_target_days / 365.0
+        target_years = np.clip(target, years[0], years[-1])
+        implied_vol = np.sqrt(np.interp(target_years, years, iv ** 2 * years) / target_years)
+        
+        skewed = [(y, o.skew) for y, o in zip(years, term) if np.isfinite(o.skew)]
+        vol_skew = float(np.interp(target, *zip(*skewed))) if skewed else 0.0
+        
+        return {
+            "put_call_ratio": float(put_call_ratio),
+            "implied_vol": float(implied_vol),
+            "vol_skew": vol_skew
+        }
+    
+    def calculate_dislocation_features(self, futures_data: List[FuturesData],
+                                       funding_data: List[FundingRateData]) -> Dict[str, float]:
+        """Advance the pairwise venue trackers with this cycle's rows"""
+        features = {"basis_dislocation_z": 0.0, "funding_dislocation_z": 0.0}
+        if futures_data:
+            self.basis_dislocations.update({f.exchange: f.basis for f in futures_data})
+            features["basis_dislocation_z"] = self.basis_dislocations.max_abs_zscore()
+        if funding_data:
+            self.funding_dislocations.update({f.exchange: f.funding_rate for f in funding_data})
+            features["funding_dislocation_z"] = self.funding_dislocations.max_abs_zscore()
+        return features
+    
+    def calculate_term_structure_features(self, term_data: List[TermStructureData]) -> Dict[str, float]:
+        """Curve shape from this cycle's dated futures"""
+        if not term_data:
+            return dict(TERM_FEATURE_DEFAULTS)
+        contracts = pd.DataFrame([asdict(t) for t in term_data]).assign(cycle=0)
+        contracts['expiry'] = pd.to_datetime(contracts['expiry'], utc=True)
+        features = term_structure_features(contracts, self.config.term_min_days)
+        if features.empty:
+            return dict(TERM_FEATURE_DEFAULTS)
+        return {name: float(value) for name, value in features.iloc[0].fillna(0.0).items()}
     
     def calculate_composite_features(self, futures_features: Dict[str, float],
                                    funding_features: Dict[str, float],
@@ -447,17 +1688,18 @@ class DerivativeFeatureEngine:
         # Options sentiment (P/C ratio > 1 = bearish)
         options_sentiment = -np.tanh((options_features["put_call_ratio"] - 1) * 2)
         
-        # Weighted derivative sentiment (options disabled, focus on futures and funding)
+        # Weighted derivative sentiment (options stay out of the blend until they have a track record)
         derivative_sentiment = (0.7 * basis_sentiment + 0.3 * funding_sentiment)
         
-        # Confidence based on data quality and signal strength (options disabled)
+        # Confidence based on data quality and signal strength
+        # (element-wise numpy ops so the table engine can pass whole columns)
         data_quality = min(1.0, (len(futures_features) + len(funding_features)) / 2)
-        signal_strength = min(1.0, abs(derivative_sentiment) * 2)
+        signal_strength = np.minimum(1.0, np.abs(derivative_sentiment) * 2)
         derivative_confidence = data_quality * signal_strength
         
         # Market structure score (health of derivative markets)
         structure_score = 1.0 - (futures_features["basis_volatility"] + funding_features["funding_rate_volatility"]) / 2
-        structure_score = max(0.0, min(1.0, structure_score))
+        structure_score = np.clip(structure_score, 0.0, 1.0)
         
         return {
             "derivative_sentiment": derivative_sentiment,
@@ -469,28 +1711,348 @@ class DerivativeFeatureEngine:
                              funding_data: List[FundingRateData],
                              options_data: List[OptionsData],
                              recent_futures: List[FuturesData],
-                             recent_funding: List[FundingRateData]) -> DerivativeFeatures:
+                             recent_funding: List[FundingRateData],
+                             futures_index: Optional[VenueTimeSeries] = None,
+                             funding_index: Optional[VenueTimeSeries] = None,
+                             liquidation_features: Optional[Dict[str, float]] = None,
+                             term_data: Optional[List[TermStructureData]] = None,
+                             timestamp: Optional[datetime] = None) -> DerivativeFeatures:
         """Calculate all derivative features"""
+        timestamp = timestamp or datetime.now(timezone.utc)
         
         # Calculate feature groups
-        futures_features = self.calculate_futures_features(futures_data, recent_futures)
-        funding_features = self.calculate_funding_features(funding_data, recent_funding)
+        futures_features = self.calculate_futures_features(futures_data, recent_futures, futures_index)
+        funding_features = self.calculate_funding_features(funding_data, recent_funding, funding_index)
         options_features = self.calculate_options_features(options_data)
-        composite_features = self.calculate_composite_features(futures_features, funding_features, options_features)
+        # The composite helpers are element-wise numpy ops; keep plain floats on the live path
+        composite_features = {name: float(value) for name, value in
+                              self.calculate_composite_features(futures_features, funding_features, options_features).items()}
         
-        # Combine all features
-        all_features = {**futures_features, **funding_features, **options_features, **composite_features}
+        term_features = self.calculate_term_structure_features(term_data or [])
+        dislocation_features = self.calculate_dislocation_features(futures_data, funding_data)
+        state_features = self.composite_state.update(composite_features, timestamp)
         
-        features = DerivativeFeatures(
-            timestamp=datetime.now(timezone.utc),
+        # Combine all features (liquidations come pre-aggregated from the stream)
+        all_features = {**futures_features, **funding_features, **options_features, **composite_features,
+                        **state_features, **dislocation_features, **(liquidation_features or {}), **term_features}
+        
+        return DerivativeFeatures(
+            timestamp=timestamp,
             symbol=self.config.symbol,
             **all_features
         )
+    
+    def save_state(self, path: str):
+        """Snapshot the incremental state (composites, dislocation windows) atomically"""
+        state = {
+            'composite': self.composite_state.to_dict(),
+            'basis_dislocations': self.basis_dislocations.to_dict(),
+            'funding_dislocations': self.funding_dislocations.to_dict(),
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+    
+    def load_state(self, path: str) -> bool:
+        """Resume from a snapshot written by save_state; False if there is none or it is unreadable"""
+        if not os.path.exists(path):
+            return False
+        config = self.config
+        try:
+            with open(path) as f:
+                state = json.load(f)
+            composite_state = CompositeFeatureState.from_dict(
+                state['composite'], config.composite_halflife_minutes, config.composite_min_obs)
+            basis_dislocations = VenueDislocationTracker.from_dict(
+                state['basis_dislocations'], config.dislocation_window, config.dislocation_min_obs)
+            funding_dislocations = VenueDislocationTracker.from_dict(
+                state['funding_dislocations'], config.dislocation_window, config.dislocation_min_obs)
+        except Exception as e:
+            print(f"⚠️  Could not read feature engine state, starting fresh: {e}")
+            return False
+        self.composite_state = composite_state
+        self.basis_dislocations = basis_dislocations
+        self.funding_dislocations = funding_dislocations
+        return True
+
+class DerivativeTableFeatureEngine:
+    """Vectorized counterpart of DerivativeFeatureEngine for whole history tables.
+    
+    Takes the typed futures/funding frames from DerivativeDataStorage and returns
+    one DerivativeFeatures row per collection cycle, using grouped cumulative
+    and rolling column operations instead of replaying cycles through Python
+    objects. Each row matches what the incremental engine produces when that
+    cycle is the latest one collected.
+    """
+    
+    MOMENTUM_WINDOW = 10
+    
+    def __init__(self, config: DerivativeConfig):
+        self.config = config
+        self.incremental = DerivativeFeatureEngine(config)
+        self.retention_seconds = index_retention(config).total_seconds()
+    
+    @staticmethod
+    def _epoch_seconds(timestamps: pd.Series) -> np.ndarray:
+        return (timestamps - pd.Timestamp(0, tz='UTC')).dt.total_seconds().to_numpy()
+    
+    def assign_cycles(self, *frames: pd.DataFrame) -> pd.Series:
+        """Tag rows with a cycle number in place; returns each cycle's last timestamp"""
+        times = pd.concat([df['timestamp'] for df in frames]).sort_values()
+        seconds = self._epoch_seconds(times)
+        new_cycle = np.diff(seconds, prepend=-np.inf) > self.config.cycle_gap_seconds
+        starts = seconds[new_cycle]
         
-        # Store in history
-        self.feature_history.append(all_features)
+        for df in frames:
+            df['cycle'] = np.searchsorted(starts, self._epoch_seconds(df['timestamp']), side='right') - 1
         
-        return features
+        return times.groupby(np.cumsum(new_cycle) - 1).max().reset_index(drop=True)
+    
+    def _window_stats(self, rows: pd.DataFrame, field: str, positive_only: bool = False,
+                      lookback: Optional[timedelta] = None) -> Dict[str, np.ndarray]:
+        """Per-row statistics over the venue's last MOMENTUM_WINDOW valid readings.
+        
+        Mirrors VenueTimeSeries: the window only holds readings within the
+        retention period of the row, and `past` is the as-of valid reading
+        `lookback` before the row inside that same period.
+        """
+        n = self.MOMENTUM_WINDOW
+        stats = {name: np.full(len(rows), np.nan) for name in ('current', 'mean', 'std', 'momentum', 'past')}
+        seconds = self._epoch_seconds(rows['timestamp'])
+        values = rows[field].to_numpy(dtype=float)
+        
+        for idx in rows.groupby('exchange', sort=False).indices.values():
+            ts, x = seconds[idx], values[idx]
+            valid = x > 0 if positive_only else np.isfinite(x)
+            xv = x[valid]
+            if not len(xv):
+                continue
+            
+            # Valid readings are addressed by ordinal; cumulative sums give window aggregates
+            seen = np.cumsum(valid)
+            first = np.concatenate([[0], seen])[np.searchsorted(ts, ts - self.retention_seconds, side='left')]
+            width = np.minimum(seen - first, n)
+            start = seen - width
+            last = np.maximum(seen - 1, 0)
+            sums = np.concatenate([[0.0], np.cumsum(xv)])
+            squares = np.concatenate([[0.0], np.cumsum(xv * xv)])
+            
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean = (sums[seen] - sums[start]) / width
+                variance = np.maximum((squares[seen] - squares[start]) / width - mean * mean, 0.0)
+                stats['current'][idx] = np.where(width >= 1, xv[last], np.nan)
+                stats['mean'][idx] = np.where(width >= 1, mean, np.nan)
+                stats['std'][idx] = np.where(width >= 2, np.sqrt(variance), np.nan)
+                stats['momentum'][idx] = np.where(width >= 2, (xv[last] - xv[start]) / (width - 1), np.nan)
+            
+            if lookback is not None:
+                j = np.searchsorted(ts, ts - lookback.total_seconds(), side='right') - 1
+                past_ordinal = np.where(j >= 0, seen[np.maximum(j, 0)], 0) - 1
+                found = (j >= 0) & (past_ordinal >= first)
+                stats['past'][idx] = np.where(found, xv[np.maximum(past_ordinal, 0)], np.nan)
+        
+        return stats
+    
+    @staticmethod
+    def _asof_cycles(rows: pd.DataFrame, values: np.ndarray, n_cycles: int) -> np.ndarray:
+        """Cycle x venue matrix of each venue's value at its latest row up to that cycle"""
+        frame = pd.DataFrame({'cycle': rows['cycle'].to_numpy(), 'exchange': rows['exchange'].to_numpy(),
+                              'pos': np.arange(len(rows), dtype=float)})
+        frame = frame.drop_duplicates(['cycle', 'exchange'], keep='last')
+        positions = frame.pivot(index='cycle', columns='exchange', values='pos')
+        positions = positions.reindex(range(n_cycles)).ffill().to_numpy()
+        
+        # Carry row positions forward rather than values, so a NaN on the latest
+        # row is not replaced by an older reading
+        result = np.full(positions.shape, np.nan)
+        known = ~np.isnan(positions)
+        result[known] = np.asarray(values, dtype=float)[positions[known].astype(int)]
+        return result
+    
+    def _active(self, rows: pd.DataFrame, n_cycles: int) -> np.ndarray:
+        """Venues with a reading within retention of the newest reading so far"""
+        seconds = self._epoch_seconds(rows['timestamp'])
+        last_seen = self._asof_cycles(rows, seconds, n_cycles)
+        newest = pd.Series(seconds).groupby(rows['cycle'].to_numpy()).max().reindex(range(n_cycles)).ffill().cummax()
+        return last_seen >= (newest.to_numpy() - self.retention_seconds)[:, None]
+    
+    def _venue_mean(self, rows: pd.DataFrame, values: np.ndarray, active: np.ndarray, n_cycles: int) -> np.ndarray:
+        """Average each cycle's per-venue values across active venues (0.0 if none)"""
+        matrix = np.where(active, self._asof_cycles(rows, values, n_cycles), np.nan)
+        counts = np.isfinite(matrix).sum(axis=1)
+        return np.where(counts > 0, np.nansum(matrix, axis=1) / np.maximum(counts, 1), 0.0)
+    
+    @staticmethod
+    def _cycle_presence(rows: pd.DataFrame, n_cycles: int) -> np.ndarray:
+        present = np.zeros(n_cycles, dtype=bool)
+        present[rows['cycle'].unique()] = True
+        return present
+    
+    def _futures_columns(self, rows: pd.DataFrame, n_cycles: int) -> Dict[str, np.ndarray]:
+        columns = {name: np.zeros(n_cycles) for name in
+                   ["avg_basis", "basis_volatility", "basis_momentum", "oi_change_24h", "oi_momentum", "volume_ratio"]}
+        if rows.empty:
+            return columns
+        
+        present = self._cycle_presence(rows, n_cycles)
+        active = self._active(rows, n_cycles)
+        basis = self._window_stats(rows, 'basis')
+        oi = self._window_stats(rows, 'open_interest', positive_only=True, lookback=OI_CHANGE_LOOKBACK)
+        volume = self._window_stats(rows, 'volume_24h', positive_only=True)
+        
+        by_cycle = rows.groupby('cycle')
+        cycles = by_cycle.size().index.to_numpy()
+        columns["avg_basis"][cycles] = by_cycle['basis'].mean().to_numpy()
+        
+        # Cross-venue dispersion, or the single venue's own last 10 readings
+        own_std = pd.Series(np.nan_to_num(basis['std']), index=rows.index).groupby(rows['cycle']).last()
+        cross_std = by_cycle['basis'].std(ddof=0)
+        columns["basis_volatility"][cycles] = cross_std.where(by_cycle.size() > 1, own_std).to_numpy()
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            oi_change = np.where(oi['past'] > 0, oi['current'] / oi['past'] - 1.0, np.nan)
+            volume_ratio = np.where(rows['volume_24h'].to_numpy() > 0, rows['volume_24h'].to_numpy() / volume['mean'], np.nan)
+        
+        columns["basis_momentum"] = np.where(present, self._venue_mean(rows, basis['momentum'], active, n_cycles), 0.0)
+        columns["oi_change_24h"] = np.where(present, self._venue_mean(rows, oi_change, active, n_cycles), 0.0)
+        columns["oi_momentum"] = np.where(present, self._venue_mean(rows, oi['momentum'], active, n_cycles), 0.0)
+        
+        # Current volume over the venue's recent mean, for venues reporting this cycle
+        ratio = pd.Series(volume_ratio, index=rows.index).groupby(rows['cycle']).mean()
+        columns["volume_ratio"] = np.where(present, 1.0, 0.0)
+        columns["volume_ratio"][ratio.index.to_numpy()] = ratio.fillna(1.0).to_numpy()
+        return columns
+    
+    def _funding_columns(self, rows: pd.DataFrame, n_cycles: int) -> Dict[str, np.ndarray]:
+        columns = {name: np.zeros(n_cycles) for name in
+                   ["avg_funding_rate", "funding_rate_volatility", "funding_rate_momentum", "funding_rate_spread"]}
+        if rows.empty:
+            return columns
+        
+        present = self._cycle_presence(rows, n_cycles)
+        active = self._active(rows, n_cycles)
+        rates = self._window_stats(rows, 'funding_rate')
+        
+        by_cycle = rows.groupby('cycle')['funding_rate']
+        cycles = by_cycle.size().index.to_numpy()
+        columns["avg_funding_rate"][cycles] = by_cycle.mean().to_numpy()
+        columns["funding_rate_volatility"][cycles] = by_cycle.std(ddof=0).to_numpy()
+        columns["funding_rate_spread"][cycles] = (by_cycle.max() - by_cycle.min()).to_numpy()
+        columns["funding_rate_momentum"] = np.where(present, self._venue_mean(rows, rates['momentum'], active, n_cycles), 0.0)
+        return columns
+    
+    def _options_columns(self, rows: pd.DataFrame, n_cycles: int) -> Dict[str, np.ndarray]:
+        columns = {name: np.full(n_cycles, value) for name, value in
+                   self.incremental.calculate_options_features([]).items()}
+        # A snapshot is one row per expiry, so this loops over cycles, not contracts
+        for cycle, group in rows.groupby('cycle'):
+            records = [OptionsData(**r) for r in group.drop(columns='cycle').to_dict('records')]
+            for name, value in self.incremental.calculate_options_features(records).items():
+                columns[name][cycle] = value
+        return columns
+    
+    def _dislocation_column(self, rows: pd.DataFrame, field: str, n_cycles: int) -> np.ndarray:
+        """Largest pair |z| per cycle, with rolling sums over the cycles that have rows"""
+        column = np.zeros(n_cycles)
+        if rows.empty:
+            return column
+        latest = rows.drop_duplicates(['cycle', 'exchange'], keep='last')
+        values = latest.pivot(index='cycle', columns='exchange', values=field)
+        vectors = values.to_numpy(dtype=float)
+        diffs = vectors[:, :, None] - vectors[:, None, :]
+        
+        # Windowed sums as differences of cumulative sums along the cycle axis
+        fresh = np.isfinite(diffs)
+        window = self.config.dislocation_window
+        def rolling(a: np.ndarray) -> np.ndarray:
+            totals = np.concatenate([np.zeros((1,) + a.shape[1:]), np.cumsum(a, axis=0)])
+            ends = np.arange(1, len(a) + 1)
+            return totals[ends] - totals[np.maximum(ends - window, 0)]
+        
+        zscores = pairwise_zscores(rolling(np.where(fresh, diffs, 0.0)), rolling(np.where(fresh, diffs ** 2, 0.0)),
+                                   rolling(fresh.astype(float)), diffs, self.config.dislocation_min_obs)
+        largest = np.nanmax(np.where(np.isfinite(zscores), np.abs(zscores), -np.inf), axis=(1, 2))
+        column[values.index.to_numpy(dtype=int)] = np.where(np.isfinite(largest), largest, 0.0)
+        return column
+    
+    def _term_columns(self, rows: pd.DataFrame, n_cycles: int) -> Dict[str, np.ndarray]:
+        columns = {name: np.full(n_cycles, value) for name, value in TERM_FEATURE_DEFAULTS.items()}
+        features = term_structure_features(rows, self.config.term_min_days).fillna(0.0)
+        for name in columns:
+            columns[name][features.index.to_numpy(dtype=int)] = features[name].to_numpy()
+        return columns
+    
+    def _liquidation_columns(self, buckets: pd.DataFrame, cycle_times: pd.Series) -> Dict[str, np.ndarray]:
+        """Stream features at each cycle from the stored liquidation buckets"""
+        size = self.config.liquidation_bucket_seconds
+        window = self.config.liquidation_window_buckets
+        current = (self._epoch_seconds(cycle_times) // size).astype(np.int64)
+        ids = (self._epoch_seconds(buckets['timestamp']) // size).astype(np.int64)
+        
+        # Dense bucket grid, then one sliding window ending before each cycle's bucket
+        first = min(current.min() - window, ids.min()) if len(ids) else current.min() - window
+        long_grid = np.zeros(current.max() - first)
+        short_grid = np.zeros(current.max() - first)
+        inside = ids < current.max()
+        np.add.at(long_grid, ids[inside] - first, buckets['long_notional'].to_numpy(dtype=float)[inside])
+        np.add.at(short_grid, ids[inside] - first, buckets['short_notional'].to_numpy(dtype=float)[inside])
+        
+        starts = current - window - first
+        long_windows = np.lib.stride_tricks.sliding_window_view(long_grid, window)[starts]
+        short_windows = np.lib.stride_tricks.sliding_window_view(short_grid, window)[starts]
+        return liquidation_window_features(long_windows, short_windows, self.config.liquidation_cascade_zscore)
+    
+    def calculate_features(self, futures_df: pd.DataFrame, funding_df: pd.DataFrame,
+                           options_df: Optional[pd.DataFrame] = None,
+                           liquidations_df: Optional[pd.DataFrame] = None,
+                           term_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Compute the full DerivativeFeatures series, one row per collection cycle"""
+        def prepare(df: Optional[pd.DataFrame], record_type: str) -> pd.DataFrame:
+            if df is None:
+                df = apply_schema(pd.DataFrame(), DERIVATIVE_RECORD_SCHEMAS[record_type])
+            return df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+        
+        futures_df, funding_df = prepare(futures_df, 'futures'), prepare(funding_df, 'funding')
+        options_df, term_df = prepare(options_df, 'options'), prepare(term_df, 'term_structure')
+        if futures_df.empty and funding_df.empty and options_df.empty and term_df.empty:
+            return pd.DataFrame(columns=list(DerivativeFeatures.__dataclass_fields__))
+        
+        cycle_times = self.assign_cycles(futures_df, funding_df, options_df, term_df)
+        n_cycles = len(cycle_times)
+        
+        futures_features = self._futures_columns(futures_df, n_cycles)
+        funding_features = self._funding_columns(funding_df, n_cycles)
+        options_features = self._options_columns(options_df, n_cycles)
+        term_features = self._term_columns(term_df, n_cycles)
+        dislocation_features = {
+            "basis_dislocation_z": self._dislocation_column(futures_df, 'basis', n_cycles),
+            "funding_dislocation_z": self._dislocation_column(funding_df, 'funding_rate', n_cycles),
+        }
+        composite_features = self.incremental.calculate_composite_features(
+            futures_features, funding_features, options_features)
+        
+        # The EWMA is a recurrence, so it walks the cycles with the live state class
+        composite_state = CompositeFeatureState(self.config.composite_halflife_minutes, self.config.composite_min_obs)
+        sentiment = np.broadcast_to(composite_features["derivative_sentiment"], n_cycles)
+        structure = np.broadcast_to(composite_features["market_structure_score"], n_cycles)
+        state_rows = [composite_state.update({"derivative_sentiment": sentiment[i], "market_structure_score": structure[i]},
+                                             cycle_times.iloc[i].to_pydatetime()) for i in range(n_cycles)]
+        state_features = {name: np.array([row[name] for row in state_rows]) for name in state_rows[0]}
+        
+        if liquidations_df is None:
+            liquidations_df = apply_schema(pd.DataFrame(), DERIVATIVE_RECORD_SCHEMAS['liquidations'])
+        liquidation_features = self._liquidation_columns(liquidations_df, cycle_times)
+        
+        features = pd.DataFrame({
+            'timestamp': cycle_times.to_numpy(),
+            'symbol': self.config.symbol,
+            **futures_features, **funding_features, **options_features,
+            **{name: np.broadcast_to(values, n_cycles) for name, values in composite_features.items()},
+            **state_features, **dislocation_features, **liquidation_features, **term_features
+        })
+        return features[list(DerivativeFeatures.__dataclass_fields__)]
 
 # ==============================
 # Prediction Logic
@@ -574,9 +2136,148 @@ class DerivativePredictor:
 # ==============================
 # Data Storage
 # ==============================
+# Column dtypes for the partitioned layout, one schema per record type.
+# 'datetime' columns are parsed back to UTC timestamps on load.
+DERIVATIVE_RECORD_SCHEMAS: Dict[str, Dict[str, str]] = {
+    'futures': {
+        'timestamp': 'datetime',
+        'exchange': 'string',
+        'symbol': 'string',
+        'futures_price': 'float64',
+        'spot_price': 'float64',
+        'basis': 'float64',
+        'basis_percent': 'float64',
+        'open_interest': 'float64',
+        'volume_24h': 'float64',
+        'volume_change_24h': 'float64',
+    },
+    'funding': {
+        'timestamp': 'datetime',
+        'exchange': 'string',
+        'symbol': 'string',
+        'funding_rate': 'float64',
+        'funding_rate_percent': 'float64',
+        'next_funding_time': 'datetime',
+        'predicted_funding_rate': 'float64',
+    },
+    'options': {
+        'timestamp': 'datetime',
+        'exchange': 'string',
+        'symbol': 'string',
+        'put_call_ratio': 'float64',
+        'implied_volatility': 'float64',
+        'skew': 'float64',
+        'total_volume': 'float64',
+        'open_interest': 'float64',
+        'expiry': 'datetime',
+    },
+    'term_structure': {
+        'timestamp': 'datetime',
+        'exchange': 'string',
+        'symbol': 'string',
+        'contract': 'string',
+        'expiry': 'datetime',
+        'futures_price': 'float64',
+        'spot_price': 'float64',
+        'basis': 'float64',
+        'days_to_expiry': 'float64',
+        'annualized_basis': 'float64',
+    },
+    # One row per non-empty stream bucket (bucket start time)
+    'liquidations': {
+        'timestamp': 'datetime',
+        'long_notional': 'float64',
+        'short_notional': 'float64',
+        'events': 'float64',
+    },
+}
+
 class DerivativeDataStorage:
     def __init__(self, config: DerivativeConfig):
         self.config = config
+        self._write_lock = threading.Lock()  # Backfill threads share partitions
+        self.signal_log = SignalLog(config.signal_log_file, config.signals_file)
+    
+    def _partition_path(self, record_type: str, day: str) -> str:
+        return os.path.join(self.config.derivative_partition_dir, record_type, f"{day}.csv")
+    
+    def save_partitioned(self, record_type: str, records: List[Any]):
+        """Append dataclass records to per-type, per-day partitions with a fixed schema"""
+        if not records:
+            return
+        
+        schema = DERIVATIVE_RECORD_SCHEMAS[record_type]
+        df = apply_schema(pd.DataFrame([asdict(r) for r in records]), schema)
+        self._write_partitions(record_type, df)
+    
+    def _write_partitions(self, record_type: str, df: pd.DataFrame):
+        """Split a typed frame by UTC day and append each slice to its partition"""
+        os.makedirs(os.path.join(self.config.derivative_partition_dir, record_type), exist_ok=True)
+        days = df['timestamp'].dt.strftime('%Y-%m-%d')
+        with self._write_lock:
+            for day, part in df.groupby(days, sort=True):
+                path = self._partition_path(record_type, day)
+                file_exists = os.path.exists(path)
+                part.to_csv(path, mode='a', header=not file_exists, index=False)
+    
+    def load_partitioned(self, record_type: str,
+                         start: Optional[datetime] = None,
+                         end: Optional[datetime] = None) -> pd.DataFrame:
+        """Load a record type as a typed frame, reading only partitions inside [start, end]"""
+        schema = DERIVATIVE_RECORD_SCHEMAS[record_type]
+        type_dir = os.path.join(self.config.derivative_partition_dir, record_type)
+        empty = apply_schema(pd.DataFrame(), schema)
+        if not os.path.isdir(type_dir):
+            return empty
+        
+        start_day = start.strftime('%Y-%m-%d') if start else None
+        end_day = end.strftime('%Y-%m-%d') if end else None
+        
+        # Partition names sort chronologically, so the date range prunes files
+        # before anything is parsed
+        files = []
+        for name in sorted(os.listdir(type_dir)):
+            if not name.endswith('.csv'):
+                continue
+            day = name[:-4]
+            if (start_day and day < start_day) or (end_day and day > end_day):
+                continue
+            files.append(os.path.join(type_dir, name))
+        if not files:
+            return empty
+        
+        dtypes = {c: t for c, t in schema.items() if t != 'datetime'}
+        df = pd.concat([pd.read_csv(f, dtype=dtypes) for f in files], ignore_index=True)
+        df = apply_schema(df, schema)
+        
+        if start is not None:
+            df = df[df['timestamp'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['timestamp'] <= pd.Timestamp(end)]
+        return df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+    
+    def partition_legacy_file(self) -> Dict[str, int]:
+        """Split the wide derivative_data.csv into typed partitions; returns the rows added per type.
+        
+        Live cycles write both layouts, so rows whose (timestamp, exchange) is
+        already partitioned are skipped and the migration is safe to re-run.
+        """
+        if not os.path.exists(self.config.derivative_data_file):
+            return {}
+        
+        legacy = pd.read_csv(self.config.derivative_data_file)
+        counts = {}
+        for record_type, rows in legacy.groupby('type'):
+            if record_type not in DERIVATIVE_RECORD_SCHEMAS:
+                continue
+            df = apply_schema(rows, DERIVATIVE_RECORD_SCHEMAS[record_type])
+            existing = self.load_partitioned(record_type, start=df['timestamp'].min(), end=df['timestamp'].max())
+            seen = set(zip(existing['timestamp'], existing['exchange']))
+            df = df[[key not in seen for key in zip(df['timestamp'], df['exchange'])]]
+            if not df.empty:
+                self._write_partitions(record_type, df)
+            counts[record_type] = len(df)
+        return counts
     
     def save_derivative_data(self, futures_data: List[FuturesData], 
                            funding_data: List[FundingRateData],
@@ -623,50 +2324,83 @@ class DerivativeDataStorage:
                 'skew': ''  # Empty for funding
             })
         
-        # Skip options data (disabled)
-        # for o in options_data:
-        #     all_data.append({...})
+        # Add options data (per-expiry summary; expiry itself only goes to the partitions)
+        for o in options_data:
+            all_data.append({
+                'timestamp': o.timestamp.isoformat(),
+                'type': 'options',
+                'exchange': o.exchange,
+                'symbol': o.symbol,
+                'futures_price': '',  # Empty for options
+                'spot_price': '',  # Empty for options
+                'basis': '',  # Empty for options
+                'basis_percent': '',  # Empty for options
+                'open_interest': o.open_interest,
+                'volume_24h': o.total_volume,
+                'put_call_ratio': o.put_call_ratio,
+                'implied_volatility': o.implied_volatility,
+                'skew': o.skew
+            })
         
-        if all_data:
+        if all_data and self.config.legacy_csv_enabled:
             df = pd.DataFrame(all_data)
             file_exists = os.path.exists(self.config.derivative_data_file)
             df.to_csv(self.config.derivative_data_file, mode='a', header=not file_exists, index=False)
+        
+        # Typed, partitioned copy for fast loading
+        self.save_partitioned('futures', futures_data)
+        self.save_partitioned('funding', funding_data)
+        self.save_partitioned('options', options_data)
+    
+    def save_term_structure(self, term_data: List[TermStructureData]):
+        """Append this cycle's dated-futures curve to the 'term_structure' partition"""
+        self.save_partitioned('term_structure', term_data)
+    
+    def save_liquidation_buckets(self, buckets: pd.DataFrame):
+        """Append completed liquidation buckets to the 'liquidations' partition"""
+        if not buckets.empty:
+            self._write_partitions('liquidations', apply_schema(buckets, DERIVATIVE_RECORD_SCHEMAS['liquidations']))
     
     def save_features(self, features: DerivativeFeatures):
         """Save features to CSV"""
         data = asdict(features)
         data['timestamp'] = features.timestamp.isoformat()
         
-        df = pd.DataFrame([data])
-        file_exists = os.path.exists(self.config.features_file)
-        df.to_csv(self.config.features_file, mode='a', header=not file_exists, index=False)
+        append_csv_rows(self.config.features_file, [data])
     
     def save_signal(self, signal: DerivativeSignal):
-        """Save prediction signal to JSON"""
-        signal_data = asdict(signal)
-        signal_data['timestamp'] = signal.timestamp.isoformat()
-        
-        # Convert any remaining datetime objects to ISO format
-        def convert_datetime(obj):
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            return obj
-        
-        def clean_dict(d):
-            if isinstance(d, dict):
-                return {k: clean_dict(v) for k, v in d.items()}
-            elif isinstance(d, list):
-                return [clean_dict(item) for item in d]
-            else:
-                return convert_datetime(d)
-        
-        cleaned_data = clean_dict(signal_data)
-        
-        with open(self.config.signals_file, 'w') as f:
-            json.dump(cleaned_data, f, indent=2)
+        """Append signal to the JSONL log and update the latest-signal JSON"""
+        self.signal_log.append(signal)
     
-    def generate_report(self, signal: DerivativeSignal, features: DerivativeFeatures):
+    def generate_report(self, signal: DerivativeSignal, features: DerivativeFeatures,
+                        term_data: Optional[List[TermStructureData]] = None,
+                        dislocations: Optional[Dict[str, VenueDislocationTracker]] = None):
         """Generate markdown report"""
+        dislocation_lines = '\n'.join(
+            f"- {label}: {venue} vs {other} {diff * 100:+.4f}% (z {z:+.2f})"
+            for label, tracker in (dislocations or {}).items()
+            for venue, other, diff, z in tracker.top_pairs(2)
+        )
+        calendar = pd.DataFrame()
+        if term_data:
+            calendar = calendar_spread_matrix(pd.DataFrame([asdict(t) for t in term_data]), self.config.term_min_days)
+        if calendar.empty:
+            calendar_table = 'No dated futures available'
+        else:
+            lines = ['| Near / Far | ' + ' | '.join(calendar.columns) + ' |', '|---' * (len(calendar.columns) + 1) + '|']
+            for near, row in calendar.iterrows():
+                lines.append(f'| {near} | ' + ' | '.join('' if np.isnan(v) else f'{v:.2%}' for v in row) + ' |')
+            calendar_table = '\n'.join(lines)
+        
+        if np.isnan(features.liq_long_notional):
+            liquidation_lines = "- Not collected: the liquidation feed only runs in continuous and extended modes"
+        else:
+            liquidation_lines = f"""- **Longs Liquidated:** ${features.liq_long_notional:,.0f}
+- **Shorts Liquidated:** ${features.liq_short_notional:,.0f}
+- **Imbalance:** {features.liq_imbalance:+.2f}
+- **Burst Z-Score:** {features.liq_burst_zscore:.2f}
+- **Cascade:** {'short squeeze' if features.liq_cascade > 0 else 'long cascade' if features.liq_cascade < 0 else 'none'}"""
+        
         report = f"""# Derivative Signal Report
 
 **Timestamp:** {signal.timestamp.strftime('%Y-%m-%d %H:%M:%S UTC')}  
@@ -679,7 +2413,7 @@ class DerivativeDataStorage:
 - **Average Basis:** {features.avg_basis:.4f} ({features.avg_basis*100:.3f}%)
 - **Basis Volatility:** {features.basis_volatility:.4f}
 - **Basis Momentum:** {features.basis_momentum:.4f}
-- **OI Change 24h:** {features.oi_change_24h:.2f}
+- **OI Change 24h:** {features.oi_change_24h*100:.2f}%
 - **OI Momentum:** {features.oi_momentum:.2f}
 - **Volume Ratio:** {features.volume_ratio:.2f}
 
@@ -691,13 +2425,32 @@ class DerivativeDataStorage:
 
 ## Options Analysis
 - **Put/Call Ratio:** {features.put_call_ratio:.2f}
-- **Implied Volatility:** {features.implied_vol:.2f}
-- **Volatility Skew:** {features.vol_skew:.2f}
+- **Implied Volatility (30d ATM):** {features.implied_vol:.1%}
+- **Volatility Skew (25d put - call):** {features.vol_skew:+.2%}
+
+## Venue Dislocations
+- **Basis Dislocation (max |z|):** {features.basis_dislocation_z:.2f}
+- **Funding Dislocation (max |z|):** {features.funding_dislocation_z:.2f}
+{dislocation_lines}
+
+## Term Structure
+- **Front Annualized Basis:** {features.term_front_basis:.2%}
+- **Back Annualized Basis:** {features.term_back_basis:.2%}
+- **Curve Slope:** {features.term_slope:+.2%} per year of maturity
+
+Calendar spreads (annualized % carry between expiries):
+
+{calendar_table}
+
+## Liquidations (last {self.config.liquidation_window_buckets * self.config.liquidation_bucket_seconds // 60} min)
+{liquidation_lines}
 
 ## Composite Analysis
 - **Derivative Sentiment:** {features.derivative_sentiment:.3f}
 - **Derivative Confidence:** {features.derivative_confidence:.3f}
 - **Market Structure Score:** {features.market_structure_score:.3f}
+- **Sentiment EWMA:** {features.sentiment_ewma:.3f} (z {features.sentiment_zscore:+.2f})
+- **Structure EWMA:** {features.structure_ewma:.3f} (z {features.structure_zscore:+.2f})
 
 ## Reasoning
 {signal.reasoning}
@@ -720,7 +2473,99 @@ class DerivativeApp:
         self.feature_engine = DerivativeFeatureEngine(self.config)
         self.predictor = DerivativePredictor(self.config)
         self.storage = DerivativeDataStorage(self.config)
+        self.checkpointer = Checkpointer(self.config.checkpoint_file,
+                                         self.config.checkpoint_interval_seconds,
+                                         self.config.checkpoint_max_age_hours)
         self.running = False
+        self.liquidations = LiquidationAggregator(self.config.liquidation_bucket_seconds,
+                                                  self.config.liquidation_window_buckets)
+        
+        # Checkpoint first; stored history then only tops the buffers up past it.
+        # Fetching history from the venues is left to backfill_history()
+        self._restore_checkpoint()
+        self._seed_from_storage()
+        
+        if self.feature_engine.load_state(self.config.engine_state_file):
+            print(f"♻️  Feature engine state resumed from {self.config.engine_state_file}")
+        
+        # Long-running modes start the feed; single runs report liq_* as missing
+        self.liquidation_feed = None
+    
+    def _checkpoint_state(self) -> Dict[str, Any]:
+        """Rolling state to snapshot (venue indexes are rebuilt from the buffers)"""
+        return {
+            'futures': pack_records(self.collector.futures_buffer),
+            'funding': pack_records(self.collector.funding_buffer),
+            'options': pack_records(self.collector.options_buffer),
+            'features_history': pack_records(self.collector.features_history),
+            'liquidations': self.liquidations.to_dict(),
+        }
+    
+    def _restore_checkpoint(self):
+        """Refill the rolling buffers from the last checkpoint, if one is fresh enough"""
+        state = self.checkpointer.load()
+        if state is None:
+            return
+        try:
+            futures = unpack_records(state['futures'], FuturesData)
+            funding = unpack_records(state['funding'], FundingRateData)
+            options = unpack_records(state['options'], OptionsData)
+            history = unpack_records(state['features_history'], DerivativeFeatures)
+        except Exception as e:
+            print(f"⚠️  Checkpoint restore failed, starting cold: {e}")
+            return
+        
+        collector = self.collector
+        collector.futures_buffer.extend(futures)
+        collector.funding_buffer.extend(funding)
+        collector.futures_index.extend(collector.futures_buffer)
+        collector.funding_index.extend(collector.funding_buffer)
+        collector.options_buffer.extend(options)
+        collector.features_history.extend(history)
+        # Replayed events are restamped to now on every start, so only keep live buckets
+        if self.config.liquidation_source != 'replay':
+            self.liquidations = LiquidationAggregator.from_dict(state['liquidations'],
+                                                                self.config.liquidation_bucket_seconds,
+                                                                self.config.liquidation_window_buckets)
+        print(f"♻️  Restored {len(collector.futures_buffer)} futures, {len(collector.funding_buffer)} funding, "
+              f"{len(collector.options_buffer)} options rows from checkpoint")
+    
+    def start_liquidation_feed(self):
+        """Start pushing liquidation events into the aggregator in the background"""
+        if not self.config.liquidations_enabled or self.liquidation_feed:
+            return
+        feed_class = LiquidationReplayFeed if self.config.liquidation_source == 'replay' else LiquidationStreamFeed
+        feed = feed_class(self.config, self.liquidations)
+        try:
+            feed.start()
+            self.liquidation_feed = feed
+        except Exception as e:
+            print(f"⚠️  Liquidation feed unavailable: {e}")
+    
+    def stop_liquidation_feed(self):
+        if self.liquidation_feed:
+            self.liquidation_feed.stop()
+            self.liquidation_feed = None
+    
+    def _seed_from_storage(self):
+        """Seed the buffers from the locally stored partitions (no network)"""
+        try:
+            since = datetime.now(timezone.utc) - timedelta(hours=self.config.backfill_hours)
+            self.collector.seed_buffers(
+                self.storage.load_partitioned('futures', start=since),
+                self.storage.load_partitioned('funding', start=since)
+            )
+        except Exception as e:
+            print(f"⚠️  Could not seed buffers from storage, features will start cold: {e}")
+    
+    def backfill_history(self):
+        """Page recent venue history into storage, then top the buffers up from it"""
+        try:
+            DerivativeBackfiller(self.config, self.collector.exchanges, self.storage).run()
+        except Exception as e:
+            print(f"⚠️  Backfill failed: {e}")
+            return
+        self._seed_from_storage()
     
     def _ensure_directories(self):
         """Create necessary directories if they don't exist"""
@@ -735,6 +2580,11 @@ class DerivativeApp:
         for dir_path in dirs:
             os.makedirs(dir_path, exist_ok=True)
     
+    @staticmethod
+    def _latest_per_venue(records: List[Any]) -> List[Any]:
+        """Most recent record for each exchange"""
+        return list({r.exchange: r for r in records}.values())
+    
     def run_single_analysis(self):
         """Run a single analysis cycle"""
         print(f"\n🔍 Running Derivative Analysis - {datetime.now(timezone.utc).strftime('%H:%M:%S UTC')}")
@@ -744,20 +2594,30 @@ class DerivativeApp:
             self.collector.collect_data()
             
             # Get recent data for feature calculation
-            recent_futures = list(self.collector.futures_buffer)[-10:]
-            recent_funding = list(self.collector.funding_buffer)[-10:]
+            recent_futures = list(self.collector.futures_buffer)
+            recent_funding = list(self.collector.funding_buffer)
             
             if not recent_futures and not recent_funding:
                 print("❌ No derivative data available")
                 return
             
-            # Calculate features
-            latest_futures = recent_futures[-5:] if recent_futures else []
-            latest_funding = recent_funding[-5:] if recent_funding else []
-            latest_options = list(self.collector.options_buffer)[-5:] if self.collector.options_buffer else []
+            # Calculate features on this cycle's rows (or each venue's last row if the fetch failed)
+            latest_futures = self.collector.latest_futures or self._latest_per_venue(recent_futures)
+            latest_funding = self.collector.latest_funding or self._latest_per_venue(recent_funding)
+            latest_options = self.collector.latest_options
+            
+            # Without a running feed the buckets hold nothing new, so the stream features are missing
+            if self.liquidation_feed:
+                liquidation_features = self.liquidations.features(cascade_zscore=self.config.liquidation_cascade_zscore)
+            else:
+                liquidation_features = {name: float('nan') for name in LIQUIDATION_FEATURES}
             
             features = self.feature_engine.calculate_all_features(
-                latest_futures, latest_funding, latest_options, recent_futures, recent_funding
+                latest_futures, latest_funding, latest_options, recent_futures, recent_funding,
+                futures_index=self.collector.futures_index,
+                funding_index=self.collector.funding_index,
+                liquidation_features=liquidation_features,
+                term_data=self.collector.latest_term_structure
             )
             
             # Generate prediction
@@ -765,9 +2625,16 @@ class DerivativeApp:
             
             # Save data
             self.storage.save_derivative_data(latest_futures, latest_funding, latest_options)
+            self.storage.save_liquidation_buckets(self.liquidations.drain_completed())
+            self.storage.save_term_structure(self.collector.latest_term_structure)
             self.storage.save_features(features)
             self.storage.save_signal(signal)
-            self.storage.generate_report(signal, features)
+            self.feature_engine.save_state(self.config.engine_state_file)
+            self.checkpointer.maybe_save(self._checkpoint_state)
+            self.storage.generate_report(signal, features, self.collector.latest_term_structure, {
+                'Basis': self.feature_engine.basis_dislocations,
+                'Funding': self.feature_engine.funding_dislocations,
+            })
             
             print(f"✅ Analysis complete: {signal.direction} (confidence: {signal.confidence:.2f})")
             print(f"📊 Features calculated: {len(asdict(features))} features")
@@ -788,6 +2655,9 @@ class DerivativeApp:
         print(f"{'='*60}")
         
         self.running = True
+        if self.config.backfill_on_startup:
+            self.backfill_history()
+        self.start_liquidation_feed()
         
         def collection_loop():
             while self.running:
@@ -825,6 +2695,8 @@ class DerivativeApp:
         except KeyboardInterrupt:
             print(f"\n🛑 Stopping data collection...")
             self.running = False
+            self.stop_liquidation_feed()
+            self.checkpointer.maybe_save(self._checkpoint_state, force=True)
 
 # ==============================
 # Main Entry Point
@@ -3,8 +3,8 @@
 # Collects mempool metrics, fee estimates, and network stats every 15 minutes
 # Generates 1-hour directional signals using on-chain market structure
 
-import os, json, time, asyncio
-from dataclasses import dataclass, asdict
+import os, json, time, asyncio, hashlib, math, statistics, abc
+from dataclasses import dataclass, asdict, field, replace
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 import pandas as pd
@@ -13,10 +13,14 @@ import pytz
 from collections import deque
 import threading
 import schedule
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 
+from AlphaCrypto_Storage import (Checkpointer, SignalLog, pack_records, unpack_records, read_csv_tail, records_from_frame,
+                                 append_csv_rows, apply_schema, schema_dtypes)
+
 # ==============================
 # Configuration
 # ==============================
@@ -28,21 +32,71 @@ class OnChainConfig:
     feature_window_minutes: int = 60  # 1-hour rolling windows
     signal_update_minutes: int = 15  # Update signals every 15 minutes
     max_data_points: int = 96  # 24 hours of 15-minute data
+    trend_window_points: int = 96  # Observations behind the trend/volatility features (may exceed max_data_points)
     
     # API endpoints
     mempool_base: str = "https://mempool.space/api"
     blockchair_base: str = "https://api.blockchair.com/bitcoin"
+    esplora_base: str = "https://blockstream.info/api"
+    
+    # Metric providers: each metric is asked of the healthiest sources that have it, concurrently
+    metric_providers: List[str] = field(default_factory=lambda: ['mempool_space', 'esplora', 'blockchair'])
+    metric_resolution: str = "median"  # "median" of the sources that answered, or the "fastest" valid answer
+    provider_fanout: int = 2  # Sources queried per metric, best health score first
+    provider_deadline_seconds: float = 12.0  # Later answers are dropped unless a metric has no value yet
+    provider_grace_seconds: float = 20.0  # Past the deadline, how long to wait for metrics nobody has answered
+    provider_probe_cycles: int = 8  # Sources left out this many cycles are queried again to refresh their score
+    provider_health_alpha: float = 0.2  # EWMA weight of the newest latency/success sample
+    provider_fixture_file: str = "data/fixtures/onchain_metrics.json"  # Values served by the "fixture" provider
+    provider_fixture_latency_seconds: float = 0.0
+    
+    # HTTP client (one keep-alive pool, endpoints fetched concurrently)
+    http_pool_size: int = 8
+    http_timeout_seconds: float = 15.0  # Default for endpoints without their own timeout
+    endpoint_timeouts: Dict[str, float] = field(default_factory=lambda: {
+        'mempool': 10.0, 'fees': 10.0, 'blocks': 10.0,
+        'es_mempool': 10.0, 'es_fees': 10.0, 'es_blocks': 10.0,
+        'bc_stats': 20.0, 'bc_blocks': 20.0,
+    })
+    # Seconds a response is reused without asking the source (0 = always revalidate).
+    # Stale entries are revalidated with ETag/If-Modified-Since where the source sends them.
+    # All of these are shorter than data_collection_interval, so scheduled cycles always
+    # revalidate; the TTLs only save requests when polling faster, as extended mode does (15s).
+    endpoint_ttls: Dict[str, float] = field(default_factory=lambda: {
+        'mempool': 0.0, 'fees': 30.0, 'blocks': 60.0,
+        'es_mempool': 0.0, 'es_fees': 30.0, 'es_blocks': 60.0,
+        'bc_stats': 300.0, 'bc_blocks': 120.0,
+    })
     
     # Output files
     onchain_data_file: str = "data/raw/onchain_data.csv"
     features_file: str = "data/processed/onchain_features.csv"
-    signals_file: str = "data/outputs/onchain_signals.json"
+    signals_file: str = "data/outputs/onchain_signals.json"  # Latest signal
+    signal_log_file: str = "data/outputs/onchain_signals.jsonl"  # Append-only history
     report_file: str = "data/outputs/reports/onchain_report.md"
+    blocks_file: str = "data/raw/onchain_blocks.csv"  # One row per block height
+    heartbeats_file: str = "data/raw/onchain_heartbeats.csv"  # Collections whose source payloads were unchanged
+    state_file: str = "data/processed/onchain_state.json"  # Content hash of the last stored snapshot
+    
+    # Warm-restart checkpoint of the rolling buffers (replaces the CSV replay when fresh)
+    checkpoint_file: str = "data/cache/onchain_checkpoint.json.gz"  # Gitignored, never committed by the workflows
+    checkpoint_interval_seconds: int = 900
+    checkpoint_max_age_hours: float = 6.0
     
     # Feature calculation parameters
     mempool_congestion_threshold: float = 50000  # High mempool count threshold
     fee_pressure_threshold: float = 50  # High fee threshold (sat/vB)
     network_activity_threshold: float = 0.1  # 10% change in network activity
+    
+    # Block ingestion (every block by height, not just the tip seen at each poll)
+    block_catchup_limit: int = 144  # Most blocks fetched to close a gap (~1 day)
+    block_history: int = 144  # Recent blocks kept in memory for features and reorg checks
+    block_feature_window: int = 6  # Blocks behind the per-block features (~1 hour)
+    max_block_weight: int = 4_000_000
+    
+    # Mempool fee-rate histogram summaries
+    fee_sketch_accuracy: float = 0.01  # Relative error of reported fee percentiles
+    fee_window_points: int = 96  # Polls merged into the rolling fee sketch (24 hours)
 
 @dataclass
 class OnChainData:
@@ -113,6 +167,18 @@ class OnChainFeatures:
     block_size_trend: float = 0.0
     block_weight_trend: float = 0.0
     
+    # Per-block features over the last `block_feature_window` blocks
+    block_interval_seconds: float = 0.0
+    block_fullness: float = 0.0  # Weight / max block weight
+    block_fees_btc: float = 0.0  # Total fees
+    
+    # Mempool fee-rate percentiles (sat/vB, weighted by vsize)
+    mempool_fee_p10: float = 0.0
+    mempool_fee_p50: float = 0.0
+    mempool_fee_p90: float = 0.0
+    fee_p50_window: float = 0.0  # Over the last `fee_window_points` polls
+    fee_p90_window: float = 0.0
+    
     # Market structure features
     market_structure_score: float = 0.0
     liquidity_score: float = 0.0
@@ -129,88 +195,221 @@ class OnChainSignal:
     features_used: List[str]
     prediction_hours: float
 
-class OnChainApp:
-    def __init__(self, config: OnChainConfig = None):
-        self.config = config or OnChainConfig()
-        self.data_buffer = deque(maxlen=self.config.max_data_points)
-        self.features_buffer = deque(maxlen=self.config.max_data_points)
-        self.signals_buffer = deque(maxlen=24)  # Keep 24 hours of signals
-        
-        # Ensure output directories exist
-        self._ensure_directories()
-        
-        # Load existing data
-        self._load_existing_data()
-        
-    def _ensure_directories(self):
-        """Ensure all output directories exist"""
-        directories = [
-            "data/raw",
-            "data/processed", 
-            "data/outputs",
-            "data/outputs/reports"
-        ]
-        for directory in directories:
-            Path(directory).mkdir(parents=True, exist_ok=True)
+# ==============================
+# Persistence Schema
+# ==============================
+# CSV dtypes shared by the writers and the loader, one schema per record type.
+# Counts, heights and sizes are nullable Int64. Magnitudes past int64 (hashrate
+# in H/s) and all rates, prices and totals are float64 in their source units.
+# 'datetime' columns are parsed back to UTC timestamps on load.
+_ONCHAIN_INT_FIELDS = {
+    'mempool_count', 'mempool_vsize', 'tip_height', 'tip_timestamp', 'tip_tx_count', 'tip_size', 'tip_weight',
+    'bc_blocks', 'bc_transactions', 'bc_mempool_transactions', 'bc_tip_tx_count', 'bc_tip_size', 'bc_tip_weight',
+}
+_ONCHAIN_STRING_FIELDS = {'symbol', 'bc_tip_id', 'bc_tip_time'}
+
+ONCHAIN_RECORD_SCHEMAS: Dict[str, Dict[str, str]] = {
+    'data': {
+        name: 'datetime' if name == 'timestamp' else
+              'Int64' if name in _ONCHAIN_INT_FIELDS else
+              'string' if name in _ONCHAIN_STRING_FIELDS else 'float64'
+        for name in OnChainData.__dataclass_fields__
+    },
+    'features': {
+        name: 'datetime' if name == 'timestamp' else 'string' if name == 'symbol' else 'float64'
+        for name in OnChainFeatures.__dataclass_fields__
+    },
+    'blocks': {
+        'height': 'Int64',
+        'block_hash': 'string',
+        'timestamp': 'Int64',  # Unix seconds from the block header
+        'tx_count': 'Int64',
+        'size': 'Int64',
+        'weight': 'Int64',
+        'total_fees_sat': 'float64',
+        'median_fee_rate': 'float64',
+        'avg_fee_rate': 'float64',
+        'interval_seconds': 'float64',
+        'fullness': 'float64',
+    },
+}
+
+def load_onchain_csv(path: str, record_type: str = 'data', tail_rows: Optional[int] = None) -> pd.DataFrame:
+    """Load an on-chain CSV as typed columns (optionally only its last `tail_rows` rows)"""
+    schema = ONCHAIN_RECORD_SCHEMAS[record_type]
+    dtypes = schema_dtypes(schema)
+    if tail_rows is None:
+        df = pd.read_csv(path, dtype=dtypes)
+    else:
+        df = read_csv_tail(path, tail_rows, dtype=dtypes)
+    return apply_schema(df, schema)
+
+# ==============================
+# HTTP Client
+# ==============================
+@dataclass
+class CachedResponse:
+    payload: Any
+    fetched_at: float  # time.monotonic() of the last 200/304
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+class OnChainHttpClient:
+    """Pooled keep-alive HTTP client for the on-chain sources.
     
-    def _load_existing_data(self):
-        """Load existing data from CSV files"""
-        try:
-            # Check if running in GitHub Actions
-            is_github_actions = os.getenv('GITHUB_ACTIONS') == 'true'
-            
-            # Load raw data
-            if os.path.exists(self.config.onchain_data_file):
-                df = pd.read_csv(self.config.onchain_data_file)
-                df['timestamp'] = pd.to_datetime(df['timestamp'], format='mixed')
-                
-                if is_github_actions:
-                    print(f"🔄 GitHub Actions detected - loading all historical data for feature calculations")
-                
-                for _, row in df.iterrows():
-                    data = OnChainData(**{k: v for k, v in row.items() if k in OnChainData.__dataclass_fields__})
-                    self.data_buffer.append(data)
-                print(f"📊 Loaded {len(self.data_buffer)} existing onchain data points")
-            
-            # Load features
-            if os.path.exists(self.config.features_file):
-                df = pd.read_csv(self.config.features_file)
-                df['timestamp'] = pd.to_datetime(df['timestamp'], format='mixed')
-                
-                if is_github_actions:
-                    print(f"🔄 GitHub Actions detected - loading all historical features")
-                
-                for _, row in df.iterrows():
-                    features = OnChainFeatures(**{k: v for k, v in row.items() if k in OnChainFeatures.__dataclass_fields__})
-                    self.features_buffer.append(features)
-                print(f"🔍 Loaded {len(self.features_buffer)} existing feature points")
-                
-        except Exception as e:
-            print(f"⚠️  Warning: Could not load existing data: {e}")
+    One `requests.Session` reuses TCP/TLS connections across cycles, and
+    `fetch_many` issues a batch of endpoint calls on a persistent thread pool,
+    so a cycle costs about as long as its slowest endpoint.
+    
+    Responses are cached per URL. Within an endpoint's TTL the cached body is
+    returned without a request; after it, the request carries If-None-Match /
+    If-Modified-Since when the source gave an ETag / Last-Modified, and a 304
+    reuses the cached body. Errors are never cached.
+    """
+    
+    OUTCOMES = ('fresh', 'revalidated', 'fetched', 'error')
+    
+    def __init__(self, config: OnChainConfig):
+        self.config = config
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=config.http_pool_size, pool_maxsize=config.http_pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=config.http_pool_size, thread_name_prefix='onchain-http')
+        self.cache: Dict[str, CachedResponse] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
     
-    def _safe_get(self, url: str, timeout: int = 15) -> Dict[str, Any]:
-        """Safely fetch data from API with error handling"""
+    def _record(self, name: str, outcome: str):
+        with self._lock:
+            counts = self.stats.setdefault(name, dict.fromkeys(self.OUTCOMES, 0))
+            counts[outcome] += 1
+    
+    def get(self, url: str, timeout: float, ttl: float = 0.0, name: Optional[str] = None) -> Any:
+        """JSON body of a GET (possibly cached), or an error dict (never raises)"""
+        name = name or url
+        with self._lock:
+            entry = self.cache.get(url)
+            fresh = entry is not None and time.monotonic() - entry.fetched_at < ttl
+        if fresh:
+            self._record(name, 'fresh')
+            return entry.payload
+        
+        headers = {}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
         try:
-            response = requests.get(url, timeout=timeout)
+            response = self.session.get(url, timeout=timeout, headers=headers)
+            if response.status_code == 304 and entry is not None:
+                with self._lock:
+                    entry.fetched_at = time.monotonic()
+                self._record(name, 'revalidated')
+                return entry.payload
             response.raise_for_status()
-            return response.json()
+            payload = response.json()
         except Exception as e:
+            self._record(name, 'error')
             return {"_error": str(e), "_source": url}
-    
-    def _get_mempool_metrics(self) -> Dict[str, Any]:
-        """Fetch mempool metrics from mempool.space"""
-        # Mempool data
-        mempool = self._safe_get(f"{self.config.mempool_base}/mempool")
-        # Fee recommendations
-        fees = self._safe_get(f"{self.config.mempool_base}/v1/fees/recommended")
-        # Recent blocks
-        blocks = self._safe_get(f"{self.config.mempool_base}/blocks")
-        latest_block = blocks[0] if isinstance(blocks, list) and blocks else {}
         
+        with self._lock:
+            self.cache[url] = CachedResponse(payload, time.monotonic(),
+                                             response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        self._record(name, 'fetched')
+        return payload
+    
+    def fetch_many(self, endpoints: Dict[str, str]) -> Dict[str, Any]:
+        """Fetch named endpoints concurrently, each under its own timeout and TTL"""
+        futures = {
+            name: self.executor.submit(self.get, url,
+                                       self.config.endpoint_timeouts.get(name, self.config.http_timeout_seconds),
+                                       self.config.endpoint_ttls.get(name, 0.0), name)
+            for name, url in endpoints.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+    
+    def hit_rate(self, name: Optional[str] = None) -> float:
+        """Share of calls answered from cache (fresh or 304), overall or for one endpoint"""
+        with self._lock:
+            rows = [self.stats[name]] if name in self.stats else ([] if name else list(self.stats.values()))
+            total = sum(sum(counts.values()) for counts in rows)
+            hits = sum(counts['fresh'] + counts['revalidated'] for counts in rows)
+        return hits / total if total else 0.0
+    
+    def cache_summary(self) -> str:
+        """One line per endpoint: hit rate and outcome counts"""
+        with self._lock:
+            names = sorted(self.stats)
+        return "\n".join(f"- **{name}**: {self.hit_rate(name):.0%} hits "
+                         f"({', '.join(f'{k} {v}' for k, v in self.stats[name].items())})" for name in names)
+    
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+# ==============================
+# Metric Providers
+# ==============================
+class ProviderError(Exception):
+    """A provider could not answer any of its metrics"""
+
+def _valid_metric(value: Any) -> bool:
+    if value is None or isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return math.isfinite(value)
+    if isinstance(value, (list, dict, str)):
+        return len(value) > 0
+    return True
+
+class MetricProvider(abc.ABC):
+    """A source of OnChainData metrics. `fetch` returns {metric: value} for the
+    metrics it could get (missing ones as None) and raises if it got none."""
+    
+    name = 'provider'
+    metrics: Tuple[str, ...] = ()
+    
+    def __init__(self, config: OnChainConfig, http: OnChainHttpClient):
+        self.config = config
+        self.http = http
+    
+    @abc.abstractmethod
+    def fetch(self) -> Dict[str, Any]:
+        ...
+    
+    def _fetch_endpoints(self, endpoints: Dict[str, str]) -> Dict[str, Any]:
+        """Payloads by endpoint name, None for failed ones (raises if all failed)"""
+        responses = self.http.fetch_many(endpoints)
+        errors = {name: r['_error'] for name, r in responses.items() if isinstance(r, dict) and '_error' in r}
+        if len(errors) == len(responses):
+            raise ProviderError('; '.join(f"{name}: {error}" for name, error in errors.items()))
+        return {name: None if name in errors else r for name, r in responses.items()}
+
+class MempoolSpaceProvider(MetricProvider):
+    """mempool.space: mempool, recommended fees and the latest blocks page"""
+    
+    name = 'mempool_space'
+    metrics = ('mempool_count', 'mempool_vsize', 'mempool_total_fee_btc', 'fee_histogram',
+               'fee_fastest_satvB', 'fee_30min_satvB', 'fee_60min_satvB', 'fee_economy_satvB', 'fee_min_satvB',
+               'tip_height', 'tip_timestamp', 'tip_tx_count', 'tip_size', 'tip_weight', 'blocks_page')
+    
+    def fetch(self) -> Dict[str, Any]:
+        base = self.config.mempool_base
+        r = self._fetch_endpoints({
+            'mempool': f"{base}/mempool",
+            'fees': f"{base}/v1/fees/recommended",
+            'blocks': f"{base}/v1/blocks",  # Newest 15 blocks with fee extras
+        })
+        mempool = r['mempool'] if isinstance(r['mempool'], dict) else {}
+        fees = r['fees'] if isinstance(r['fees'], dict) else {}
+        blocks = r['blocks'] if isinstance(r['blocks'], list) else []
+        latest_block = blocks[0] if blocks else {}
         return {
             "mempool_count": mempool.get("count"),
             "mempool_vsize": mempool.get("vsize"),
             "mempool_total_fee_btc": mempool.get("total_fee"),
+            "fee_histogram": mempool.get("fee_histogram"),
             "fee_fastest_satvB": fees.get("fastestFee"),
             "fee_30min_satvB": fees.get("halfHourFee"),
             "fee_60min_satvB": fees.get("hourFee"),
@@ -221,19 +420,64 @@ class OnChainApp:
             "tip_tx_count": latest_block.get("tx_count"),
             "tip_size": latest_block.get("size"),
             "tip_weight": latest_block.get("weight"),
+            "blocks_page": blocks or None,
         }
+
+class EsploraProvider(MetricProvider):
+    """Blockstream Esplora: same mempool and tip fields, fees from confirmation-target estimates"""
     
-    def _get_blockchair_stats(self) -> Dict[str, Any]:
-        """Fetch network stats from Blockchair"""
-        # Network statistics
-        stats = self._safe_get(f"{self.config.blockchair_base}/stats")
-        data = stats.get("data", {}) if isinstance(stats, dict) else {}
-        
-        # Latest block
-        latest_blocks = self._safe_get(f"{self.config.blockchair_base}/blocks?limit=1")
-        latest_data = latest_blocks.get("data", []) if isinstance(latest_blocks, dict) else []
+    name = 'esplora'
+    metrics = ('mempool_count', 'mempool_vsize', 'mempool_total_fee_btc', 'fee_histogram',
+               'fee_fastest_satvB', 'fee_30min_satvB', 'fee_60min_satvB', 'fee_economy_satvB',
+               'tip_height', 'tip_timestamp', 'tip_tx_count', 'tip_size', 'tip_weight')
+    
+    def fetch(self) -> Dict[str, Any]:
+        base = self.config.esplora_base
+        r = self._fetch_endpoints({
+            'es_mempool': f"{base}/mempool",
+            'es_fees': f"{base}/fee-estimates",  # sat/vB by confirmation target (blocks)
+            'es_blocks': f"{base}/blocks",
+        })
+        mempool = r['es_mempool'] if isinstance(r['es_mempool'], dict) else {}
+        estimates = r['es_fees'] if isinstance(r['es_fees'], dict) else {}
+        blocks = r['es_blocks'] if isinstance(r['es_blocks'], list) else []
+        latest_block = blocks[0] if blocks else {}
+        return {
+            "mempool_count": mempool.get("count"),
+            "mempool_vsize": mempool.get("vsize"),
+            "mempool_total_fee_btc": mempool.get("total_fee"),
+            "fee_histogram": mempool.get("fee_histogram"),
+            "fee_fastest_satvB": estimates.get("1"),
+            "fee_30min_satvB": estimates.get("3"),
+            "fee_60min_satvB": estimates.get("6"),
+            "fee_economy_satvB": estimates.get("144"),
+            "tip_height": latest_block.get("height"),
+            "tip_timestamp": latest_block.get("timestamp"),
+            "tip_tx_count": latest_block.get("tx_count"),
+            "tip_size": latest_block.get("size"),
+            "tip_weight": latest_block.get("weight"),
+        }
+
+class BlockchairProvider(MetricProvider):
+    """Blockchair: network stats and its view of the latest block"""
+    
+    name = 'blockchair'
+    metrics = ('bc_blocks', 'bc_transactions', 'bc_mempool_transactions', 'bc_circulation',
+               'bc_market_price_usd', 'bc_hashrate_24h', 'bc_difficulty', 'bc_average_transaction_fee_24h_usd',
+               'bc_average_transaction_value_24h_usd', 'bc_median_transaction_fee_24h_usd',
+               'bc_tip_id', 'bc_tip_time', 'bc_tip_tx_count', 'bc_tip_size', 'bc_tip_weight', 'bc_tip_difficulty')
+    
+    def fetch(self) -> Dict[str, Any]:
+        base = self.config.blockchair_base
+        r = self._fetch_endpoints({
+            'bc_stats': f"{base}/stats",
+            'bc_blocks': f"{base}/blocks?limit=1",
+        })
+        stats = r['bc_stats'] if isinstance(r['bc_stats'], dict) else {}
+        data = stats.get("data", {}) or {}
+        latest_blocks = r['bc_blocks'] if isinstance(r['bc_blocks'], dict) else {}
+        latest_data = latest_blocks.get("data", []) or []
         latest = latest_data[0] if latest_data else {}
-        
         return {
             "bc_blocks": data.get("blocks"),
             "bc_transactions": data.get("transactions"),
@@ -252,28 +496,857 @@ class OnChainApp:
             "bc_tip_weight": latest.get("weight"),
             "bc_tip_difficulty": latest.get("difficulty"),
         }
+
+class FixtureProvider(MetricProvider):
+    """Local stand-in source: serves the metrics in a JSON file, after an optional delay"""
+    
+    name = 'fixture'
+    
+    def __init__(self, config: OnChainConfig, http: OnChainHttpClient):
+        super().__init__(config, http)
+        with open(config.provider_fixture_file) as f:
+            self.values = json.load(f)
+        self.metrics = tuple(self.values)
+    
+    def fetch(self) -> Dict[str, Any]:
+        if self.config.provider_fixture_latency_seconds > 0:
+            time.sleep(self.config.provider_fixture_latency_seconds)
+        return dict(self.values)
+
+METRIC_PROVIDERS = {cls.name: cls for cls in (MempoolSpaceProvider, EsploraProvider, BlockchairProvider, FixtureProvider)}
+
+@dataclass
+class ProviderHealth:
+    """EWMA latency and success share of one provider (success = share of its metrics answered)"""
+    latency_seconds: float = 0.0
+    success: float = 1.0  # Untried providers rank first
+    calls: int = 0
+    failures: int = 0
+    last_cycle: int = 0
+    last_error: Optional[str] = None
+    
+    def update(self, latency: float, success: float, alpha: float):
+        if self.calls == 0:
+            self.latency_seconds, self.success = latency, success
+        else:
+            self.latency_seconds += alpha * (latency - self.latency_seconds)
+            self.success += alpha * (success - self.success)
+        self.calls += 1
+    
+    def score(self, deadline_seconds: float) -> float:
+        """Higher is better: success share discounted by latency relative to the deadline"""
+        return self.success / (1.0 + self.latency_seconds / max(deadline_seconds, 1e-9))
+
+class MetricQuorum:
+    """Resolves every OnChainData metric from several providers queried concurrently.
+    
+    Each cycle, the `provider_fanout` best-scoring providers of each metric are
+    queried (others on their first cycle and then every `provider_probe_cycles`
+    cycles, so a recovered source can win back its rank). "median" resolution waits for the queried providers
+    up to `provider_deadline_seconds` and takes the median of the numeric
+    answers (median_low for counts, so the value is one a source reported);
+    "fastest" stops as soon as every metric has a valid answer. Non-numeric
+    values come from the best-ranked provider that answered. The tip block
+    fields are resolved together: all of them come from the provider whose
+    tip height was chosen, so they never mix blocks. Past the deadline only
+    providers holding a still-missing metric are waited for, at most
+    `provider_grace_seconds` longer, and metrics no provider answered are
+    reported as gaps rather than left silently empty.
+    """
+    
+    TIP_METRICS = ('tip_height', 'tip_timestamp', 'tip_tx_count', 'tip_size', 'tip_weight')
+    
+    def __init__(self, config: OnChainConfig, providers: List[MetricProvider]):
+        self.config = config
+        self.providers = providers
+        self.health: Dict[str, ProviderHealth] = {p.name: ProviderHealth() for p in providers}
+        self.gaps: Dict[str, int] = {}
+        self.last_sources: Dict[str, List[str]] = {}
+        self.cycle = 0
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(providers)), thread_name_prefix='onchain-provider')
+        self._lock = threading.Lock()
+    
+    @property
+    def metrics(self) -> List[str]:
+        return list(dict.fromkeys(m for p in self.providers for m in p.metrics))
+    
+    def ranked(self) -> List[MetricProvider]:
+        with self._lock:
+            scores = {name: h.score(self.config.provider_deadline_seconds) for name, h in self.health.items()}
+        return sorted(self.providers, key=lambda p: scores[p.name], reverse=True)
+    
+    def select(self) -> List[MetricProvider]:
+        """Providers to query this cycle, best first"""
+        ranked = self.ranked()
+        chosen = set()
+        for metric in self.metrics:
+            covering = [p.name for p in ranked if metric in p.metrics]
+            chosen.update(covering[:self.config.provider_fanout])
+        with self._lock:
+            chosen.update(name for name, h in self.health.items()
+                          if h.last_cycle == 0 or self.cycle - h.last_cycle >= self.config.provider_probe_cycles)
+        return [p for p in ranked if p.name in chosen]
+    
+    def _record(self, provider: MetricProvider, started: float, future):
+        latency = time.monotonic() - started
+        with self._lock:
+            health = self.health[provider.name]
+            try:
+                values = future.result()
+                answered = sum(_valid_metric(values.get(m)) for m in provider.metrics)
+                success = answered / len(provider.metrics) if provider.metrics else 1.0
+                health.last_error = None if answered else "no valid metrics"
+            except Exception as e:
+                success = 0.0
+                health.failures += 1
+                health.last_error = str(e)[:200]
+            health.update(latency, success, self.config.provider_health_alpha)
+    
+    @staticmethod
+    def _resolve(values: List[Tuple[str, Any]]) -> Any:
+        """One value from (provider, value) answers, best-ranked first"""
+        numbers = [v for _, v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+        if numbers and len(numbers) == len(values):
+            if all(isinstance(v, int) for v in numbers):
+                return statistics.median_low(numbers)
+            return statistics.median(numbers)
+        return values[0][1]
+    
+    def collect(self) -> Dict[str, Any]:
+        """Resolved value of every metric (None where no provider answered)"""
+        self.cycle += 1
+        selected = self.select()
+        rank = {p.name: i for i, p in enumerate(selected)}
+        futures = {}
+        for provider in selected:
+            with self._lock:
+                self.health[provider.name].last_cycle = self.cycle
+            future = self.executor.submit(provider.fetch)
+            future.add_done_callback(lambda f, p=provider, t=time.monotonic(): self._record(p, t, f))
+            futures[future] = provider
+        
+        wanted = set(m for p in selected for m in p.metrics)
+        answers: Dict[str, List[Tuple[str, Any]]] = {}
+        reported: Dict[str, Dict[str, Any]] = {}
+        pending = set(futures)
+        deadline = time.monotonic() + self.config.provider_deadline_seconds
+        hard_deadline = deadline + self.config.provider_grace_seconds
+        
+        def absorb(done):
+            for future in done:
+                if future.exception() is not None:
+                    continue
+                provider = futures[future]
+                reported[provider.name] = future.result()
+                for metric, value in future.result().items():
+                    if metric in wanted and _valid_metric(value):
+                        answers.setdefault(metric, []).append((provider.name, value))
+        
+        while pending:
+            if self.config.metric_resolution == 'fastest' and wanted <= set(answers):
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Past the deadline, wait only for providers holding metrics nobody answered yet
+                missing = wanted - set(answers)
+                needed = {f for f in pending if missing & set(futures[f].metrics)}
+                grace = hard_deadline - time.monotonic()
+                if not needed or grace <= 0:
+                    print(f"🐢 Deadline passed, not waiting for: {', '.join(sorted(futures[f].name for f in pending))}")
+                    break
+                done, _ = wait(needed, timeout=grace, return_when=FIRST_COMPLETED)
+            else:
+                done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            pending -= done
+            absorb(done)
+        
+        resolved = {}
+        self.last_sources = {}
+        for metric in self.metrics:
+            values = answers.get(metric)
+            if not values:
+                resolved[metric] = None
+            elif self.config.metric_resolution == 'fastest':
+                values = values[:1]  # Answers are in completion order
+                resolved[metric] = values[0][1]
+            else:
+                values = sorted(values, key=lambda nv: rank[nv[0]])
+                resolved[metric] = self._resolve(values)
+            self.last_sources[metric] = [name for name, _ in values or []]
+        
+        # Tip fields describe one block: take them all from the provider whose height was chosen
+        heights = answers.get('tip_height')
+        if heights:
+            if self.config.metric_resolution == 'fastest':
+                source = heights[0][0]
+            else:
+                heights = sorted(heights, key=lambda nv: rank[nv[0]])
+                height = statistics.median_low([v for _, v in heights])
+                source = next(name for name, v in heights if v == height)
+            for metric in self.TIP_METRICS:
+                if metric in resolved:
+                    value = reported[source].get(metric)
+                    resolved[metric] = value if _valid_metric(value) else None
+                    self.last_sources[metric] = [source] if resolved[metric] is not None else []
+        
+        gaps = [m for m in self.metrics if resolved[m] is None]
+        if gaps:
+            for metric in gaps:
+                self.gaps[metric] = self.gaps.get(metric, 0) + 1
+            print(f"🕳️  No provider answered: {', '.join(gaps)}")
+        return resolved
+    
+    def health_summary(self) -> str:
+        """One line per provider: score, latency, success share, failures, last error"""
+        deadline = self.config.provider_deadline_seconds
+        lines = []
+        for provider in self.ranked():
+            h = self.health[provider.name]
+            line = (f"- **{provider.name}**: score {h.score(deadline):.2f}, {h.latency_seconds:.2f}s, "
+                    f"{h.success:.0%} answered, {h.failures}/{h.calls} failed")
+            if h.last_error:
+                line += f" (last error: {h.last_error})"
+            lines.append(line)
+        if self.gaps:
+            lines.append(f"- **Gaps**: {', '.join(f'{m} {n}' for m, n in sorted(self.gaps.items()))}")
+        return "\n".join(lines)
+    
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+def build_metric_providers(config: OnChainConfig, http: OnChainHttpClient) -> List[MetricProvider]:
+    unknown = [name for name in config.metric_providers if name not in METRIC_PROVIDERS]
+    if unknown:
+        raise ValueError(f"Unknown metric provider(s) {unknown}; expected any of {sorted(METRIC_PROVIDERS)}")
+    return [METRIC_PROVIDERS[name](config, http) for name in config.metric_providers]
+
+# ==============================
+# Block Ingestion
+# ==============================
+@dataclass
+class BlockRecord:
+    height: int
+    block_hash: str
+    timestamp: int  # Block header time (unix seconds)
+    tx_count: int
+    size: int
+    weight: int
+    total_fees_sat: Optional[float] = None
+    median_fee_rate: Optional[float] = None  # sat/vB
+    avg_fee_rate: Optional[float] = None  # sat/vB
+    interval_seconds: Optional[float] = None  # Since the previous block
+    fullness: Optional[float] = None  # Weight / max block weight
+
+class BlockIngester:
+    """Ingests every block by height into a height-indexed CSV store.
+    
+    Each poll passes in the latest `/v1/blocks` page (the newest 15 blocks).
+    Only blocks above the last stored height are kept; if the gap is wider
+    than one page, older pages are fetched from `/v1/blocks/{height}` until it
+    closes (up to `block_catchup_limit`). A block whose hash differs from the
+    stored one at the same height (a reorg) is stored again; readers keep the
+    last row per height.
+    """
+    
+    def __init__(self, config: OnChainConfig, http: 'OnChainHttpClient'):
+        self.config = config
+        self.http = http
+        self.recent: deque = deque(maxlen=config.block_history)
+        self._load_recent()
+    
+    @property
+    def last_height(self) -> Optional[int]:
+        return self.recent[-1].height if self.recent else None
+    
+    def _load_recent(self):
+        if not os.path.exists(self.config.blocks_file):
+            return
+        try:
+            df = load_onchain_csv(self.config.blocks_file, 'blocks', tail_rows=self.config.block_history * 2)
+            df = df.drop_duplicates('height', keep='last').sort_values('height').tail(self.config.block_history)
+            self.recent.extend(records_from_frame(df, BlockRecord))
+        except Exception as e:
+            print(f"⚠️  Could not load block history: {e}")
+    
+    def _to_record(self, block: Dict[str, Any]) -> BlockRecord:
+        extras = block.get('extras') or {}
+        return BlockRecord(
+            height=int(block['height']),
+            block_hash=block.get('id', ''),
+            timestamp=int(block['timestamp']),
+            tx_count=block.get('tx_count'),
+            size=block.get('size'),
+            weight=block.get('weight'),
+            total_fees_sat=extras.get('totalFees'),
+            median_fee_rate=extras.get('medianFee'),
+            avg_fee_rate=extras.get('avgFeeRate'),
+        )
+    
+    def ingest(self, latest_page: Any) -> List[BlockRecord]:
+        """Store blocks new since the last poll (or replaced by a reorg); returns them oldest first"""
+        if not isinstance(latest_page, list) or not latest_page:
+            return []
+        fetched = {b['height']: b for b in latest_page if isinstance(b, dict) and 'height' in b}
+        
+        # Page back until the page reaches the stored tip
+        last = self.last_height
+        while last is not None and fetched and min(fetched) > last + 1 \
+                and max(fetched) - min(fetched) < self.config.block_catchup_limit:
+            page = self.http.get(f"{self.config.mempool_base}/v1/blocks/{min(fetched) - 1}",
+                                 self.config.endpoint_timeouts.get('blocks', self.config.http_timeout_seconds))
+            if not isinstance(page, list) or not page:
+                break
+            fetched.update({b['height']: b for b in page if isinstance(b, dict) and 'height' in b})
+        
+        known = {b.height: b.block_hash for b in self.recent}
+        new_blocks = [self._to_record(fetched[h]) for h in sorted(fetched)
+                      if (last is None or h > last or known.get(h) not in (None, fetched[h].get('id')))]
+        if not new_blocks:
+            return []
+        
+        # Intervals and fullness need the previous block, stored or fetched
+        previous = {b.height: b for b in self.recent}
+        for block in new_blocks:
+            prior = previous.get(block.height - 1)
+            block.interval_seconds = float(block.timestamp - prior.timestamp) if prior else None
+            block.fullness = block.weight / self.config.max_block_weight if block.weight else None
+            previous[block.height] = block
+        
+        # A reorg replaces the stored suffix from the first changed height
+        reorged = [b.height for b in new_blocks if b.height in known]
+        if reorged:
+            print(f"⚠️  Reorg: replacing blocks {reorged}")
+            kept = [b for b in self.recent if b.height < reorged[0]]
+            self.recent.clear()
+            self.recent.extend(kept)
+        self.recent.extend(new_blocks)
+        
+        append_csv_rows(self.config.blocks_file, [asdict(b) for b in new_blocks], ONCHAIN_RECORD_SCHEMAS['blocks'])
+        print(f"⛓️  Ingested {len(new_blocks)} block(s) up to height {new_blocks[-1].height}")
+        return new_blocks
+    
+    def load_blocks(self, start_height: Optional[int] = None) -> pd.DataFrame:
+        """The block store indexed by height (the last row wins for reorged heights)"""
+        if not os.path.exists(self.config.blocks_file):
+            return pd.DataFrame(columns=list(BlockRecord.__dataclass_fields__)).set_index('height')
+        df = load_onchain_csv(self.config.blocks_file, 'blocks')
+        if start_height is not None:
+            df = df[df['height'] >= start_height]
+        return df.drop_duplicates('height', keep='last').set_index('height').sort_index()
+    
+    def features(self) -> Dict[str, float]:
+        """Mean interval, mean fullness and total fees over the last `block_feature_window` blocks"""
+        window = list(self.recent)[-self.config.block_feature_window:]
+        intervals = [b.interval_seconds for b in window if b.interval_seconds is not None]
+        fullness = [b.fullness for b in window if b.fullness is not None]
+        fees = [b.total_fees_sat for b in window if b.total_fees_sat is not None]
+        return {
+            'block_interval_seconds': float(np.mean(intervals)) if intervals else 0.0,
+            'block_fullness': float(np.mean(fullness)) if fullness else 0.0,
+            'block_fees_btc': float(np.sum(fees)) / 1e8 if fees else 0.0,
+        }
+
+# ==============================
+# Fee Histogram Sketches
+# ==============================
+class DDSketch:
+    """Relative-error quantile sketch (DDSketch) with weighted inserts.
+    
+    Values fall into log-spaced buckets (gamma = (1+a)/(1-a)), so every
+    quantile comes back within relative accuracy `a` of the true value, and
+    memory grows with log(max/min) of the data, not with the number of
+    inserts. Sketches combine by adding bucket weights; subtracting is exact
+    for integer weights, which lets a rolling window evict old polls.
+    """
+    
+    MIN_VALUE = 1e-9  # Smaller values go to the zero bucket
+    
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, float] = {}
+        self.zero_weight = 0.0
+        self.weight = 0.0
+    
+    def add_many(self, values: np.ndarray, weights: np.ndarray):
+        values = np.asarray(values, dtype=float)
+        weights = np.asarray(weights, dtype=float)
+        keep = np.isfinite(values) & np.isfinite(weights) & (weights > 0)
+        values, weights = values[keep], weights[keep]
+        zero = values <= self.MIN_VALUE
+        self.zero_weight += float(weights[zero].sum())
+        keys = np.ceil(np.log(values[~zero]) / self._log_gamma).astype(int)
+        unique, inverse = np.unique(keys, return_inverse=True)
+        for key, total in zip(unique.tolist(), np.bincount(inverse, weights=weights[~zero]).tolist()):
+            self.bins[key] = self.bins.get(key, 0.0) + total
+        self.weight += float(weights.sum())
+    
+    def merge(self, other: 'DDSketch', sign: float = 1.0):
+        """Add (sign=1) or remove (sign=-1) another sketch's weights"""
+        for key, total in other.bins.items():
+            remaining = self.bins.get(key, 0.0) + sign * total
+            if remaining > 1e-9:
+                self.bins[key] = remaining
+            else:
+                self.bins.pop(key, None)
+        self.zero_weight = max(0.0, self.zero_weight + sign * other.zero_weight)
+        self.weight = max(0.0, self.weight + sign * other.weight)
+    
+    def quantile(self, q: float) -> float:
+        if self.weight <= 0:
+            return 0.0
+        rank = q * self.weight
+        cumulative = self.zero_weight
+        if cumulative >= rank and cumulative > 0:
+            return 0.0
+        for key in sorted(self.bins):
+            cumulative += self.bins[key]
+            if cumulative >= rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1) if self.bins else 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {'zero': self.zero_weight, 'bins': dict(self.bins)}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], relative_accuracy: float) -> 'DDSketch':
+        sketch = cls(relative_accuracy)
+        sketch.bins = {int(k): float(v) for k, v in data['bins'].items()}
+        sketch.zero_weight = float(data['zero'])
+        sketch.weight = sketch.zero_weight + sum(sketch.bins.values())
+        return sketch
+
+class RollingFeeSketch:
+    """Per-poll sketches of the mempool fee histogram plus their running merge over `window` polls"""
+    
+    def __init__(self, window: int, relative_accuracy: float = 0.01):
+        self.window = window
+        self.relative_accuracy = relative_accuracy
+        self.polls: deque = deque()
+        self.merged = DDSketch(relative_accuracy)
+    
+    def update(self, histogram: Any) -> Optional[DDSketch]:
+        """Add one `fee_histogram` ([[fee_rate, vsize], ...]); None if the payload has none"""
+        if not isinstance(histogram, list) or not histogram:
+            return None
+        bins = np.asarray(histogram, dtype=float).reshape(-1, 2)
+        sketch = DDSketch(self.relative_accuracy)
+        sketch.add_many(bins[:, 0], bins[:, 1])
+        self.polls.append(sketch)
+        self.merged.merge(sketch)
+        if len(self.polls) > self.window:
+            self.merged.merge(self.polls.popleft(), sign=-1.0)
+        return sketch
+    
+    def features(self) -> Dict[str, float]:
+        if not self.polls:
+            return {}
+        latest = self.polls[-1]
+        return {
+            'mempool_fee_p10': latest.quantile(0.10),
+            'mempool_fee_p50': latest.quantile(0.50),
+            'mempool_fee_p90': latest.quantile(0.90),
+            'fee_p50_window': self.merged.quantile(0.50),
+            'fee_p90_window': self.merged.quantile(0.90),
+        }
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {'polls': [sketch.to_dict() for sketch in self.polls]}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], window: int, relative_accuracy: float) -> 'RollingFeeSketch':
+        rolling = cls(window, relative_accuracy)
+        for poll in data['polls'][-window:]:
+            sketch = DDSketch.from_dict(poll, relative_accuracy)
+            rolling.polls.append(sketch)
+            rolling.merged.merge(sketch)
+        return rolling
+
+# ==============================
+# Online Window Statistics
+# ==============================
+TREND_COLUMNS = ('mempool_count', 'fee_30min_satvB', 'bc_transactions', 'tip_size', 'tip_weight')
+
+class RollingLinearStats:
+    """Least-squares slope and sample std of one series over its last `window` observations.
+    
+    Keeps Σx, Σy, Σxy, Σx², Σy² of the valid values in the window, so `update`
+    is O(1) including the eviction. x is the ordinal among valid values (as
+    np.polyfit over the dropna'd window had it). y is stored shifted by a
+    reference value; both origins are re-based with a full re-sum once per lap,
+    which keeps the sums small and bounds floating-point drift.
+    """
+    
+    def __init__(self, window: int):
+        self.window = window
+        self._points: deque = deque()  # (x, shifted y), or None for a missing value
+        self._next_x = 0
+        self._shift: Optional[float] = None
+        self._updates = 0
+        self._resum()
+    
+    def _resum(self):
+        valid = [p for p in self._points if p is not None]
+        self.n = len(valid)
+        self._sx = float(sum(x for x, _ in valid))
+        self._sy = float(sum(y for _, y in valid))
+        self._sxy = float(sum(x * y for x, y in valid))
+        self._sxx = float(sum(x * x for x, _ in valid))
+        self._syy = float(sum(y * y for _, y in valid))
+    
+    def _rebase(self):
+        """Move both origins to the oldest valid point and re-sum"""
+        first = next((p for p in self._points if p is not None), None)
+        if first is None:
+            self._next_x, self._shift = 0, None
+        else:
+            x0, y0 = first
+            self._points = deque(None if p is None else (p[0] - x0, p[1] - y0) for p in self._points)
+            self._next_x -= x0
+            self._shift += y0
+        self._resum()
+    
+    def update(self, value: Optional[float]):
+        if len(self._points) == self.window:
+            old = self._points.popleft()
+            if old is not None:
+                x, y = old
+                self.n -= 1
+                self._sx -= x; self._sy -= y; self._sxy -= x * y
+                self._sxx -= x * x; self._syy -= y * y
+        
+        y = None if value is None else float(value)
+        if y is None or not np.isfinite(y):
+            self._points.append(None)
+        else:
+            if self._shift is None:
+                self._shift = y
+            x, y = self._next_x, y - self._shift
+            self._next_x += 1
+            self._points.append((x, y))
+            self.n += 1
+            self._sx += x; self._sy += y; self._sxy += x * y
+            self._sxx += x * x; self._syy += y * y
+        
+        self._updates += 1
+        if self._updates % self.window == 0:
+            self._rebase()
+    
+    def values(self) -> List[Optional[float]]:
+        """Window contents in the original units, oldest first"""
+        return [None if p is None else p[1] + self._shift for p in self._points]
+    
+    def slope(self) -> float:
+        if self.n < 2:
+            return 0.0
+        denominator = self.n * self._sxx - self._sx * self._sx
+        if denominator <= 0:
+            return 0.0
+        return float((self.n * self._sxy - self._sx * self._sy) / denominator)
+    
+    def std(self) -> float:
+        if self.n < 2:
+            return 0.0
+        variance = (self._syy - self._sy * self._sy / self.n) / (self.n - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+
+class OnChainWindowStats:
+    """Rolling trend/volatility stats for TREND_COLUMNS plus the timestamps of the window"""
+    
+    def __init__(self, window: int):
+        self.window = window
+        self.columns = {column: RollingLinearStats(window) for column in TREND_COLUMNS}
+        self.timestamps: deque = deque(maxlen=window)
+    
+    def update(self, data: 'OnChainData'):
+        for column, stats in self.columns.items():
+            stats.update(getattr(data, column))
+        self.timestamps.append(data.timestamp)
+    
+    def extend(self, records: List['OnChainData']):
+        for data in records:
+            self.update(data)
+    
+    @property
+    def count(self) -> int:
+        return len(self.timestamps)
+    
+    def trend(self, column: str) -> float:
+        return self.columns[column].slope()
+    
+    def volatility(self, column: str) -> float:
+        return self.columns[column].std()
+    
+    def mean_interval_seconds(self) -> float:
+        """Mean gap between consecutive observations in the window"""
+        if self.count < 2:
+            return 0.0
+        return (self.timestamps[-1] - self.timestamps[0]).total_seconds() / (self.count - 1)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {'timestamps': list(self.timestamps),
+                'columns': {column: stats.values() for column, stats in self.columns.items()}}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], window: int) -> 'OnChainWindowStats':
+        """Replay a saved window (a resized window keeps what fits)"""
+        window_stats = cls(window)
+        columns = {column: values for column, values in data['columns'].items() if column in window_stats.columns}
+        for i, timestamp in enumerate(data['timestamps']):
+            for column, values in columns.items():
+                window_stats.columns[column].update(values[i])
+            window_stats.timestamps.append(timestamp)
+        return window_stats
+
+class AggregatingBuffer:
+    """Bounded buffer of records that keeps running means of some numeric fields.
+    
+    Sums and counts of the valid (non-missing, finite) values are adjusted as
+    records are appended and evicted, so `mean` is O(1) whatever the buffer
+    size. They are re-summed once per lap to bound floating-point drift.
+    The records live in a private deque and only the operations that keep the
+    sums consistent are exposed (append/extend/clear plus read access).
+    Records are appended in time order, so the first and last span the range.
+    """
+    
+    def __init__(self, maxlen: int, mean_fields: List[str]):
+        self._records: deque = deque(maxlen=maxlen)
+        self.mean_fields = list(mean_fields)
+        self._evictions = 0
+        self._resum()
+    
+    @property
+    def maxlen(self) -> Optional[int]:
+        return self._records.maxlen
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def __iter__(self):
+        return iter(self._records)
+    
+    def __getitem__(self, index: int) -> Any:
+        return self._records[index]
+    
+    @staticmethod
+    def _valid(value: Any) -> bool:
+        return isinstance(value, (int, float, np.number)) and not isinstance(value, bool) and math.isfinite(value)
+    
+    def _resum(self):
+        self._sums = {name: 0.0 for name in self.mean_fields}
+        self._counts = {name: 0 for name in self.mean_fields}
+        for record in self._records:
+            self._add(record, 1)
+    
+    def _add(self, record: Any, sign: int):
+        for name in self.mean_fields:
+            value = getattr(record, name, None)
+            if self._valid(value):
+                self._sums[name] += sign * float(value)
+                self._counts[name] += sign
+    
+    def append(self, record: Any):
+        if self.maxlen is not None and len(self._records) == self.maxlen:
+            self._add(self._records[0], -1)
+            self._evictions += 1
+        self._records.append(record)
+        self._add(record, 1)
+        if self.maxlen and self._evictions >= self.maxlen:
+            self._evictions = 0
+            self._resum()
+    
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+    
+    def clear(self):
+        self._records.clear()
+        self._evictions = 0
+        self._resum()
+    
+    def mean(self, name: str) -> Optional[float]:
+        """Mean of a tracked field over the buffer, or None if it has no valid values"""
+        count = self._counts[name]
+        return self._sums[name] / count if count else None
+    
+    def time_range(self) -> Tuple[Optional[datetime], Optional[datetime]]:
+        if not self._records:
+            return None, None
+        return self._records[0].timestamp, self._records[-1].timestamp
+
+# ==============================
+# Main Application
+# ==============================
+class OnChainApp:
+    def __init__(self, config: OnChainConfig = None):
+        self.config = config or OnChainConfig()
+        # Running means feed the report without rebuilding frames from the buffers
+        self.data_buffer = AggregatingBuffer(self.config.max_data_points, ['mempool_count', 'fee_30min_satvB'])
+        self.features_buffer = AggregatingBuffer(self.config.max_data_points,
+                                                 ['network_activity_score', 'market_structure_score'])
+        self.signals_buffer = deque(maxlen=24)  # Keep 24 hours of signals
+        self.window_stats = OnChainWindowStats(self.config.trend_window_points)
+        self.fee_sketch = RollingFeeSketch(self.config.fee_window_points, self.config.fee_sketch_accuracy)
+        self.http = OnChainHttpClient(self.config)
+        self.quorum = MetricQuorum(self.config, build_metric_providers(self.config, self.http))
+        self.blocks = BlockIngester(self.config, self.http)
+        self.signal_log = SignalLog(self.config.signal_log_file, self.config.signals_file)
+        
+        # Ensure output directories exist
+        self._ensure_directories()
+        
+        # Restore the last checkpoint, then add CSV rows stored after it (or rebuild from the CSV files)
+        self.checkpointer = Checkpointer(self.config.checkpoint_file,
+                                         self.config.checkpoint_interval_seconds,
+                                         self.config.checkpoint_max_age_hours)
+        self._restore_checkpoint()
+        self._load_existing_data()
+        
+        # Rows up to these timestamps are already on disk
+        self._saved_data_ts = self.data_buffer[-1].timestamp if self.data_buffer else None
+        self._saved_features_ts = self.features_buffer[-1].timestamp if self.features_buffer else None
+        self._saved_signals_ts = self.signals_buffer[-1].timestamp if self.signals_buffer else None
+        
+        # Snapshots whose source payloads hash the same as the last one are not stored again
+        self.last_content_hash = self._load_state().get('content_hash')
+        self.snapshot_changed = True
+        
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.config.state_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_state(self):
+        """Write the dedup state atomically"""
+        state = {
+            'content_hash': self.last_content_hash,
+            'data_timestamp': self._saved_data_ts.isoformat() if self._saved_data_ts else None,
+        }
+        tmp_path = f"{self.config.state_file}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.config.state_file)
+    
+    @staticmethod
+    def _content_hash(metrics: Dict[str, Any]) -> str:
+        """Stable hash of the resolved source metrics (fee histogram and blocks page included)"""
+        canonical = json.dumps(metrics, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+    
+    def _save_heartbeat(self, timestamp: datetime, content_hash: str):
+        """Record an unchanged collection as one short line instead of a full row"""
+        file_exists = os.path.exists(self.config.heartbeats_file)
+        with open(self.config.heartbeats_file, 'a') as f:
+            if not file_exists:
+                f.write("timestamp,content_hash,data_timestamp\n")
+            data_timestamp = self._saved_data_ts.isoformat() if self._saved_data_ts else ''
+            f.write(f"{timestamp.isoformat()},{content_hash},{data_timestamp}\n")
+    
+    def _checkpoint_state(self) -> Dict[str, Any]:
+        """Rolling state to snapshot"""
+        return {
+            'data': pack_records(self.data_buffer),
+            'features': pack_records(self.features_buffer),
+            'signals': pack_records(self.signals_buffer),
+            'window_stats': self.window_stats.to_dict(),
+            'fee_sketch': self.fee_sketch.to_dict(),
+        }
+    
+    def _restore_checkpoint(self) -> bool:
+        """Refill the buffers from the last checkpoint, if one is fresh enough"""
+        state = self.checkpointer.load()
+        if state is None:
+            return False
+        try:
+            data = unpack_records(state['data'], OnChainData)
+            features = unpack_records(state['features'], OnChainFeatures)
+            signals = unpack_records(state['signals'], OnChainSignal)
+        except Exception as e:
+            print(f"⚠️  Checkpoint restore failed, falling back to CSV: {e}")
+            return False
+        self.data_buffer.extend(data)
+        self.features_buffer.extend(features)
+        self.signals_buffer.extend(signals)
+        if 'window_stats' in state:
+            self.window_stats = OnChainWindowStats.from_dict(state['window_stats'], self.config.trend_window_points)
+        else:
+            self.window_stats.extend(self.data_buffer)
+        if 'fee_sketch' in state:
+            self.fee_sketch = RollingFeeSketch.from_dict(state['fee_sketch'], self.config.fee_window_points,
+                                                         self.config.fee_sketch_accuracy)
+        print(f"♻️  Restored {len(self.data_buffer)} data points, {len(self.features_buffer)} feature points from checkpoint")
+        return True
+    
+    def _ensure_directories(self):
+        """Ensure all output directories exist"""
+        directories = [
+            "data/raw",
+            "data/processed", 
+            "data/outputs",
+            "data/outputs/reports"
+        ]
+        for directory in directories:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+    
+    def _load_existing_data(self):
+        """Load the buffers from the tail of the CSV files (only rows newer than the buffers' last)"""
+        try:
+            # Load raw data
+            if os.path.exists(self.config.onchain_data_file):
+                rows = max(self.data_buffer.maxlen, self.config.trend_window_points)
+                df = load_onchain_csv(self.config.onchain_data_file, 'data', tail_rows=rows)
+                df = df.drop_duplicates('timestamp', keep='last')  # Older runs could store a row twice
+                if self.data_buffer:
+                    df = df[df['timestamp'] > pd.Timestamp(self.data_buffer[-1].timestamp)]
+                records = records_from_frame(df, OnChainData)
+                self.data_buffer.extend(records)
+                self.window_stats.extend(records[-self.config.trend_window_points:])
+                print(f"📊 Loaded {len(records)} existing onchain data points")
+            
+            # Load features
+            if os.path.exists(self.config.features_file):
+                df = load_onchain_csv(self.config.features_file, 'features', tail_rows=self.features_buffer.maxlen)
+                df = df.drop_duplicates('timestamp', keep='last')
+                if self.features_buffer:
+                    df = df[df['timestamp'] > pd.Timestamp(self.features_buffer[-1].timestamp)]
+                records = records_from_frame(df, OnChainFeatures)
+                self.features_buffer.extend(records)
+                print(f"🔍 Loaded {len(records)} existing feature points")
+                
+        except Exception as e:
+            print(f"⚠️  Warning: Could not load existing data: {e}")
     
     def collect_data(self) -> OnChainData:
         """Collect onchain data from APIs"""
         timestamp = datetime.now(timezone.utc)
         
-        # Fetch data from both sources
-        mempool_data = self._get_mempool_metrics()
-        blockchair_data = self._get_blockchair_stats()
+        # Query the providers concurrently and resolve each metric across them
+        metrics = self.quorum.collect()
+        print(f"🗄️  Source cache hit rate: {self.http.hit_rate():.0%}")
+        self.blocks.ingest(metrics.get('blocks_page'))
+        content_hash = self._content_hash(metrics)
+        self.snapshot_changed = content_hash != self.last_content_hash
+        self.last_content_hash = content_hash
         
-        # Combine data
-        data_dict = {
-            "timestamp": timestamp,
-            "symbol": self.config.symbol,
-            **mempool_data,
-            **blockchair_data
-        }
-        
-        # Create OnChainData object
-        onchain_data = OnChainData(**data_dict)
+        # Create OnChainData object (histogram and blocks page are inputs, not stored fields)
+        fields = OnChainData.__dataclass_fields__
+        onchain_data = OnChainData(
+            timestamp=timestamp,
+            symbol=self.config.symbol,
+            **{name: value for name, value in metrics.items() if name in fields}
+        )
         
-        # Add to buffer
-        self.data_buffer.append(onchain_data)
+        # Add to buffer (an unchanged snapshot would only repeat the last row)
+        if self.snapshot_changed:
+            self.data_buffer.append(onchain_data)
+            self.window_stats.update(onchain_data)
+            self.fee_sketch.update(metrics.get('fee_histogram'))
+        else:
+            self._save_heartbeat(timestamp, content_hash)
+            print(f"💓 Source payloads unchanged ({content_hash}), recorded heartbeat")
         
         return onchain_data
     
@@ -282,39 +1355,39 @@ class OnChainApp:
         timestamp = data.timestamp
         
         try:
-            # Convert buffer to DataFrame for calculations
             if len(self.data_buffer) < 1:
                 print("⚠️  No data in buffer for feature calculation")
                 return OnChainFeatures(timestamp=timestamp, symbol=data.symbol)
             
-            df = pd.DataFrame([asdict(d) for d in self.data_buffer])
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df = df.sort_values('timestamp')
+            # Trends and volatilities come from the rolling window sums (0.0 until 2 valid points)
+            stats = self.window_stats
             
             # Mempool congestion features
             mempool_congestion_score = self._calculate_congestion_score(data)
-            mempool_trend = self._calculate_trend(df, 'mempool_count') if len(df) >= 2 else 0.0
-            mempool_volatility = self._calculate_volatility(df, 'mempool_count') if len(df) >= 2 else 0.0
+            mempool_trend = stats.trend('mempool_count')
+            mempool_volatility = stats.volatility('mempool_count')
             
             # Fee pressure features
             fee_pressure_score = self._calculate_fee_pressure_score(data)
-            fee_trend = self._calculate_trend(df, 'fee_30min_satvB') if len(df) >= 2 else 0.0
-            fee_volatility = self._calculate_volatility(df, 'fee_30min_satvB') if len(df) >= 2 else 0.0
+            fee_trend = stats.trend('fee_30min_satvB')
+            fee_volatility = stats.volatility('fee_30min_satvB')
             
             # Network activity features
             network_activity_score = self._calculate_network_activity_score(data)
-            network_trend = self._calculate_trend(df, 'bc_transactions') if len(df) >= 2 else 0.0
-            network_volatility = self._calculate_volatility(df, 'bc_transactions') if len(df) >= 2 else 0.0
+            network_trend = stats.trend('bc_transactions')
+            network_volatility = stats.volatility('bc_transactions')
             
             # Block production features
-            block_production_rate = self._calculate_block_production_rate(df) if len(df) >= 2 else 0.0
-            block_size_trend = self._calculate_trend(df, 'tip_size') if len(df) >= 2 else 0.0
-            block_weight_trend = self._calculate_trend(df, 'tip_weight') if len(df) >= 2 else 0.0
+            block_production_rate = self._calculate_block_production_rate()
+            block_size_trend = stats.trend('tip_size')
+            block_weight_trend = stats.trend('tip_weight')
+            block_features = self.blocks.features()
+            fee_percentiles = self.fee_sketch.features()
             
             # Market structure features
             market_structure_score = self._calculate_market_structure_score(data)
             liquidity_score = self._calculate_liquidity_score(data)
-            volatility_score = self._calculate_volatility_score(df) if len(df) >= 2 else 0.0
+            volatility_score = self._calculate_volatility_score()
             
             features = OnChainFeatures(
                 timestamp=timestamp,
@@ -331,6 +1404,8 @@ class OnChainApp:
                 block_production_rate=block_production_rate,
                 block_size_trend=block_size_trend,
                 block_weight_trend=block_weight_trend,
+                **block_features,
+                **fee_percentiles,
                 market_structure_score=market_structure_score,
                 liquidity_score=liquidity_score,
                 volatility_score=volatility_score
@@ -389,42 +1464,11 @@ class OnChainApp:
         else:
             return min(1.0, 0.5 + (daily_tx - 400000) / 200000)
     
-    def _calculate_trend(self, df: pd.DataFrame, column: str) -> float:
-        """Calculate trend for a column (slope of linear regression)"""
-        if len(df) < 2 or column not in df.columns:
-            return 0.0
-        
-        valid_data = df[column].dropna()
-        if len(valid_data) < 2:
-            return 0.0
-        
-        x = np.arange(len(valid_data))
-        y = valid_data.values
-        slope = np.polyfit(x, y, 1)[0]
-        return float(slope)
-    
-    def _calculate_volatility(self, df: pd.DataFrame, column: str) -> float:
-        """Calculate volatility (standard deviation) for a column"""
-        if len(df) < 2 or column not in df.columns:
-            return 0.0
-        
-        valid_data = df[column].dropna()
-        if len(valid_data) < 2:
-            return 0.0
-        
-        return float(valid_data.std())
-    
-    def _calculate_block_production_rate(self, df: pd.DataFrame) -> float:
+    def _calculate_block_production_rate(self) -> float:
         """Calculate average block production rate"""
-        if len(df) < 2:
-            return 0.0
-        
-        # Calculate time between blocks
-        timestamps = pd.to_datetime(df['timestamp'])
-        time_diffs = timestamps.diff().dt.total_seconds()
-        avg_block_time = time_diffs.mean()
-        
-        if pd.isna(avg_block_time) or avg_block_time == 0:
+        # Mean time between observations in the window
+        avg_block_time = self.window_stats.mean_interval_seconds()
+        if avg_block_time == 0:
             return 0.0
         
         # Convert to blocks per hour
@@ -450,15 +1494,15 @@ class OnChainApp:
         
         return (value_score + fee_score) / 2
     
-    def _calculate_volatility_score(self, df: pd.DataFrame) -> float:
+    def _calculate_volatility_score(self) -> float:
         """Calculate overall volatility score"""
-        if len(df) < 2:
+        if self.window_stats.count < 2:
             return 0.0
         
         # Calculate volatility for key metrics
-        mempool_vol = self._calculate_volatility(df, 'mempool_count')
-        fee_vol = self._calculate_volatility(df, 'fee_30min_satvB')
-        tx_vol = self._calculate_volatility(df, 'bc_transactions')
+        mempool_vol = self.window_stats.volatility('mempool_count')
+        fee_vol = self.window_stats.volatility('fee_30min_satvB')
+        tx_vol = self.window_stats.volatility('bc_transactions')
         
         # Normalize and combine
         return (mempool_vol / 10000 + fee_vol / 50 + tx_vol / 100000) / 3
@@ -552,43 +1596,41 @@ class OnChainApp:
     def save_data(self):
         """Save all data to CSV files"""
         try:
-            # Save raw data - only save the most recent data point
-            if self.data_buffer:
-                # Get only the latest data point (the one just collected)
-                latest_data = self.data_buffer[-1]
-                data_dict = asdict(latest_data)
-                data_dict['timestamp'] = latest_data.timestamp.isoformat()
+            # Save raw data - only points not yet on disk (normally the one just collected)
+            new_data = [d for d in self.data_buffer if self._saved_data_ts is None or d.timestamp > self._saved_data_ts]
+            if new_data:
+                rows = []
+                for data in new_data:
+                    data_dict = asdict(data)
+                    data_dict['timestamp'] = data.timestamp.isoformat()
+                    rows.append(data_dict)
                 
                 # Append to CSV file
-                df = pd.DataFrame([data_dict])
-                file_exists = os.path.exists(self.config.onchain_data_file)
-                df.to_csv(self.config.onchain_data_file, mode='a', header=not file_exists, index=False)
-                print(f"💾 Saved 1 new onchain data point")
+                append_csv_rows(self.config.onchain_data_file, rows, ONCHAIN_RECORD_SCHEMAS['data'])
+                self._saved_data_ts = new_data[-1].timestamp
+                self._save_state()
+                print(f"💾 Saved {len(new_data)} new onchain data point(s)")
             
-            # Save features - only save the most recent feature point
-            if self.features_buffer:
-                # Get only the latest feature point (the one just calculated)
-                latest_features = self.features_buffer[-1]
-                features_dict = asdict(latest_features)
-                features_dict['timestamp'] = latest_features.timestamp.isoformat()
+            # Save features - only points not yet on disk
+            new_features = [f for f in self.features_buffer if self._saved_features_ts is None or f.timestamp > self._saved_features_ts]
+            if new_features:
+                rows = []
+                for features in new_features:
+                    features_dict = asdict(features)
+                    features_dict['timestamp'] = features.timestamp.isoformat()
+                    rows.append(features_dict)
                 
                 # Append to CSV file
-                df = pd.DataFrame([features_dict])
-                file_exists = os.path.exists(self.config.features_file)
-                df.to_csv(self.config.features_file, mode='a', header=not file_exists, index=False)
-                print(f"🔍 Saved 1 new feature point")
+                append_csv_rows(self.config.features_file, rows, ONCHAIN_RECORD_SCHEMAS['features'])
+                self._saved_features_ts = new_features[-1].timestamp
+                print(f"🔍 Saved {len(new_features)} new feature point(s)")
             
-            # Save signals - overwrite the entire signals file (keep latest signals)
-            if self.signals_buffer:
-                signals_data = [asdict(signal) for signal in self.signals_buffer]
-                # Convert timestamps to ISO format
-                for signal in signals_data:
-                    if 'timestamp' in signal:
-                        signal['timestamp'] = signal['timestamp'].isoformat()
-                
-                with open(self.config.signals_file, 'w') as f:
-                    json.dump(signals_data, f, indent=2, default=str)
-                print(f"📊 Saved {len(self.signals_buffer)} signals")
+            # Append new signals to the log (the latest one also replaces the signals file)
+            new_signals = [s for s in self.signals_buffer if self._saved_signals_ts is None or s.timestamp > self._saved_signals_ts]
+            if new_signals:
+                self.signal_log.extend(new_signals)
+                self._saved_signals_ts = new_signals[-1].timestamp
+                print(f"📊 Saved {len(new_signals)} new signal(s)")
                 
         except Exception as e:
             print(f"❌ Error saving data: {e}")
@@ -601,20 +1643,15 @@ class OnChainApp:
                 print("⚠️  No data available for report generation")
                 return
             
-            # Convert to DataFrames
-            data_df = pd.DataFrame([asdict(data) for data in self.data_buffer])
-            data_df['timestamp'] = pd.to_datetime(data_df['timestamp'])
+            # Running aggregates, O(1) whatever the buffer size
+            def fmt(value: Optional[float], spec: str) -> str:
+                return format(value, spec) if value is not None else 'N/A'
             
-            features_df = pd.DataFrame([asdict(features) for features in self.features_buffer]) if self.features_buffer else pd.DataFrame()
-            if not features_df.empty:
-                features_df['timestamp'] = pd.to_datetime(features_df['timestamp'])
-            
-            # Generate report
-            # Calculate metrics safely
-            avg_mempool = f"{data_df['mempool_count'].mean():.0f}" if not data_df['mempool_count'].isna().all() else 'N/A'
-            avg_fee = f"{data_df['fee_30min_satvB'].mean():.1f}" if not data_df['fee_30min_satvB'].isna().all() else 'N/A'
-            avg_network = f"{features_df['network_activity_score'].mean():.3f}" if not features_df.empty and not features_df['network_activity_score'].isna().all() else 'N/A'
-            avg_market = f"{features_df['market_structure_score'].mean():.3f}" if not features_df.empty and not features_df['market_structure_score'].isna().all() else 'N/A'
+            avg_mempool = fmt(self.data_buffer.mean('mempool_count'), '.0f')
+            avg_fee = fmt(self.data_buffer.mean('fee_30min_satvB'), '.1f')
+            avg_network = fmt(self.features_buffer.mean('network_activity_score'), '.3f')
+            avg_market = fmt(self.features_buffer.mean('market_structure_score'), '.3f')
+            first_ts, last_ts = self.data_buffer.time_range()
             
             report = f"""# OnChain Analysis Report
 Generated: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}
@@ -623,7 +1660,7 @@ Generated: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}
 - **Data Points**: {len(self.data_buffer)}
 - **Feature Points**: {len(self.features_buffer)}
 - **Signals Generated**: {len(self.signals_buffer)}
-- **Time Range**: {data_df['timestamp'].min()} to {data_df['timestamp'].max()}
+- **Time Range**: {first_ts} to {last_ts}
 
 ## Key Metrics
 - **Avg Mempool Count**: {avg_mempool}
@@ -631,6 +1668,13 @@ Generated: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}
 - **Avg Network Activity**: {avg_network}
 - **Avg Market Structure**: {avg_market}
 
+## Metric Providers
+{self.quorum.health_summary()}
+
+## Source Cache
+- **Hit Rate**: {self.http.hit_rate():.0%}
+{self.http.cache_summary()}
+
 ## Recent Signals
 """
             
@@ -677,8 +1721,12 @@ Report generation encountered an error: {e}
             data = self.collect_data()
             print(f"📊 Collected data: mempool={data.mempool_count}, fee={data.fee_30min_satvB} sat/vB")
             
-            # Calculate features
-            features = self.calculate_features(data)
+            # Calculate features (unchanged inputs give the same features)
+            if self.snapshot_changed or not self.features_buffer:
+                features = self.calculate_features(data)
+            else:
+                features = replace(self.features_buffer[-1], timestamp=data.timestamp)
+                print("♻️  Inputs unchanged, reusing last features")
             print(f"🔍 Calculated features: congestion={features.mempool_congestion_score:.3f}, pressure={features.fee_pressure_score:.3f}")
             
             # Generate signal
@@ -687,6 +1735,7 @@ Report generation encountered an error: {e}
             
             # Save data
             self.save_data()
+            self.checkpointer.maybe_save(self._checkpoint_state)
             
             # Generate report
             self.generate_report()
@@ -732,5 +1781,8 @@ Report generation encountered an error: {e}
         except KeyboardInterrupt:
             print("\n🛑 Stopping collection...")
             self.save_data()
+            self.checkpointer.maybe_save(self._checkpoint_state, force=True)
+            self.quorum.close()
+            self.http.close()
             self.generate_report()
             print("✅ Collection stopped and data saved")
\ No newline at end of file
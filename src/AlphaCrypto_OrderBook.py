@@ -18,6 +18,8 @@ from concurrent.futures import ThreadPoolExecutor
 import ccxt
 from dotenv import load_dotenv
 
+from AlphaCrypto_Storage import Checkpointer, SignalLog, pack_records, unpack_records, pack_dicts, unpack_dicts
+
 # Load environment variables
 load_dotenv()
 
@@ -39,9 +41,15 @@ class OrderBookConfig:
     orderbook_data_file: str = "data/raw/orderbook_data.csv"
     trades_data_file: str = "data/raw/trades_data.csv"
     features_file: str = "data/processed/orderbook_features.csv"
-    signals_file: str = "data/outputs/orderbook_signals.json"
+    signals_file: str = "data/outputs/orderbook_signals.json"  # Latest signal
+    signal_log_file: str = "data/outputs/orderbook_signals.jsonl"  # Append-only history
     report_file: str = "data/outputs/reports/orderbook_report.md"
     
+    # Warm-restart checkpoint of the rolling buffers
+    checkpoint_file: str = "data/cache/orderbook_checkpoint.json.gz"  # Gitignored, never committed by the workflows
+    checkpoint_interval_seconds: int = 300
+    checkpoint_max_age_hours: float = 2.0  # Older snapshots are stale for 1h predictions
+    
     # Feature calculation parameters
     imbalance_threshold: float = 0.1  # 10% imbalance threshold
     large_trade_threshold: float = 10000  # $10k+ trades
@@ -556,6 +564,7 @@ class OrderBookPredictor:
 class DataStorage:
     def __init__(self, config: OrderBookConfig):
         self.config = config
+        self.signal_log = SignalLog(config.signal_log_file, config.signals_file)
     
     def save_orderbook_data(self, orderbook: OrderBookData):
         """Save order book data to CSV"""
@@ -607,29 +616,8 @@ class DataStorage:
         df.to_csv(self.config.features_file, mode='a', header=not file_exists, index=False)
     
     def save_signal(self, signal: PredictionSignal):
-        """Save prediction signal to JSON"""
-        signal_data = asdict(signal)
-        signal_data['timestamp'] = signal.timestamp.isoformat()
-        
-        # Convert any remaining datetime objects to ISO format
-        def convert_datetime(obj):
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            return obj
-        
-        # Recursively convert datetime objects
-        def clean_dict(d):
-            if isinstance(d, dict):
-                return {k: clean_dict(v) for k, v in d.items()}
-            elif isinstance(d, list):
-                return [clean_dict(item) for item in d]
-            else:
-                return convert_datetime(d)
-        
-        cleaned_data = clean_dict(signal_data)
-        
-        with open(self.config.signals_file, 'w') as f:
-            json.dump(cleaned_data, f, indent=2)
+        """Append signal to the JSONL log and update the latest-signal JSON"""
+        self.signal_log.append(signal)
     
     def generate_report(self, signal: PredictionSignal, features: OrderBookFeatures):
         """Generate markdown report"""
@@ -688,7 +676,37 @@ class OrderBookApp:
         self.feature_engine = OrderBookFeatureEngine(self.config)
         self.predictor = OrderBookPredictor(self.config)
         self.storage = DataStorage(self.config)
+        self.checkpointer = Checkpointer(self.config.checkpoint_file,
+                                         self.config.checkpoint_interval_seconds,
+                                         self.config.checkpoint_max_age_hours)
         self.running = False
+        self._restore_checkpoint()
+    
+    def _checkpoint_state(self) -> Dict[str, Any]:
+        """Rolling state to snapshot: collector buffers and feature history"""
+        return {
+            'orderbooks': pack_records(self.collector.orderbook_buffer),
+            'trades': pack_records(self.collector.trades_buffer),
+            'feature_history': pack_dicts(self.feature_engine.feature_history),
+        }
+    
+    def _restore_checkpoint(self):
+        """Refill the rolling buffers from the last checkpoint, if one is fresh enough"""
+        state = self.checkpointer.load()
+        if state is None:
+            return
+        try:
+            orderbooks = unpack_records(state['orderbooks'], OrderBookData)
+            trades = unpack_records(state['trades'], TradeData)
+            feature_history = unpack_dicts(state['feature_history'])
+        except Exception as e:
+            print(f"⚠️  Checkpoint restore failed, starting cold: {e}")
+            return
+        self.collector.orderbook_buffer.extend(orderbooks)
+        self.collector.trades_buffer.extend(trades)
+        self.feature_engine.feature_history.extend(feature_history)
+        print(f"♻️  Restored {len(self.collector.orderbook_buffer)} order books, "
+              f"{len(self.collector.trades_buffer)} trades from checkpoint")
     
     def _ensure_directories(self):
         """Create necessary directories if they don't exist"""
@@ -737,6 +755,7 @@ class OrderBookApp:
             self.storage.save_features(features)
             self.storage.save_signal(signal)
             self.storage.generate_report(signal, features)
+            self.checkpointer.maybe_save(self._checkpoint_state)
             
             print(f"✅ Analysis complete: {signal.direction} (confidence: {signal.confidence:.2f})")
             print(f"📊 Features calculated: {len(asdict(features))} features")
@@ -794,6 +813,7 @@ class OrderBookApp:
         except KeyboardInterrupt:
             print(f"\n🛑 Stopping data collection...")
             self.running = False
+            self.checkpointer.maybe_save(self._checkpoint_state, force=True)
 
 # ==============================
 # Main Entry Point
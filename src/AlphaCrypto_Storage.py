@@ -0,0 +1,287 @@
+# AlphaCrypto_Storage.py
+# Persistence helpers shared by the standalone collectors
+# (AlphaCrypto_OrderBook, AlphaCrypto_Derivatives, AlphaCrypto_OnChain)
+
+import os, io, csv, gzip, json, time, threading
+from dataclasses import fields, asdict
+from typing import List, Dict, Any, Optional, Callable, Iterable
+from datetime import datetime, timezone
+import pandas as pd
+
+# ==============================
+# Record Packing
+# ==============================
+def pack_records(records: Iterable[Any]) -> Dict[str, Any]:
+    """Dataclass records as one field list plus a row tuple per record.
+
+    Rows hold plain values only, so a snapshot doesn't depend on the module
+    path the collector was started from (script vs. import).
+    """
+    records = list(records)  # Copy first; other threads may append meanwhile
+    if not records:
+        return {'fields': [], 'rows': []}
+    names = [f.name for f in fields(records[0])]
+    return {'fields': names, 'rows': [tuple(getattr(r, n) for n in names) for r in records]}
+
+def unpack_records(packed: Dict[str, Any], record_type: type) -> List[Any]:
+    """Rebuild records, dropping fields the dataclass no longer has (new fields take defaults)"""
+    known = record_type.__dataclass_fields__
+    columns = [(i, name) for i, name in enumerate(packed['fields']) if name in known]
+    return [record_type(**{name: row[i] for i, name in columns}) for row in packed['rows']]
+
+def pack_dicts(rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Plain dict rows (same keys) in the `pack_records` layout"""
+    rows = list(rows)
+    names = list(rows[0]) if rows else []
+    return {'fields': names, 'rows': [[row.get(n) for n in names] for row in rows]}
+
+def unpack_dicts(packed: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [dict(zip(packed['fields'], row)) for row in packed['rows']]
+
+def records_from_frame(df: pd.DataFrame, record_type: type) -> List[Any]:
+    """Dataclass records from a frame's matching columns, with NaN as None"""
+    columns = [c for c in df.columns if c in record_type.__dataclass_fields__]
+    frame = df[columns]
+    return [record_type(**r) for r in frame.astype(object).where(frame.notna(), None).to_dict('records')]
+
+# ==============================
+# CSV Files
+# ==============================
+def _tail_lines(path: str, rows: int, block_size: int = 64 * 1024, skip_header: bool = False) -> List[bytes]:
+    """Last `rows` non-empty lines of a file, read by seeking back from the end"""
+    with open(path, 'rb') as f:
+        if skip_header:
+            f.readline()
+        data_start = f.tell()
+        position = f.seek(0, os.SEEK_END)
+        blocks, newlines = [], 0
+        # rows + 1 newlines guarantee `rows` complete lines after the first (partial) one
+        while position > data_start and newlines <= rows:
+            step = min(block_size, position - data_start)
+            position -= step
+            f.seek(position)
+            block = f.read(step)
+            blocks.append(block)
+            newlines += block.count(b'\n')
+
+    lines = b''.join(reversed(blocks)).splitlines()
+    if position > data_start:
+        lines = lines[1:]
+    return [line for line in lines if line.strip()][-rows:] if rows > 0 else []
+
+def read_csv_tail(path: str, rows: int, block_size: int = 64 * 1024, **read_csv_kwargs) -> pd.DataFrame:
+    """Header plus the last `rows` lines of a CSV, read by seeking back from the end.
+
+    Cost depends on `rows`, not on the file size. Assumes one record per line
+    (no quoted newlines), which holds for the append-only collector files.
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+    lines = _tail_lines(path, rows, block_size, skip_header=True)
+    return pd.read_csv(io.BytesIO(header + b'\n'.join(lines)), **read_csv_kwargs)
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    """Reorder and cast a frame to a record schema (missing columns become NaN)"""
+    df = df.reindex(columns=list(schema))
+    for column, dtype in schema.items():
+        if dtype == 'datetime':
+            df[column] = pd.to_datetime(df[column], utc=True, format='ISO8601')
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+def schema_dtypes(schema: Dict[str, str]) -> Dict[str, str]:
+    """read_csv dtype map for a schema (datetimes are parsed after reading)"""
+    return {column: dtype for column, dtype in schema.items() if dtype != 'datetime'}
+
+def append_csv_rows(path: str, rows: List[Dict[str, Any]], schema: Optional[Dict[str, str]] = None):
+    """Append dict rows under the file's existing header.
+    
+    Keys the header lacks (a record type gained fields) widen it: the file is
+    rewritten once with the new columns empty for older rows. Header columns a
+    row lacks are left empty. With a schema, non-datetime columns are cast to
+    their dtypes first, so the file is written the way the loader reads it.
+    """
+    df = pd.DataFrame(rows)
+    for column, dtype in (schema or {}).items():
+        if dtype != 'datetime' and column in df.columns:
+            df[column] = df[column].astype(dtype)
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        df.to_csv(path, index=False)
+        return
+    with open(path, newline='') as f:
+        header = next(csv.reader(f), [])
+    
+    added = [c for c in df.columns if c not in header]
+    if not added:
+        df.reindex(columns=header).to_csv(path, mode='a', header=False, index=False)
+        return
+    
+    # Keep existing cells as written (no dtype round trip)
+    existing = pd.read_csv(path, dtype=str, keep_default_na=False)
+    widened = pd.concat([existing, df.astype(object)], ignore_index=True).reindex(columns=header + added)
+    tmp_path = f"{path}.tmp"
+    widened.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    print(f"🧱 Added columns {added} to {path}")
+
+# ==============================
+# Signal Log
+# ==============================
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if hasattr(obj, 'item'):  # numpy scalars
+        return obj.item()
+    return str(obj)
+
+class SignalLog:
+    """Append-only JSON Lines history of signals plus an atomically replaced latest file.
+
+    Each append writes one line to `log_path` (cost independent of the history
+    size) and swaps the newest signal into `latest_path` via os.replace, so a
+    reader of the latest file never sees a partial write. `tail` reads the last
+    entries by seeking back from the end of the log.
+    """
+
+    def __init__(self, log_path: str, latest_path: Optional[str] = None):
+        self.log_path = log_path
+        self.latest_path = latest_path
+        self._lock = threading.Lock()
+        for path in (log_path, latest_path):
+            directory = os.path.dirname(path) if path else ''
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def append(self, signal: Any):
+        """Log a signal (dataclass or dict) and make it the latest one"""
+        record = asdict(signal) if hasattr(signal, '__dataclass_fields__') else dict(signal)
+        line = json.dumps(record, default=_json_default, separators=(',', ':'))
+        with self._lock:
+            with open(self.log_path, 'ab') as f:
+                # Terminate a line left partial by an interrupted write
+                if f.tell() > 0 and not self._ends_with_newline():
+                    f.write(b'\n')
+                f.write(line.encode('utf-8') + b'\n')
+            if self.latest_path:
+                tmp_path = f"{self.latest_path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(record, f, indent=2, default=_json_default)
+                os.replace(tmp_path, self.latest_path)
+
+    def extend(self, signals: Iterable[Any]):
+        for signal in signals:
+            self.append(signal)
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.log_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def tail(self, rows: int) -> List[Dict[str, Any]]:
+        """The last `rows` logged signals, oldest first (unparseable lines are skipped)"""
+        if not os.path.exists(self.log_path) or rows <= 0:
+            return []
+        wanted = rows
+        while True:
+            lines = _tail_lines(self.log_path, wanted)
+            records = []
+            for line in lines:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+            # Read further back for each skipped line, until the start of the file
+            if len(records) >= rows or len(lines) < wanted:
+                return records[-rows:]
+            wanted += rows - len(records)
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        if not self.latest_path or not os.path.exists(self.latest_path):
+            return None
+        with open(self.latest_path) as f:
+            return json.load(f)
+
+# ==============================
+# Checkpoints
+# ==============================
+CHECKPOINT_VERSION = 2
+
+def _encode_checkpoint_value(obj: Any) -> Any:
+    """JSON stand-ins for the values collector state holds beyond plain JSON types"""
+    if isinstance(obj, datetime):
+        return {'__datetime__': obj.isoformat()}
+    if hasattr(obj, 'tolist'):  # numpy scalars and arrays
+        return obj.tolist()
+    raise TypeError(f"Checkpoint state cannot hold {type(obj).__name__}")
+
+def _decode_checkpoint_object(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+class Checkpointer:
+    """Periodic gzip-compressed JSON snapshots of a collector's rolling state.
+
+    State is plain data only (records packed with `pack_records`, datetimes
+    tagged), so loading a snapshot never runs code from the file. A snapshot
+    is written to a temp file and swapped in with os.replace, so a crash
+    mid-write keeps the previous one. `load` returns None for a missing,
+    unreadable, foreign-version or stale snapshot and the caller falls back
+    to its cold-start path.
+    """
+
+    def __init__(self, path: str, interval_seconds: float = 300, max_age_hours: float = 6.0):
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self.max_age_hours = max_age_hours
+        self._last_save: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def save(self, state: Dict[str, Any]):
+        payload = {
+            'version': CHECKPOINT_VERSION,
+            'saved_at': datetime.now(timezone.utc),
+            'state': state,
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+                json.dump(payload, f, default=_encode_checkpoint_value, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+            self._last_save = time.monotonic()
+
+    def maybe_save(self, build_state: Callable[[], Dict[str, Any]], force: bool = False) -> bool:
+        """Save if the interval has elapsed since the last save (always on the first call)"""
+        if not force and self._last_save is not None \
+                and time.monotonic() - self._last_save < self.interval_seconds:
+            return False
+        try:
+            self.save(build_state())
+            return True
+        except Exception as e:
+            print(f"⚠️  Checkpoint save failed: {e}")
+            return False
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                payload = json.load(f, object_hook=_decode_checkpoint_object)
+        except Exception as e:
+            print(f"⚠️  Checkpoint {self.path} unreadable, ignoring: {e}")
+            return None
+
+        if not isinstance(payload, dict) or payload.get('version') != CHECKPOINT_VERSION \
+                or not isinstance(payload.get('saved_at'), datetime) or not isinstance(payload.get('state'), dict):
+            print(f"⚠️  Checkpoint {self.path} has an unknown format, ignoring")
+            return None
+        age_hours = (datetime.now(timezone.utc) - payload['saved_at']).total_seconds() / 3600
+        if self.max_age_hours and age_hours > self.max_age_hours:
+            print(f"⏳ Checkpoint {self.path} is {age_hours:.1f}h old, ignoring")
+            return None
+        return payload['state']
@@ -0,0 +1,246 @@
+import json, os, shutil, subprocess, sys
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from AlphaCrypto_Derivatives import (DERIVATIVE_RECORD_SCHEMAS, FUNDING_INDEX_FIELDS, FUTURES_INDEX_FIELDS,
+                                     DerivativeBackfiller, DerivativeCollector, DerivativeConfig,
+                                     DerivativeDataStorage, DerivativeFeatureEngine, DerivativeFeatures,
+                                     DerivativeTableFeatureEngine, FundingRateData, FuturesData,
+                                     OptionsChainAnalyzer, VenueDislocationTracker, VenueTimeSeries, apply_schema, black76_implied_vol,
+                                     black76_price, index_retention)
+
+
+def fixture_history(config, n_cycles=130, seed=3):
+    """Three venues a few seconds apart each cycle; 'okx' goes quiet for longer than the retention"""
+    rng = np.random.default_rng(seed)
+    t0 = datetime(2025, 10, 1, tzinfo=timezone.utc)
+    cycles = []
+    for cycle in range(n_cycles):
+        start = t0 + timedelta(seconds=cycle * config.data_collection_interval)
+        futures, funding = [], []
+        for offset, venue in enumerate(['binance', 'okx', 'bybit']):
+            if venue == 'okx' and 10 <= cycle < 125:
+                continue
+            ts = start + timedelta(seconds=2 * offset)
+            spot = 60000 + rng.normal(0, 200)
+            price = spot * (1 + rng.normal(0.0005, 0.0004))
+            oi = float(rng.uniform(1e4, 2e4)) if rng.random() > 0.1 else float('nan')
+            volume = float(rng.uniform(1e8, 3e8)) if rng.random() > 0.1 else 0.0
+            futures.append(FuturesData(ts, config.symbol, venue, price, spot, (price - spot) / spot,
+                                       (price - spot) / spot * 100, oi, volume, 0.0))
+            rate = float(rng.normal(1e-4, 5e-5))
+            funding.append(FundingRateData(ts, config.symbol, venue, rate, rate * 100,
+                                           start + timedelta(hours=8), rate))
+        cycles.append((futures, funding))
+    return cycles
+
+
+def frame(records, kind):
+    return apply_schema(pd.DataFrame([asdict(r) for r in records]), DERIVATIVE_RECORD_SCHEMAS[kind])
+
+
+def test_table_engine_matches_incremental_replay():
+    config = DerivativeConfig(max_data_points=8)
+    cycles = fixture_history(config)
+    
+    engine = DerivativeFeatureEngine(config)
+    futures_index = VenueTimeSeries(FUTURES_INDEX_FIELDS, index_retention(config))
+    funding_index = VenueTimeSeries(FUNDING_INDEX_FIELDS, index_retention(config))
+    replayed = []
+    for futures, funding in cycles:
+        futures_index.extend(futures)
+        funding_index.extend(funding)
+        replayed.append(engine.calculate_all_features(futures, funding, [], [], [], futures_index, funding_index,
+                                                      timestamp=max(r.timestamp for r in futures + funding)))
+    
+    table = DerivativeTableFeatureEngine(config).calculate_features(
+        frame([r for f, _ in cycles for r in f], 'futures'), frame([r for _, f in cycles for r in f], 'funding'))
+    
+    assert len(table) == len(replayed)
+    fields = [name for name in DerivativeFeatures.__dataclass_fields__ if name not in ('timestamp', 'symbol')]
+    for row, live in zip(table.to_dict('records'), replayed):
+        assert row['timestamp'] == live.timestamp
+        for name in fields:
+            assert row[name] == pytest.approx(getattr(live, name), rel=1e-9, abs=1e-12), (live.timestamp, name)
+
+
+def test_live_composite_features_are_plain_floats():
+    config = DerivativeConfig()
+    futures, funding = fixture_history(config, n_cycles=1)[0]
+    features = DerivativeFeatureEngine(config).calculate_all_features(futures, funding, [], futures, funding)
+    for name in ('derivative_sentiment', 'derivative_confidence', 'market_structure_score'):
+        assert type(getattr(features, name)) is float
+
+
+def test_module_import_leaves_ccxt_pro_unloaded():
+    code = "import sys, AlphaCrypto_Derivatives; sys.exit('ccxt.pro' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.join(os.path.dirname(__file__), '..', 'src'))
+    assert result.returncode == 0
+
+
+class FakeHistoryExchange:
+    """Perp and spot 15m bars; the spot feed lags the perp by a few bars"""
+    
+    def __init__(self, perp, spot):
+        self.has = {'fetchOpenInterestHistory': False}
+        self.bars = {'BTC/USDT:USDT': perp, 'BTC/USDT': spot}
+    
+    def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        return [[ts, 100.0, 101.0, 99.0, 100.0, 1.0] for ts in self.bars[symbol] if ts >= since][:limit]
+
+
+class MemoryStorage:
+    def __init__(self):
+        self.saved = []
+    
+    def save_partitioned(self, record_type, records):
+        self.saved.extend(records)
+
+
+def test_futures_cursor_stops_at_last_merged_bar(tmp_path):
+    config = DerivativeConfig(backfill_cursor_file=str(tmp_path / 'cursors.json'))
+    step = 15 * 60 * 1000
+    now_ms = 1_760_000_000_000 // step * step
+    perp = [now_ms - (10 - i) * step for i in range(10)]
+    exchange = FakeHistoryExchange(perp, perp[:7])
+    storage = MemoryStorage()
+    backfiller = DerivativeBackfiller(config, [], storage)
+    
+    assert backfiller._backfill_futures({'name': 'binance', 'exchange': exchange}, now_ms) == 7
+    assert backfiller.cursors['binance:futures'] == perp[6]
+    assert DerivativeBackfiller(config, [], storage).cursors == backfiller.cursors
+
+
+def test_engine_state_round_trip_and_unreadable_files(tmp_path):
+    config = DerivativeConfig()
+    engine = DerivativeFeatureEngine(config)
+    for futures, funding in fixture_history(config, n_cycles=20):
+        engine.calculate_all_features(futures, funding, [], futures, funding, timestamp=futures[-1].timestamp)
+    path = str(tmp_path / 'state' / 'engine.json')
+    engine.save_state(path)
+    assert os.listdir(tmp_path / 'state') == ['engine.json']
+    
+    resumed = DerivativeFeatureEngine(config)
+    assert resumed.load_state(path)
+    for name in ('composite_state', 'basis_dislocations', 'funding_dislocations'):
+        assert json.dumps(getattr(resumed, name).to_dict()) == json.dumps(getattr(engine, name).to_dict())
+    
+    with open(path) as f:
+        partial = f.read()[:40]
+    for content in (partial, '{"composite": {}}'):
+        with open(path, 'w') as f:
+            f.write(content)
+        fresh = DerivativeFeatureEngine(config)
+        assert not fresh.load_state(path)
+        assert fresh.composite_state.last_update is None
+
+
+def test_legacy_migration_skips_partitioned_rows(tmp_path):
+    config = DerivativeConfig(derivative_data_file=str(tmp_path / 'derivative_data.csv'),
+                              derivative_partition_dir=str(tmp_path / 'derivatives'))
+    storage = DerivativeDataStorage(config)
+    cycles = fixture_history(config, n_cycles=6)
+    
+    # Rows from before the partitions existed, then cycles written to both layouts
+    for futures, funding in cycles[:4]:
+        storage.save_derivative_data(futures, funding, [])
+    shutil.rmtree(config.derivative_partition_dir)
+    for futures, funding in cycles[4:]:
+        storage.save_derivative_data(futures, funding, [])
+    
+    assert storage.partition_legacy_file() == {'futures': 12, 'funding': 12}
+    assert storage.partition_legacy_file() == {'futures': 0, 'funding': 0}
+    futures = storage.load_partitioned('futures')
+    assert len(futures) == sum(len(f) for f, _ in cycles)
+    assert not futures.duplicated(['timestamp', 'exchange']).any()
+
+
+def test_black76_implied_vol_round_trips_the_fixture_chain():
+    chain = OptionsChainAnalyzer.load_fixture(os.path.join(os.path.dirname(__file__), '..', DerivativeConfig().options_fixture_file))
+    solved = OptionsChainAnalyzer(DerivativeConfig()).solve(chain)
+    is_call = (solved['option_type'] == 'call').to_numpy()
+    forward, strike = solved['underlying_price'].to_numpy(), solved['strike'].to_numpy()
+    
+    solvable = np.isfinite(solved['iv'].to_numpy())
+    assert solvable.mean() > 0.95
+    repriced = black76_price(forward, strike, solved['years'].to_numpy(), solved['iv'].to_numpy(), is_call)
+    np.testing.assert_allclose(repriced[solvable], solved['mark_price'].to_numpy()[solvable], rtol=1e-6)
+    
+    # Vols recovered from their own prices on the out-of-the-money quotes the analyzer uses
+    # (deep in the money the time value is too small a share of the price to pin the vol)
+    otm = np.where(is_call, strike >= forward, strike < forward)
+    sigma = np.random.default_rng(0).uniform(0.2, 1.5, len(solved))
+    prices = black76_price(forward, strike, solved['years'].to_numpy(), sigma, is_call)
+    iv = black76_implied_vol(prices, forward, strike, solved['years'].to_numpy(), is_call)
+    checked = otm & (prices > 1e-6 * forward)
+    assert checked.sum() > 200 and np.isfinite(iv[checked]).all()
+    np.testing.assert_allclose(iv[checked], sigma[checked], rtol=1e-5)
+
+
+def test_fixture_options_chain_is_restamped_to_now():
+    config = DerivativeConfig(options_source='fixture',
+                              options_fixture_file=os.path.join(os.path.dirname(__file__), '..', 'data', 'fixtures', 'options_chain.csv'))
+    collector = SimpleNamespace(config=config, options_analyzer=OptionsChainAnalyzer(config))
+    fixture = OptionsChainAnalyzer.load_fixture(config.options_fixture_file)
+    chain = DerivativeCollector.fetch_options_chain(collector)
+    assert abs(chain['timestamp'].max() - pd.Timestamp.now(tz='UTC')) < pd.Timedelta(minutes=1)
+    assert ((chain['expiry'] - chain['timestamp']) == (fixture['expiry'] - fixture['timestamp'])).all()
+
+
+def test_dislocation_zscores_match_a_windowed_recomputation():
+    rng = np.random.default_rng(11)
+    window, min_obs = 12, 5
+    tracker = VenueDislocationTracker(window, min_obs)
+    cycles = []
+    for t in range(100):
+        venues = {'binance': 0.0010, 'okx': 0.0012, 'bybit': 0.0008}
+        if t < 20:
+            venues.pop('bybit')  # Joins late
+        if t % 7 == 3:
+            venues.pop('okx')  # Misses some cycles
+        cycles.append({v: base + rng.normal(0, 1e-4) for v, base in venues.items()})
+        tracker.update(cycles[-1])
+        if t == 50:
+            tracker = VenueDislocationTracker.from_dict(json.loads(json.dumps(tracker.to_dict())), window, min_obs)
+        
+        for i, a in enumerate(tracker.venues):
+            for j, b in enumerate(tracker.venues):
+                diffs = np.array([c[a] - c[b] for c in cycles[-window:] if a in c and b in c])
+                current = cycles[-1].get(a, np.nan) - cycles[-1].get(b, np.nan)
+                if i == j or len(diffs) < min_obs or not np.isfinite(current):
+                    assert np.isnan(tracker.zscores[i, j])
+                else:
+                    expected = (current - diffs.mean()) / diffs.std()
+                    assert tracker.zscores[i, j] == pytest.approx(expected, rel=1e-6)
+    
+    upper = tracker.zscores[np.triu_indices(3, k=1)]
+    top = tracker.top_pairs(2)
+    assert [abs(z) for _, _, _, z in top] == pytest.approx(sorted(np.abs(upper[np.isfinite(upper)]), reverse=True)[:2])
+
+
+def test_venue_series_diffs_stay_within_one_venue():
+    t0 = datetime(2025, 10, 1, tzinfo=timezone.utc)
+    records = []
+    for i in range(30):
+        ts = t0 + timedelta(hours=i)
+        # Interleaved venues with very different levels: a pooled diff would be dominated by the gap
+        records.append(SimpleNamespace(exchange='okx', timestamp=ts, basis=0.001 + 1e-4 * i, open_interest=100.0 + 10 * i))
+        records.append(SimpleNamespace(exchange='bitmex', timestamp=ts + timedelta(seconds=5), basis=0.02,
+                                       open_interest=500.0))
+    # One late reading arrives out of order
+    late = records.pop(20)
+    index = VenueTimeSeries.from_records(records + [late], ['basis', 'open_interest'], timedelta(days=2))
+    
+    assert index.momentum('basis', 10) == pytest.approx((1e-4 + 0.0) / 2)
+    okx_now, okx_then = 100.0 + 10 * 29, 100.0 + 10 * 5
+    assert index.change_since('open_interest', timedelta(hours=24)) == pytest.approx((okx_now / okx_then - 1.0) / 2)
+    assert index.asof('basis', t0 + timedelta(hours=10, minutes=30)) == pytest.approx({'okx': 0.002, 'bitmex': 0.02})
+    
+    # A venue silent for longer than the retention drops out of the aggregates
+    index.append(SimpleNamespace(exchange='bitmex', timestamp=t0 + timedelta(days=4), basis=0.02, open_interest=500.0))
+    assert index.venues == ['bitmex']
@@ -0,0 +1,275 @@
+import copy, json, math, os, random, time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from AlphaCrypto_OnChain import (AggregatingBuffer, BlockIngester, DDSketch, MetricProvider, MetricQuorum, OnChainApp,
+                                 OnChainConfig, OnChainHttpClient, RollingFeeSketch, RollingLinearStats, load_onchain_csv)
+
+
+@dataclass
+class Point:
+    timestamp: datetime
+    x: Optional[float] = None
+
+
+def test_aggregating_buffer_means_track_evictions():
+    random.seed(7)
+    t0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    buffer = AggregatingBuffer(50, ['x'])
+    points = []
+    for i in range(537):
+        value = random.choice([None, float('nan'), random.uniform(-5, 100)])
+        points.append(Point(t0 + timedelta(minutes=i), value))
+        buffer.append(points[-1])
+        window = [p.x for p in points[-50:] if p.x is not None and math.isfinite(p.x)]
+        expected = np.mean(window) if window else None
+        assert buffer.mean('x') == pytest.approx(expected, rel=1e-12)
+    assert len(buffer) == 50 and buffer[-1] is points[-1]
+    assert buffer.time_range() == (points[-50].timestamp, points[-1].timestamp)
+
+    buffer.clear()
+    assert buffer.mean('x') is None and buffer.time_range() == (None, None)
+
+
+def test_aggregating_buffer_exposes_only_consistent_mutators():
+    buffer = AggregatingBuffer(3, ['x'])
+    buffer.extend(Point(datetime(2025, 1, 1, tzinfo=timezone.utc), v) for v in (1.0, 2.0, 3.0))
+    for name in ('popleft', 'appendleft', 'pop', 'remove', 'rotate'):
+        assert not hasattr(buffer, name)
+    clone = copy.copy(buffer)
+    assert list(clone) == list(buffer) and clone.mean('x') == 2.0
+
+
+def _provider(name, values, delay=0.0):
+    class Stub(MetricProvider):
+        def fetch(self):
+            time.sleep(delay)
+            return dict(values)
+    Stub.name, Stub.metrics = name, tuple(values)
+    return Stub(OnChainConfig(), None)
+
+
+def test_metric_provider_fetch_is_abstract():
+    with pytest.raises(TypeError):
+        MetricProvider(OnChainConfig(), None)
+
+
+def test_quorum_takes_all_tip_fields_from_one_block():
+    tips = {'a': (100, 1100, 50), 'b': (101, 1000, 70), 'c': (102, 1050, 60)}
+    providers = [_provider(name, {'tip_height': h, 'tip_timestamp': t, 'tip_tx_count': n, 'mempool_count': h * 10})
+                 for name, (h, t, n) in tips.items()]
+    quorum = MetricQuorum(OnChainConfig(provider_fanout=3), providers)
+    try:
+        resolved = quorum.collect()
+    finally:
+        quorum.close()
+    assert (resolved['tip_height'], resolved['tip_timestamp'], resolved['tip_tx_count']) == tips['b']
+    assert quorum.last_sources['tip_timestamp'] == ['b']
+    assert resolved['mempool_count'] == 1010
+
+
+def test_quorum_waits_for_missing_metrics_at_most_the_grace_period():
+    providers = [_provider('fast', {'mempool_count': 1}), _provider('stuck', {'fee_min_satvB': 1.0}, delay=3.0)]
+    quorum = MetricQuorum(OnChainConfig(provider_deadline_seconds=0.1, provider_grace_seconds=0.2), providers)
+    started = time.monotonic()
+    try:
+        resolved = quorum.collect()
+    finally:
+        quorum.close()
+    assert time.monotonic() - started < 1.0
+    assert resolved == {'mempool_count': 1, 'fee_min_satvB': None}
+
+
+def test_content_hash_only_matches_identical_payloads():
+    metrics = {'tip_height': 900000, 'tip_timestamp': 1760000000, 'fee_30min_satvB': 3, 'fee_min_satvB': 1,
+               'mempool_count': 40000, 'fee_histogram': [[2.0, 1000]]}
+    rebuilt = json.loads(json.dumps(dict(reversed(list(metrics.items())))))
+    assert OnChainApp._content_hash(rebuilt) == OnChainApp._content_hash(metrics)
+    for changed in ({'mempool_count': 40321}, {'fee_histogram': [[2.0, 1500], [1.0, 20]]}, {'tip_height': 900001},
+                    {'fee_30min_satvB': 4}, {'bc_mempool_transactions': 41000}):
+        assert OnChainApp._content_hash(dict(metrics, **changed)) != OnChainApp._content_hash(metrics)
+
+
+def fixture_app(tmp_path, monkeypatch):
+    fixture = os.path.join(os.path.dirname(__file__), '..', 'data', 'fixtures', 'onchain_metrics.json')
+    monkeypatch.chdir(tmp_path)
+    return OnChainApp(OnChainConfig(metric_providers=['fixture'], provider_fixture_file=os.path.abspath(fixture)))
+
+
+def test_unchanged_collection_restamps_reused_features(tmp_path, monkeypatch):
+    app = fixture_app(tmp_path, monkeypatch)
+    try:
+        app.run_single_analysis()
+        first = app.signals_buffer[-1].timestamp
+        app.run_single_analysis()
+    finally:
+        app.quorum.close()
+    assert not app.snapshot_changed
+    assert len(app.features_buffer) == 1 and len(app.data_buffer) == 1
+    assert app.signals_buffer[-1].timestamp > first == app.features_buffer[-1].timestamp
+
+
+def test_new_mempool_reading_with_the_same_tip_is_stored(tmp_path, monkeypatch):
+    app = fixture_app(tmp_path, monkeypatch)
+    provider = app.quorum.providers[0]
+    try:
+        app.run_single_analysis()
+        # Same tip block and recommended fees; the mempool and its histogram moved
+        provider.values = dict(provider.values, mempool_count=provider.values['mempool_count'] + 500,
+                               fee_histogram=[[20.0, 300000]] + provider.values['fee_histogram'])
+        app.run_single_analysis()
+    finally:
+        app.quorum.close()
+    
+    assert app.snapshot_changed
+    assert [d.mempool_count for d in app.data_buffer] == [44020, 44520]
+    assert app.window_stats.count == 2 and app.window_stats.trend('mempool_count') > 0
+    assert len(app.fee_sketch.polls) == 2 and app.fee_sketch.features()['mempool_fee_p90'] > 0
+    assert len(app.features_buffer) == 2
+    assert not os.path.exists(app.config.heartbeats_file)
+    assert len(pd.read_csv(app.config.onchain_data_file)) == 2
+
+
+class StubResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code, self.payload, self.headers = status_code, payload, headers or {}
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+    
+    def json(self):
+        return self.payload
+
+
+def test_http_client_serves_fresh_entries_and_revalidates_stale_ones():
+    client = OnChainHttpClient(OnChainConfig())
+    responses = iter([StubResponse(200, {'count': 1}, {'ETag': '"v1"'}), StubResponse(304)])
+    sent = []
+    client.session.get = lambda url, timeout, headers: sent.append(headers) or next(responses)
+    try:
+        assert client.get('https://x/mempool', 5, ttl=60, name='mempool') == {'count': 1}
+        assert client.get('https://x/mempool', 5, ttl=60, name='mempool') == {'count': 1}
+        stale_at = client.cache['https://x/mempool'].fetched_at
+        assert client.get('https://x/mempool', 5, ttl=0, name='mempool') == {'count': 1}
+    finally:
+        client.close()
+    assert sent == [{}, {'If-None-Match': '"v1"'}]
+    assert client.cache['https://x/mempool'].fetched_at > stale_at
+    assert client.stats['mempool'] == {'fresh': 1, 'revalidated': 1, 'fetched': 1, 'error': 0}
+
+
+def test_rolling_linear_stats_match_polyfit_and_std():
+    rng = np.random.default_rng(11)
+    window = 24
+    stats = RollingLinearStats(window)
+    history = []
+    for step in range(400):
+        # A large level exercises the shifted sums; gaps are skipped like dropna()
+        value = None if rng.random() < 0.15 else float(1e6 + 50 * step + rng.normal(0, 500))
+        history.append(value)
+        stats.update(value)
+        valid = np.array([v for v in history[-window:] if v is not None])
+        if len(valid) < 2:
+            assert stats.slope() == 0.0 and stats.std() == 0.0
+            continue
+        assert stats.slope() == pytest.approx(np.polyfit(np.arange(len(valid)), valid, 1)[0], rel=1e-6, abs=1e-6)
+        assert stats.std() == pytest.approx(np.std(valid, ddof=1), rel=1e-6)
+
+
+def exact_quantile(values, weights, q):
+    order = np.argsort(values)
+    cumulative = np.cumsum(weights[order])
+    return values[order][np.searchsorted(cumulative, q * cumulative[-1], side='left')]
+
+
+@pytest.mark.parametrize('accuracy', [0.01, 0.05])
+def test_ddsketch_quantiles_within_relative_accuracy(accuracy):
+    rng = np.random.default_rng(5)
+    values = rng.lognormal(mean=1.5, sigma=1.0, size=5000)
+    weights = rng.integers(1, 5000, size=5000).astype(float)
+    sketch = DDSketch(accuracy)
+    sketch.add_many(values, weights)
+    for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        exact = exact_quantile(values, weights, q)
+        assert abs(sketch.quantile(q) - exact) <= accuracy * exact * (1 + 1e-9)
+
+
+def test_rolling_fee_sketch_evicts_to_the_last_window_of_polls():
+    rng = np.random.default_rng(8)
+    accuracy = OnChainConfig().fee_sketch_accuracy
+    rolling = RollingFeeSketch(window=5, relative_accuracy=accuracy)
+    polls = [[[float(f), float(w)] for f, w in zip(rng.uniform(1, 80, 40), rng.integers(100, 10000, 40))]
+             for _ in range(17)]
+    for poll in polls:
+        rolling.update(poll)
+    
+    recent = np.array([row for poll in polls[-5:] for row in poll])
+    for q, name in ((0.5, 'fee_p50_window'), (0.9, 'fee_p90_window')):
+        exact = exact_quantile(recent[:, 0], recent[:, 1], q)
+        assert abs(rolling.features()[name] - exact) <= accuracy * exact * (1 + 1e-9)
+    assert rolling.merged.weight == pytest.approx(recent[:, 1].sum())
+
+
+def _block(height, tag='a'):
+    return {'height': height, 'id': f'{tag}{height}', 'timestamp': 1_700_000_000 + 600 * height, 'tx_count': 3000,
+            'size': 1_500_000, 'weight': 3_992_000, 'extras': {'totalFees': 2_000_000, 'medianFee': 5.0}}
+
+
+class BlockPages:
+    """mempool.space /v1/blocks/{height}: the 15 blocks at and below a height"""
+    
+    def __init__(self):
+        self.tags, self.calls = {}, []
+    
+    def page(self, tip):
+        return [_block(h, self.tags.get(h, 'a')) for h in range(tip, tip - 15, -1)]
+    
+    def get(self, url, timeout=None):
+        self.calls.append(url)
+        return self.page(int(url.rsplit('/', 1)[-1]))
+
+
+def test_block_ingester_closes_gaps_and_replaces_reorged_blocks(tmp_path):
+    config = OnChainConfig(blocks_file=str(tmp_path / 'blocks.csv'))
+    pages = BlockPages()
+    ingester = BlockIngester(config, pages)
+    assert [b.height for b in ingester.ingest(pages.page(114))] == list(range(100, 115))
+    assert ingester.ingest(pages.page(114)) == []
+    
+    # A 25-block gap is paged back until it reaches the stored tip
+    new = ingester.ingest(pages.page(139))
+    assert [b.height for b in new] == list(range(115, 140))
+    assert pages.calls == [f'{config.mempool_base}/v1/blocks/124']
+    assert new[0].interval_seconds == 600.0
+    
+    # The last two blocks are replaced by a reorg
+    pages.tags.update({138: 'b', 139: 'b'})
+    assert [b.height for b in ingester.ingest(pages.page(139))] == [138, 139]
+    
+    blocks = BlockIngester(config, pages).load_blocks()
+    assert blocks.index.tolist() == list(range(100, 140))
+    assert blocks.loc[137, 'block_hash'] == 'a137' and blocks.loc[139, 'block_hash'] == 'b139'
+    restarted = BlockIngester(config, pages)
+    assert restarted.last_height == 139 and restarted.recent[-1].block_hash == 'b139'
+    assert restarted.features()['block_interval_seconds'] == 600.0
+
+
+def test_block_store_loads_with_schema_dtypes(tmp_path):
+    config = OnChainConfig(blocks_file=str(tmp_path / 'blocks.csv'))
+    pages = BlockPages()
+    BlockIngester(config, pages).ingest(pages.page(119))
+    
+    for tail_rows in (None, 5):
+        df = load_onchain_csv(config.blocks_file, 'blocks', tail_rows=tail_rows)
+        assert len(df) == (tail_rows or 15)
+        assert str(df['height'].dtype) == 'Int64' and str(df['weight'].dtype) == 'Int64'
+        assert str(df['block_hash'].dtype) == 'string' and df['fullness'].dtype == np.float64
+        # The first block has no stored predecessor: a missing Int64/float cell, not an object column
+        assert df['interval_seconds'].isna().sum() == (1 if tail_rows is None else 0)
+    assert pd.api.types.is_integer_dtype(BlockIngester(config, pages).load_blocks().index)
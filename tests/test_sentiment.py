@@ -0,0 +1,163 @@
+import json, os, time
+from types import SimpleNamespace
+
+import pytest
+
+# The module builds its API clients at import time
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+os.environ.setdefault('TAVILY_API_KEY', 'test')
+
+import AlphaCrypto
+
+
+class StubClient:
+    """Records the per-call client options and answers with a fixed reply"""
+    
+    def __init__(self, reply='Sentiment: Positive\nReason: ok'):
+        self.options = []
+        self.reply = reply
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+    
+    def with_options(self, **options):
+        self.options.append(options)
+        return self
+    
+    def create(self, **kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))])
+
+
+def test_llm_chat_timeout_is_the_time_left_before_the_deadline(monkeypatch):
+    client = StubClient()
+    monkeypatch.setattr(AlphaCrypto, 'openai_client', client)
+    
+    assert AlphaCrypto.llm_chat('hi', deadline=time.monotonic() + 30).startswith('Sentiment')
+    assert client.options[-1]['max_retries'] == 0 and 29 < client.options[-1]['timeout'] <= 30
+    
+    AlphaCrypto.llm_chat('hi')
+    assert client.options[-1] == {'max_retries': 0}
+    
+    with pytest.raises(TimeoutError):
+        AlphaCrypto.llm_chat('hi', deadline=time.monotonic() - 1)
+
+
+def batch_cost(text):
+    return AlphaCrypto.estimate_tokens(text[:AlphaCrypto.SENTIMENT_DOC_MAX_CHARS]) + AlphaCrypto.SENTIMENT_REPLY_TOKENS + 5
+
+
+def test_plan_sentiment_batches_respects_token_budget_and_max_items():
+    texts = ['x' * n for n in (100, 4000, 800, 1600, 50, 50, 50, 50, 3000, 10)]
+    budget = 1200
+    batches = AlphaCrypto.plan_sentiment_batches(texts, budget, max_items=3)
+    
+    assert [i for batch in batches for i in batch] == list(range(len(texts)))
+    room = budget - AlphaCrypto.estimate_tokens(AlphaCrypto.SENTIMENT_BATCH_INSTRUCTIONS)
+    for batch in batches:
+        assert len(batch) <= 3
+        assert len(batch) == 1 or sum(batch_cost(texts[i]) for i in batch) <= room
+    
+    assert AlphaCrypto.plan_sentiment_batches(['a'] * 7, 100000, max_items=3) == [[0, 1, 2], [3, 4, 5], [6]]
+    # A text over the budget on its own still gets a batch of one
+    assert AlphaCrypto.plan_sentiment_batches(['y' * 50000, 'z'], 500, max_items=10) == [[0], [1]]
+
+
+def test_llm_sentiment_batch_leaves_missing_and_duplicate_ids_to_the_fallback(monkeypatch):
+    reply = {'items': [
+        {'id': 1, 'sentiment': 'Positive', 'reason': 'ETF inflows'},
+        {'id': 1, 'sentiment': 'Negative', 'reason': 'duplicate'},
+        {'id': 2, 'sentiment': 'Negative'},
+        {'id': 9, 'sentiment': 'Positive', 'reason': 'out of range'},
+        {'sentiment': 'Neutral', 'reason': 'no id'},
+    ]}
+    prompts = []
+    monkeypatch.setattr(AlphaCrypto, 'llm_chat', lambda prompt, *a, **kw: prompts.append(prompt) or json.dumps(reply))
+    
+    results = AlphaCrypto.llm_sentiment_batch(['a', 'b', 'c'])
+    assert results == [('positive', 0.5, 'ETF inflows'), ('negative', -0.5, 'No reason provided'), None]
+    assert len(prompts) == 1 and '[3]\nc' in prompts[0]
+    
+    monkeypatch.setattr(AlphaCrypto, 'llm_chat', lambda *a, **kw: 'not json')
+    assert AlphaCrypto.llm_sentiment_batch(['a', 'b']) == [None, None]
+
+
+def test_classify_docs_classifies_batch_leftovers_singly(monkeypatch, tmp_path):
+    calls = []
+    
+    def fake_chat(prompt, *args, response_format=None, **kwargs):
+        calls.append('batch' if response_format else 'single')
+        if response_format:
+            return json.dumps({'items': [{'id': 2, 'sentiment': 'Negative', 'reason': 'hack'}]})
+        return 'Sentiment: Positive\nReason: adoption'
+    
+    monkeypatch.setattr(AlphaCrypto, 'llm_chat', fake_chat)
+    cfg = AlphaCrypto.Config(sentiment_cache_file=str(tmp_path / 'cache.json'), sentiment_batch_mode=True)
+    docs = [{'title': 'one', 'url': 'https://a/1'}, {'title': 'two', 'url': 'https://a/2'}]
+    
+    results = AlphaCrypto.classify_docs(docs, cfg)
+    assert [(d['sent_label'], d['sent_reason']) for d in results] == [('positive', 'adoption'), ('negative', 'hack')]
+    assert calls == ['batch', 'single']
+
+
+def test_classify_docs_reuses_cached_scores_across_runs(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(AlphaCrypto, 'llm_chat',
+                        lambda prompt, *a, **kw: calls.append(prompt) or 'Sentiment: Negative\nReason: outflows')
+    cfg = AlphaCrypto.Config(sentiment_cache_file=str(tmp_path / 'cache.json'), sentiment_batch_mode=False)
+    docs = [{'title': 'one', 'url': 'https://a/1?utm_source=x'}, {'title': 'two', 'url': 'https://a/2'}]
+    
+    AlphaCrypto.classify_docs(docs, cfg)
+    assert len(calls) == 2
+    # Same article under another tracking query: served from the file written by the first run
+    results = AlphaCrypto.classify_docs([{'title': 'one', 'url': 'https://a/1?utm_source=y'}], cfg)
+    assert len(calls) == 2 and results[0]['sent_label'] == 'negative'
+    # Edited text at the same URL is classified again
+    AlphaCrypto.classify_docs([{'title': 'two (updated)', 'url': 'https://a/2'}], cfg)
+    assert len(calls) == 3
+
+
+def test_sentiment_cache_expires_and_keeps_most_recently_used(monkeypatch, tmp_path):
+    path = str(tmp_path / 'cache.json')
+    now = [1_000_000.0]
+    monkeypatch.setattr(AlphaCrypto.time, 'time', lambda: now[0])
+    
+    cache = AlphaCrypto.SentimentCache(path, ttl_hours=1.0, max_entries=2)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, ('neutral', 0.0, key))
+        now[0] += 60
+    assert cache.get('a') == ('neutral', 0.0, 'a')
+    cache.save()
+    
+    reloaded = AlphaCrypto.SentimentCache(path, ttl_hours=1.0, max_entries=2)
+    assert sorted(reloaded.entries) == ['a', 'c']
+    now[0] += 3600
+    assert AlphaCrypto.SentimentCache(path, ttl_hours=1.0).entries == {}
+
+
+def test_gather_news_keeps_query_order_and_skips_queries_past_the_deadline(monkeypatch):
+    delays = {'slow': 0.2, 'fast': 0.0, 'stuck': 1.5, 'mid': 0.1}
+    
+    def fake_search(q, time_range='d', max_results=20):
+        time.sleep(delays[q])
+        return [{'title': f'{q}-{i}', 'url': f'https://news/{q}/{i}'} for i in range(2)]
+    
+    monkeypatch.setattr(AlphaCrypto, 'tavily_search', fake_search)
+    cfg = AlphaCrypto.Config(news_max_workers=4, news_deadline_seconds=0.5)
+    started = time.monotonic()
+    items = AlphaCrypto.gather_news(['slow', 'fast', 'stuck', 'mid'], cfg)
+    assert time.monotonic() - started < 1.0
+    assert [d['title'] for d in items] == ['slow-0', 'slow-1', 'fast-0', 'fast-1', 'mid-0', 'mid-1']
+
+
+def test_tavily_client_is_shared_until_the_key_changes(monkeypatch):
+    class FakeTavily:
+        def __init__(self, api_key):
+            self.api_key = api_key
+    
+    monkeypatch.setattr(AlphaCrypto, 'TavilyClient', FakeTavily)
+    monkeypatch.setattr(AlphaCrypto, '_tavily_client', None)
+    monkeypatch.setenv('TAVILY_API_KEY', 'one')
+    client = AlphaCrypto.get_tavily_client()
+    assert AlphaCrypto.get_tavily_client() is client
+    monkeypatch.setenv('TAVILY_API_KEY', 'two')
+    assert AlphaCrypto.get_tavily_client().api_key == 'two'
+    monkeypatch.delenv('TAVILY_API_KEY')
+    assert AlphaCrypto.get_tavily_client() is None
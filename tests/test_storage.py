@@ -0,0 +1,102 @@
+import gzip, json, pickle
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from AlphaCrypto_Storage import (Checkpointer, SignalLog, append_csv_rows, pack_dicts, pack_records, read_csv_tail,
+                                 unpack_dicts, unpack_records)
+
+
+@dataclass
+class Row:
+    timestamp: datetime
+    price: float
+    size: Optional[int] = None
+
+
+def test_checkpoint_round_trips_records_as_json(tmp_path):
+    path = str(tmp_path / "state.json.gz")
+    t0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = [Row(t0, 1.5, 3), Row(t0 + timedelta(minutes=1), np.float64(2.5), None)]
+    history = [{'a': np.float64(0.1), 'b': 2}, {'a': 0.3, 'b': np.int64(4)}]
+    checkpointer = Checkpointer(path)
+    checkpointer.save({'rows': pack_records(rows), 'history': pack_dicts(history), 'ring': np.arange(3.0)})
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        json.load(f)  # Plain JSON on disk
+
+    state = checkpointer.load()
+    assert unpack_records(state['rows'], Row) == rows
+    assert unpack_dicts(state['history']) == [{'a': 0.1, 'b': 2}, {'a': 0.3, 'b': 4}]
+    assert state['ring'] == [0.0, 1.0, 2.0]
+
+
+def test_checkpoint_ignores_pickles_and_stale_snapshots(tmp_path):
+    path = str(tmp_path / "state.json.gz")
+    with gzip.open(path, 'wb') as f:
+        pickle.dump({'version': 2, 'state': {}}, f)
+    assert Checkpointer(path).load() is None
+
+    checkpointer = Checkpointer(path, max_age_hours=1.0)
+    checkpointer.save({'x': 1})
+    assert checkpointer.load() == {'x': 1}
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        payload = json.load(f)
+    payload['saved_at'] = {'__datetime__': (datetime.now(timezone.utc) - timedelta(hours=2)).isoformat()}
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(payload, f)
+    assert checkpointer.load() is None
+
+
+def write_rows(path, n, trailing_newline=True):
+    lines = ['timestamp,value'] + [f'2025-10-01T00:{i // 60:02d}:{i % 60:02d}+00:00,{i}' for i in range(n)]
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + ('\n' if trailing_newline else ''))
+
+
+@pytest.mark.parametrize('trailing_newline', [True, False])
+def test_read_csv_tail_matches_full_read(tmp_path, trailing_newline):
+    path = str(tmp_path / 'rows.csv')
+    write_rows(path, 500, trailing_newline)
+    full = pd.read_csv(path)
+    for rows in (1, 7, 64, 499, 500, 800):
+        for block_size in (16, 1000, 64 * 1024):
+            tail = read_csv_tail(path, rows, block_size=block_size)
+            pd.testing.assert_frame_equal(tail, full.tail(rows).reset_index(drop=True))
+    
+    write_rows(path, 0)
+    assert read_csv_tail(path, 10).columns.tolist() == ['timestamp', 'value']
+
+
+def test_signal_log_appends_tails_and_recovers_partial_lines(tmp_path):
+    log = SignalLog(str(tmp_path / 'logs' / 'signals.jsonl'), str(tmp_path / 'signals.json'))
+    assert log.tail(5) == [] and log.latest() is None
+    
+    t0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    log.extend(Row(t0 + timedelta(minutes=i), np.float64(i / 2), i) for i in range(10))
+    assert [r['size'] for r in log.tail(3)] == [7, 8, 9]
+    assert len(log.tail(50)) == 10
+    assert log.latest() == {'timestamp': (t0 + timedelta(minutes=9)).isoformat(), 'price': 4.5, 'size': 9}
+    
+    # An interrupted write leaves a partial line; it is skipped and the next append starts a fresh line
+    with open(log.log_path, 'a') as f:
+        f.write('{"timestamp": "2025-01-01T00:1')
+    log.append({'timestamp': t0, 'price': 1.0, 'size': 10})
+    assert [r['size'] for r in log.tail(3)] == [8, 9, 10]
+    assert log.latest()['size'] == 10
+
+
+def test_append_csv_rows_widens_the_header_once(tmp_path):
+    path = str(tmp_path / 'rows.csv')
+    append_csv_rows(path, [{'height': 1, 'fee': 2.5}], {'height': 'Int64', 'fee': 'float64'})
+    append_csv_rows(path, [{'fee': 3.0, 'height': 2}])
+    append_csv_rows(path, [{'height': 3, 'fee': 4.0, 'hash': 'abc'}])
+    append_csv_rows(path, [{'height': 4, 'hash': 'def'}])
+    
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines == ['height,fee,hash', '1,2.5,', '2,3.0,', '3,4.0,abc', '4,,def']